@@ -3,6 +3,7 @@ import click
 from .ide import IDE
 from .ide_cn import IDE_CN
 from .version import get_version
+from .src.constants import ENGINES
 from .stdio import interpreter_file, interpreter_stdin
 
 
@@ -45,12 +46,32 @@ def enter_ip(ctx, _, value):
               expose_value=False, help='Show the IDE in Chinese and exit.')
 @click.option('-s', '--stdio', is_flag=True, callback=enter_ip,
               expose_value=False, help='Enter interactive programming.')
+@click.option('-e', '--engine', type=click.Choice(ENGINES), default='tree',
+              show_default=True, help='Choose the execution engine.')
+@click.option('--no-cache', is_flag=True,
+              help='Do not read or write the compiled-module cache.')
+@click.option('--dump-parse', is_flag=True,
+              help='Write the tokens and syntax tree of FILE to .parse/ as JSON.')
+@click.option('--profile', is_flag=True,
+              help='Print the time spent in every function and line to stderr.')
+@click.option('--profile-output', type=click.Path(dir_okay=False),
+              help='Write the profiled call stacks in collapsed (flamegraph) format.')
+@click.option('--sample', is_flag=True,
+              help='Profile by sampling the call stack, with any engine. '
+                   'Implies --profile unless --profile-output is given.')
+@click.option('--sample-interval', type=click.FloatRange(min=0, min_open=True), default=0.005,
+              show_default=True, help='Seconds between two samples.')
 @click.argument('file', nargs=1)
-def main(file):
+def main(file, engine, no_cache, dump_parse, profile, profile_output, sample, sample_interval):
+    if sample and not profile_output:
+        profile = True  # 只有--sample时也要输出报告
+    if (profile or profile_output) and engine == 'vm' and not sample:
+        raise click.UsageError('the vm engine cannot be profiled, use tree or closure or --sample')
     if file == 'stdin':
-        interpreter_stdin()
+        interpreter_stdin(engine)
     else:
-        interpreter_file(file)
+        interpreter_file(file, engine, not no_cache, '.parse' if dump_parse else None,
+                         profile, profile_output, sample_interval if sample else None)
 
 
 if __name__ == '__main__':
@@ -2,30 +2,31 @@ import math
 import sys
 import copy
 import json
-from os import system, mkdir
-from os.path import exists
+import threading
+from os import system, makedirs
+from os.path import join
 from pprint import pprint
 from collections import Counter
 from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
 
-from . import constants
+from . import constants, cache, parallel, tasks
+from .profiler import Profiler
+from .instrument import Instrumentation
 from .lexer.lexer import Lexer
 from .parse.parser import Parser
-from .interpreter.values import String, Number, Single, Printable
+from .interpreter import coroutine
+from .interpreter.generator import Iterator, next_item
+from .interpreter.values import Value, String, Number, Single, List, Dict, Printable
 from .interpreter.interpreter import Interpreter, BuiltInFunction
+from .interpreter.closure import ClosureCompiler
+from .interpreter.vm import VirtualMachine
 from .interpreter.context import Context
 from .interpreter.table import SymbolTable
 
-global_symbol_table = SymbolTable()
-
 sys.setrecursionlimit(constants.MAX_RECURSION)
-global_symbol_table.set('__System_maxrecursion', Number(constants.MAX_RECURSION))
-global_symbol_table.set('__System_maxsize', Number(sys.maxsize))
-global_symbol_table.set('__System_maxunicode', Number(sys.maxunicode))
-global_symbol_table.set('__System_interpreter', String(__file__))
-global_symbol_table.set('__System_platform', String(sys.platform))
 
-def set_builtins():
+def set_builtins(table):
     def read(file, encoding='utf-8'):
         with open(file, 'r', encoding=encoding) as f:
             res = f.read()
@@ -35,94 +36,121 @@ def set_builtins():
         with open(file, 'w', encoding=encoding) as f:
             f.write(content)
     
-    global_symbol_table.set('defined_var', BuiltInFunction(lambda x: x in global_symbol_table.symbols, 'defined_var'))
-    global_symbol_table.set('get_var', BuiltInFunction(lambda *args: global_symbol_table.symbols.get(args), 'get_var'))
-    
-    global_symbol_table.set('ellipsis', Single(...))
-    global_symbol_table.set('NotImplemented', Single(NotImplemented))
-    global_symbol_table.set('nan', Number(math.nan))
-    global_symbol_table.set('inf', Number(math.inf))
-    
-    global_symbol_table.set('len', BuiltInFunction(len, 'len'))
-    global_symbol_table.set('int', BuiltInFunction(int, 'int'))
-    global_symbol_table.set('float', BuiltInFunction(float, 'float'))
-    global_symbol_table.set('str', BuiltInFunction(str, 'str'))
-    global_symbol_table.set('string', BuiltInFunction(repr, 'string'))
-    global_symbol_table.set('list', BuiltInFunction(list, 'list'))
-    global_symbol_table.set('range', BuiltInFunction(lambda *args: list(range(*args)), 'range'))
-    global_symbol_table.set('append', BuiltInFunction(lambda x, y: x.append(y), 'append'))
-    global_symbol_table.set('remove', BuiltInFunction(lambda x, y: x.remove(y), 'remove'))
-    global_symbol_table.set('clear', BuiltInFunction(lambda x: x.clear(), 'clear'))
-    global_symbol_table.set('reverse', BuiltInFunction(lambda x: list(reversed(x)), 'reverse'))
-    global_symbol_table.set('extend', BuiltInFunction(lambda x, y: x.extend(y), 'extend'))
-    
-    global_symbol_table.set('enum', BuiltInFunction(
+    table.set('__System_maxrecursion', Number(constants.MAX_RECURSION))
+    table.set('__System_maxsize', Number(sys.maxsize))
+    table.set('__System_maxunicode', Number(sys.maxunicode))
+    table.set('__System_interpreter', String(__file__))
+    table.set('__System_platform', String(sys.platform))
+    
+    table.set('ellipsis', Single(...))
+    table.set('NotImplemented', Single(NotImplemented))
+    table.set('nan', Number(math.nan))
+    table.set('inf', Number(math.inf))
+    
+    table.set('len', BuiltInFunction(len, 'len'))
+    table.set('int', BuiltInFunction(int, 'int'))
+    table.set('float', BuiltInFunction(float, 'float'))
+    table.set('str', BuiltInFunction(str, 'str'))
+    table.set('string', BuiltInFunction(repr, 'string'))
+    table.set('list', BuiltInFunction(list, 'list'))
+    table.set('range', BuiltInFunction(lambda *args: list(range(*args)), 'range'))
+    table.set('append', BuiltInFunction(lambda x, y: x.append(y), 'append'))
+    table.set('remove', BuiltInFunction(lambda x, y: x.remove(y), 'remove'))
+    table.set('clear', BuiltInFunction(lambda x: x.clear(), 'clear'))
+    table.set('reverse', BuiltInFunction(lambda x: list(reversed(x)), 'reverse'))
+    table.set('extend', BuiltInFunction(lambda x, y: x.extend(y), 'extend'))
+    
+    table.set('enum', BuiltInFunction(
         lambda x, y=0: [[i, j] for i, j in enumerate(x, y)], 'enum'
     ))
     
-    global_symbol_table.set('keys', BuiltInFunction(lambda x: list(x.keys()), 'keys'))
-    global_symbol_table.set('values', BuiltInFunction(lambda x: list(x.values), 'values'))
-    global_symbol_table.set('items', BuiltInFunction(lambda x: [[i, j] for i, j in x.items()], 'items'))
-    global_symbol_table.set('getdefault', BuiltInFunction(
+    # 惰性版本：返回Iterator，用next()逐个取出
+    table.set('next', BuiltInFunction(next_item, 'next'))
+    table.set('lazy_range', BuiltInFunction(lambda *args: Iterator(iter(range(*args)), 'range'), 'lazy_range'))
+    table.set('lazy_enum', BuiltInFunction(
+        lambda x, y=0: Iterator(([i, j] for i, j in enumerate(x, y)), 'enum'), 'lazy_enum'
+    ))
+    table.set('lazy_zip', BuiltInFunction(
+        lambda *args: Iterator((list(i) for i in zip(*args)), 'zip'), 'lazy_zip'
+    ))
+    table.set('lazy_items', BuiltInFunction(
+        lambda x: Iterator(([i, j] for i, j in x.items()), 'items'), 'lazy_items'
+    ))
+    
+    table.set('keys', BuiltInFunction(lambda x: list(x.keys()), 'keys'))
+    table.set('values', BuiltInFunction(lambda x: list(x.values), 'values'))
+    table.set('items', BuiltInFunction(lambda x: [[i, j] for i, j in x.items()], 'items'))
+    table.set('getdefault', BuiltInFunction(
         lambda x, key, default=None: x.get(key, default), 'getdefault'
     ))
-    global_symbol_table.set('setdefault', BuiltInFunction(
+    table.set('setdefault', BuiltInFunction(
         lambda x, key, default=None: x.setdefault(key, default), 'setdefault'
     ))
     
-    global_symbol_table.set('ord', BuiltInFunction(ord, 'ord'))
-    global_symbol_table.set('char', BuiltInFunction(chr, 'char'))
+    table.set('ord', BuiltInFunction(ord, 'ord'))
+    table.set('char', BuiltInFunction(chr, 'char'))
     
-    global_symbol_table.set('poplist', BuiltInFunction(lambda x, y=-1: x.pop(y), 'poplist'))
-    global_symbol_table.set('popdict', BuiltInFunction(lambda x, y: x.pop(y), 'popdict'))
-    global_symbol_table.set('getitem', BuiltInFunction(lambda x, y: x[y], 'getitem'))
-    global_symbol_table.set('setitem', BuiltInFunction(
+    table.set('poplist', BuiltInFunction(lambda x, y=-1: x.pop(y), 'poplist'))
+    table.set('popdict', BuiltInFunction(lambda x, y: x.pop(y), 'popdict'))
+    table.set('getitem', BuiltInFunction(lambda x, y: x[y], 'getitem'))
+    table.set('setitem', BuiltInFunction(
         lambda x, key, value: x.__setitem__(key, value), 'setitem'
     ))
-    global_symbol_table.set('delitem', BuiltInFunction(
+    table.set('delitem', BuiltInFunction(
         lambda x, key: x.__delitem__(key), 'delitem'
     ))
-    global_symbol_table.set('typeof', BuiltInFunction(lambda x: type(x).__name__, 'typeof'))
-    global_symbol_table.set('sum', BuiltInFunction(lambda x: sum(x), 'sum'))
-    global_symbol_table.set('zip_short', BuiltInFunction(
+    table.set('typeof', BuiltInFunction(lambda x: type(x).__name__, 'typeof'))
+    table.set('sum', BuiltInFunction(lambda x: sum(x), 'sum'))
+    table.set('zip_short', BuiltInFunction(
         lambda *args: [list(i) for i in zip(*args)], 'zip_short'
     ))
-    global_symbol_table.set('zip_long', BuiltInFunction(
+    table.set('zip_long', BuiltInFunction(
         lambda *args: [list(i) for i in zip_longest(*args)], 'zip_long'
     ))
     
-    global_symbol_table.set('replace', BuiltInFunction(lambda x, y, z='': x.replace(y, z), 'replace'))
-    global_symbol_table.set('count', BuiltInFunction(lambda x, y: x.count(y), 'count'))
-    global_symbol_table.set('strip', BuiltInFunction(lambda x, y=' ': x.strip(y), 'strip'))
-    global_symbol_table.set('lstrip', BuiltInFunction(lambda x, y=' ': x.lstrip(y), 'lstrip'))
-    global_symbol_table.set('rstrip', BuiltInFunction(lambda x, y=' ': x.rstrip(y), 'rstrip'))
-    global_symbol_table.set('split', BuiltInFunction(lambda x, y=' ': x.split(y), 'split'))
-    global_symbol_table.set('slice', BuiltInFunction(
+    table.set('replace', BuiltInFunction(lambda x, y, z='': x.replace(y, z), 'replace'))
+    table.set('count', BuiltInFunction(lambda x, y: x.count(y), 'count'))
+    table.set('strip', BuiltInFunction(lambda x, y=' ': x.strip(y), 'strip'))
+    table.set('lstrip', BuiltInFunction(lambda x, y=' ': x.lstrip(y), 'lstrip'))
+    table.set('rstrip', BuiltInFunction(lambda x, y=' ': x.rstrip(y), 'rstrip'))
+    table.set('split', BuiltInFunction(lambda x, y=' ': x.split(y), 'split'))
+    table.set('slice', BuiltInFunction(
         lambda x, start=None, stop=None, step=None: x[start:stop:step], 'slice'
     ))
-    global_symbol_table.set('counter', BuiltInFunction(lambda x: dict(Counter(x)), 'counter'))
+    table.set('counter', BuiltInFunction(lambda x: dict(Counter(x)), 'counter'))
    
-    global_symbol_table.set('copy', BuiltInFunction(copy.copy, 'copy'))
-    global_symbol_table.set('deepcopy', BuiltInFunction(copy.deepcopy, 'deepcopy'))
-    global_symbol_table.set('join', BuiltInFunction(lambda x, y: y.join(x), 'join'))
-    global_symbol_table.set('find', BuiltInFunction(lambda x, y: x.find(y), 'find'))
-    global_symbol_table.set('index', BuiltInFunction(lambda x, y: x.index(y), 'index'))
-    global_symbol_table.set('startswith', BuiltInFunction(lambda x, y: x.startswith(y), 'startswith'))
-    global_symbol_table.set('endswith', BuiltInFunction(lambda x, y: x.endswith(y), 'endswith'))
+    table.set('copy', BuiltInFunction(copy.copy, 'copy'))
+    table.set('deepcopy', BuiltInFunction(copy.deepcopy, 'deepcopy'))
+    table.set('join', BuiltInFunction(lambda x, y: y.join(x), 'join'))
+    table.set('find', BuiltInFunction(lambda x, y: x.find(y), 'find'))
+    table.set('index', BuiltInFunction(lambda x, y: x.index(y), 'index'))
+    table.set('startswith', BuiltInFunction(lambda x, y: x.startswith(y), 'startswith'))
+    table.set('endswith', BuiltInFunction(lambda x, y: x.endswith(y), 'endswith'))
     
-    global_symbol_table.set('bin', BuiltInFunction(lambda x: bin(x).replace('0b', ''), 'bin'))
-    global_symbol_table.set('oct', BuiltInFunction(lambda x: oct(x).replace('0o', ''), 'oct'))
-    global_symbol_table.set('hex', BuiltInFunction(lambda x: hex(x).replace('0x', ''), 'hex'))
+    table.set('bin', BuiltInFunction(lambda x: bin(x).replace('0b', ''), 'bin'))
+    table.set('oct', BuiltInFunction(lambda x: oct(x).replace('0o', ''), 'oct'))
+    table.set('hex', BuiltInFunction(lambda x: hex(x).replace('0x', ''), 'hex'))
     
-    global_symbol_table.set('ternary', BuiltInFunction(lambda a, b, c: b if a else c, 'ternary'))
+    table.set('ternary', BuiltInFunction(lambda a, b, c: b if a else c, 'ternary'))
     
-    global_symbol_table.set('read', BuiltInFunction(read, 'read'))
-    global_symbol_table.set('write', BuiltInFunction(write, 'write'))
+    table.set('read', BuiltInFunction(read, 'read'))
+    table.set('write', BuiltInFunction(write, 'write'))
     
-    global_symbol_table.set('globals', BuiltInFunction(lambda: global_symbol_table.symbols, 'globals'))
-    global_symbol_table.set('system', BuiltInFunction(lambda cmd: system(cmd), 'system'))
+    table.set('system', BuiltInFunction(lambda cmd: system(cmd), 'system'))
+    
+    table.set('sleep', BuiltInFunction(coroutine.sleep, 'sleep'))
+    table.set('read_async', BuiltInFunction(
+        lambda file, encoding='utf-8': coroutine.in_executor('read_async', read, file, encoding), 'read_async'
+    ))
+    table.set('write_async', BuiltInFunction(
+        lambda file, content, encoding='utf-8': coroutine.in_executor(
+            'write_async', write, file, content, encoding
+        ), 'write_async'
+    ))
+    table.set('system_async', BuiltInFunction(coroutine.system, 'system_async'))
+    table.set('gather', BuiltInFunction(coroutine.gather, 'gather'))
 
-    global_symbol_table.set('sort', BuiltInFunction(lambda x: x.sort(), 'sort'))
+    table.set('sort', BuiltInFunction(lambda x: x.sort(), 'sort'))
 
 
 def filter_args(args):
@@ -139,46 +167,233 @@ def filter_args(args):
     return res
 
 
-set_builtins()
+def dump_json(path, obj, ensure_ascii=True):
+    # 流式写出紧凑JSON，供调试使用
+    with open(path, 'w', encoding='utf-8') as fp:
+        json.dump(obj, fp, skipkeys=True, ensure_ascii=ensure_ascii, separators=(',', ':'))
 
-def run(file, text, out_io=sys.stdout):
-    global_symbol_table.set('print', BuiltInFunction(
-        lambda *args: print(*filter_args(args), file=out_io), 'print'
-    ))
-    global_symbol_table.set('printf', BuiltInFunction(
-        lambda *args: print(*filter_args(args), end='', file=out_io), 'printf'
-    ))
-    global_symbol_table.set('printe', BuiltInFunction(
-        lambda value, end: print(*filter_args([value]), end=end, file=out_io), 'printe'
-    ))
-    global_symbol_table.set('printp', BuiltInFunction(
-        lambda *args: pprint(*filter_args(args), stream=out_io), 'printp'
-    ))
-    global_symbol_table.set('input', BuiltInFunction(input, 'input'))
-    
-    global_symbol_table.set('__System_file', String(file))
-    global_symbol_table.set('__System_code', String(text))
-    
-    lexer = Lexer(file, text)
-    tokens, error = lexer.make_tokens()  # 词法解析
-    # print(tokens)
-    if error:
-        return None, error, None
-    if not exists('.parse'):
-        mkdir('.parse')
-    with open('.parse/tokens.json', 'w', encoding='utf-8') as fp:
-        json.dump([tok.as_json() for tok in tokens], fp, skipkeys=True, ensure_ascii=True, indent=4, sort_keys=True)
-    
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error, None
-    with open('.parse/ast.json', 'w', encoding='utf-8') as fp:
-        json.dump(ast.node.as_json(), fp, skipkeys=True, ensure_ascii=False, indent=4, sort_keys=True)
-    interpreter = Interpreter()
-    context = Context('<program>')
-    context.symbol_table = global_symbol_table
-    interpreter.run_func = run
-    res = interpreter.visit(ast.node, context)
-    
-    return res.value, res.error, context
+
+class Runtime(object):
+    """
+    运行时
+    Owns everything a script can reach: the global symbol table with the
+    builtins, the output stream, the execution engine and the modules parsed
+    by include. Runtimes share no mutable state, so scripts can run in
+    parallel threads as long as each thread uses its own runtime; clone()
+    copies a prepared runtime instead of building the builtins again.
+    Functions started by spawn() run in the runtime's own pool of at most
+    workers threads, next to the script that started them, and await waits
+    on the runtime's own asyncio event loop; pmap() and preduce() use the
+    runtime's own worker processes. close() stops the loop, the threads and
+    the processes; a runtime is also a context manager that closes it on exit.
+    """
+    def __init__(self, out_io=None, engine='tree', use_cache=True, template=None,
+                 stack_memory=constants.STACK_MEMORY, workers=constants.TASK_WORKERS):
+        if engine not in constants.ENGINES:
+            raise ValueError(f'unknown engine: {engine}')
+        self.out_io = out_io  # None表示使用当前的sys.stdout
+        self.engine = engine
+        self.use_cache = use_cache
+        self.stack_memory = stack_memory  # vm引擎调用栈的内存预算
+        self.profiler = None  # Profiler或SamplingProfiler，见profiler.py
+        self.hooks = None  # Instrumentation，见instrument.py
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='KittenScript')  # spawn()的线程池
+        self.workers = workers
+        self.loop = coroutine.EventLoop()  # await使用的事件循环，第一次await时启动
+        self.pools = {}  # 进程数 -> pmap/preduce的ProcessPoolExecutor，第一次使用时创建
+        self.symbol_table = SymbolTable()
+        if template is None:
+            self.modules = {}
+            self.modules_lock = threading.Lock()
+            set_builtins(self.symbol_table)
+        else:
+            self.modules = template.modules  # 语法树只读，可以共享
+            self.modules_lock = template.modules_lock
+            self.symbol_table.symbols = {
+                name: self.copy_value(value) for name, value in template.symbol_table.symbols.items()
+            }
+        self.bind_builtins()
+    
+    def clone(self, out_io=None):
+        return Runtime(out_io, self.engine, self.use_cache, template=self, stack_memory=self.stack_memory,
+                       workers=self.workers)
+    
+    def close(self):
+        self.loop.close()
+        self.executor.shutdown()
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.pools.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @staticmethod
+    def copy_value(value):
+        # 复制一层，避免不同运行时修改同一个值的位置、属性或元素
+        if not isinstance(value, Value):
+            return value
+        new_value = copy.copy(value)
+        new_value.set_attrs(value.attrs)
+        if isinstance(value, (List, Dict)):
+            new_value.items = value.items.copy()
+        return new_value
+    
+    def bind_builtins(self):
+        table = self.symbol_table
+        table.set('print', BuiltInFunction(
+            lambda *args: print(*filter_args(args), file=self.out_io), 'print'
+        ))
+        table.set('printf', BuiltInFunction(
+            lambda *args: print(*filter_args(args), end='', file=self.out_io), 'printf'
+        ))
+        table.set('printe', BuiltInFunction(
+            lambda value, end: print(*filter_args([value]), end=end, file=self.out_io), 'printe'
+        ))
+        table.set('printp', BuiltInFunction(
+            lambda *args: pprint(*filter_args(args), stream=self.out_io), 'printp'
+        ))
+        table.set('input', BuiltInFunction(input, 'input'))
+        table.set('defined_var', BuiltInFunction(lambda x: x in table.symbols, 'defined_var'))
+        table.set('get_var', BuiltInFunction(lambda *args: table.symbols.get(args), 'get_var'))
+        table.set('globals', BuiltInFunction(lambda: table.symbols, 'globals'))
+        table.set('pmap', tasks.TaskFunction(
+            lambda context, pos_start, pos_end, *args: parallel.pmap(self, context, pos_start, pos_end, *args), 'pmap'
+        ))
+        table.set('preduce', tasks.TaskFunction(
+            lambda context, pos_start, pos_end, *args: parallel.preduce(self, context, pos_start, pos_end, *args),
+            'preduce'
+        ))
+        table.set('spawn', tasks.TaskFunction(
+            lambda context, pos_start, pos_end, *args: tasks.spawn(self, context, pos_start, pos_end, *args), 'spawn'
+        ))
+        table.set('await_result', tasks.TaskFunction(tasks.await_result, 'await_result'))
+        table.set('wait_all', tasks.TaskFunction(tasks.wait_all, 'wait_all'))
+    
+    def parse(self, file, text, dump_dir=None):
+        node = cache.load(file, text) if self.use_cache and dump_dir is None else None
+        if node is None:
+            lexer = Lexer(file, text)
+            if dump_dir is not None:
+                tokens, error = lexer.make_tokens()  # 词法解析
+                if error:
+                    return None, error
+                makedirs(dump_dir, exist_ok=True)
+                dump_json(join(dump_dir, 'tokens.json'), [tok.as_json() for tok in tokens])
+            else:
+                tokens = lexer.generate_tokens()  # 边词法解析边语法解析
+            
+            parser = Parser(tokens)
+            ast = parser.parse()
+            for _ in parser.stream or ():  # 词法错误优先于语法错误
+                pass
+            if lexer.error:
+                return None, lexer.error
+            if ast.error:
+                return None, ast.error
+            node = ast.node
+            if self.use_cache:
+                cache.store(file, text, node)
+        if dump_dir is not None:
+            dump_json(join(dump_dir, 'ast.json'), node.as_json(), ensure_ascii=False)
+        return node, None
+    
+    def execute(self, file, text, node):
+        self.symbol_table.set('__System_file', String(file))
+        self.symbol_table.set('__System_code', String(text))
+        context = Context('<program>')
+        context.symbol_table = self.symbol_table
+        engine = None if self.profiler is None else self.profiler.engine(self.engine)
+        if engine is None and self.hooks is not None:
+            engine = self.hooks.engine(self.engine)
+        if engine is not None:
+            engine.run_func = self.include
+            engine.await_func = self.loop.wait
+            res = engine.execute(node, context)
+        elif self.engine == 'closure':
+            compiler = ClosureCompiler()
+            compiler.run_func = self.include
+            compiler.await_func = self.loop.wait
+            res = compiler.execute(node, context)
+        elif self.engine == 'vm':
+            machine = VirtualMachine(self.stack_memory)
+            machine.run_func = self.include
+            machine.await_func = self.loop.wait
+            res = machine.execute(node, context)
+        else:
+            interpreter = Interpreter()
+            interpreter.run_func = self.include
+            interpreter.await_func = self.loop.wait
+            res = interpreter.execute(node, context)
+        return res.value, res.error, context
+    
+    def run(self, file, text, dump_dir=None):
+        with self.lock:
+            node, error = self.parse(file, text, dump_dir)
+            if error:
+                return None, error, None
+            if self.profiler is None:
+                return self.execute(file, text, node)
+            self.profiler.start(file)
+            try:
+                return self.execute(file, text, node)
+            finally:
+                self.profiler.stop()
+    
+    def include(self, path, text):
+        # 被include的.kst模块，同一运行时（及其克隆）中只解析一次
+        # 不持有self.lock：spawn()启动的任务也会include，而脚本可能正持有它等待任务
+        if self.hooks is not None:
+            self.hooks.include(path)
+        with self.modules_lock:
+            node = self.modules.get((path, text))
+            if node is None:
+                node, error = self.parse(path, text)
+                if error:
+                    return None, error, None
+                self.modules[path, text] = node
+        return self.execute(path, text, node)
+
+
+runtime = Runtime()
+global_symbol_table = runtime.symbol_table
+
+
+def run(file, text, out_io=sys.stdout, engine='tree', use_cache=True, dump_dir=None,
+        stack_memory=constants.STACK_MEMORY, profile=False, hooks=()):
+    """
+    Runs a script on the shared runtime. profile may be True, to print a
+    profile of the run to sys.stderr afterwards, or a Profiler or
+    SamplingProfiler to collect the statistics into. hooks are consumers of
+    the events of the run, see Instrumentation. The deterministic Profiler
+    and hooks need the tree or closure engine and exclude each other.
+    """
+    if engine not in constants.ENGINES:
+        raise ValueError(f'unknown engine: {engine}')
+    deterministic = profile is True or isinstance(profile, Profiler)
+    if deterministic and engine == 'vm':
+        raise ValueError('the vm engine cannot be profiled, use tree or closure')
+    if hooks and engine == 'vm':
+        raise ValueError('the vm engine cannot be instrumented, use tree or closure')
+    if hooks and deterministic:
+        raise ValueError('a run cannot be profiled and instrumented at the same time')
+    profiler = Profiler() if profile is True else profile or None
+    with runtime.lock:
+        runtime.out_io = out_io
+        runtime.engine = engine
+        runtime.use_cache = use_cache
+        runtime.stack_memory = stack_memory
+        runtime.profiler = profiler
+        runtime.hooks = Instrumentation(*hooks) if hooks else None
+        try:
+            result = runtime.run(file, text, dump_dir)
+        finally:
+            runtime.profiler = None
+            runtime.hooks = None
+    if profile is True:
+        profiler.report()
+    return result
@@ -0,0 +1,55 @@
+import os
+import pickle
+import hashlib
+
+from . import constants
+from ..version import get_version
+
+
+def cache_path(file):
+    # 源文件对应的缓存文件路径，如 lib/__kstcache__/sort.kst.kstc
+    directory, name = os.path.split(os.path.abspath(file))
+    return os.path.join(directory, constants.CACHE_DIR, name + constants.CACHE_SUFFIX)
+
+
+def cache_key(file, text):
+    digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    return constants.CACHE_FORMAT, get_version(), file, digest
+
+
+def load(file, text):
+    """
+    Return the syntax tree cached for this exact file and source text, or
+    None when there is no usable cache entry.
+    """
+    if not os.path.isfile(file):
+        return None
+    try:
+        with open(cache_path(file), 'rb') as fp:
+            if pickle.load(fp) != cache_key(file, text):
+                return None
+            return pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError, TypeError):
+        return None
+
+
+def store(file, text, node):
+    """
+    Save the syntax tree of a source file next to it. The cache is only an
+    optimization, so unwritable directories are silently ignored.
+    """
+    if not os.path.isfile(file):
+        return
+    path = cache_path(file)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, 'wb') as fp:
+            pickle.dump(cache_key(file, text), fp, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(node, fp, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except (OSError, pickle.PicklingError, RecursionError, TypeError, AttributeError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
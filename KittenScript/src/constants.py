@@ -74,12 +74,14 @@ BUILTINS = ['__System_maxrecursion', '__System_maxsize', '__System_maxunicode',
             'zip_long', 'replace', 'count', 'strip', 'lstrip', 'rstrip', 'split', 'slice',
             'counter', 'copy', 'deepcopy', 'join', 'find', 'index', 'startswith', 'endswith',
             'globals', 'system', 'bin', 'oct', 'hex', 'ellipsis', 'ternary', 'reverse', 'object',
-            'sort', 'inf', 'nan', 'NotImplemented', 'defined_var', 'get_var']
+            'sort', 'inf', 'nan', 'NotImplemented', 'defined_var', 'get_var', 'pmap', 'preduce',
+            'spawn', 'await_result', 'wait_all', 'sleep', 'read_async', 'write_async', 'system_async',
+            'gather', 'next', 'lazy_range', 'lazy_enum', 'lazy_zip', 'lazy_items']
 KEYWORDS = {'true', 'false', 'null', 'for', 'while', 'to', 'var', 'if', 'elif', 'else',
             'step', 'exit', 'then', 'throw', 'function', 'include', 'do', 'end', 'return',
             'break', 'continue', 'try', 'catch', 'delete', 'lambda', 'assert', 'finally',
             'switch', 'case', 'default', 'and', 'or', 'not', 'pass', 'attr', 'namespace',
-            'using', 'unless', 'struct', 'new'}  # 关键字集合
+            'using', 'unless', 'struct', 'new', 'async', 'await', 'yield'}  # 关键字集合
 SPECIAL_KEYWORDS = {
     'true': (BOOL, True),
     'false': (BOOL, False),
@@ -148,3 +150,13 @@ PYTHON_MODULE = {'.py', '.py3', '.pyw', '.pym', '.pyks'}  # 所有支持的pytho
 C_MODULE = {'.dll', '.so'}
 
 MAX_RECURSION = 2 ** 26 - 1
+CONSTANT_POOL_SIZE = 4096  # 常量池最多保存的字面量节点数
+STACK_MEMORY = 2 ** 30  # vm引擎调用栈的内存预算(字节)
+FRAME_MEMORY = 1024  # vm引擎每个调用帧大约占用的内存(字节)
+TASK_WORKERS = 32  # 每个运行时中spawn()最多同时使用的线程数
+
+ENGINES = ('tree', 'closure', 'vm')  # 所有执行引擎
+
+CACHE_DIR = '__kstcache__'  # 编译缓存目录，位于源文件旁
+CACHE_SUFFIX = '.kstc'  # 编译缓存扩展名
+CACHE_FORMAT = 1  # 编译缓存格式，语法树节点或Token的属性改变时加一
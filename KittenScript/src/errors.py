@@ -22,8 +22,8 @@ def _strings_with_arrows(text: str, pos_start, pos_end):
 
 class BaseError(object):
     def __init__(self, pos_start, pos_end, error_name: str, details: str):
-        self.pos_start = pos_start.copy()
-        self.pos_end = pos_end.copy()
+        self.pos_start = pos_start
+        self.pos_end = pos_end
         self.error_name = error_name
         self.details = details
     
@@ -67,14 +67,17 @@ class RTError(BaseError):
         return result
 
     def generate_traceback(self):
-        res = ''
+        lines = []
         pos = self.pos_start
         ctx = self.context
         while ctx:
-            res = f'\tFile {pos.file}, line {pos.line + 1}, in {ctx.display_name}\n' + res
+            lines.append(f'\tFile {pos.file}, line {pos.line + 1}, in {ctx.display_name}\n')
+            if ctx.tail_calls:
+                lines.append(f'\t[{ctx.tail_calls} tail calls omitted]\n')
             pos = ctx.parent_entry_pos
             ctx = ctx.parent
-        return 'Traceback (most recent call last):\n' + res
+        lines.append('Traceback (most recent call last):\n')
+        return ''.join(reversed(lines))
 
 
 class MathError(RTError):
@@ -0,0 +1,236 @@
+import sys
+from time import perf_counter_ns
+
+from .interpreter.flow import ErrorSignal
+from .interpreter.interpreter import Interpreter, BuiltInFunction
+from .interpreter.closure import ClosureCompiler
+
+EVENTS = ('enter', 'exit', 'builtin', 'include', 'error', 'node')
+
+
+class Instrumentation(object):
+    """
+    插桩
+    Delivers the events of a run to consumers. A consumer is any object
+    with some of these methods:
+
+        enter(func, context)          a KittenScript function starts running
+        exit(func, context)           it has returned or raised, or was
+                                      replaced by a call in tail position
+        builtin(func, args, elapsed)  a built-in function returned after
+                                      elapsed nanoseconds
+        include(path)                 a .kst module is included
+        error(error)                  a runtime error leaves a function or
+                                      the program, reported once
+        node(node, context)           a syntax tree node is evaluated
+
+    The engines report to it through InstrumentedInterpreter and
+    InstrumentedClosureCompiler, and only the events some consumer handles
+    are hooked, so node events cost nothing unless they are wanted and a
+    runtime without instrumentation runs the plain engines.
+    """
+    def __init__(self, *consumers):
+        self.callbacks = {event: [] for event in EVENTS}
+        self.builtins = {}  # id(内置函数) -> 报告调用的包装
+        self.last_error = None
+        for consumer in consumers:
+            self.add(consumer)
+
+    def add(self, consumer):
+        for event in EVENTS:
+            callback = getattr(consumer, event, None)
+            if callback is not None:
+                self.callbacks[event].append(callback)
+
+    def engine(self, name):
+        # 返回执行name引擎时使用的插桩版引擎
+        if name == 'vm':
+            raise ValueError('the vm engine cannot be instrumented, use tree or closure')
+        return InstrumentedClosureCompiler(self) if name == 'closure' else InstrumentedInterpreter(self)
+
+    def enter(self, func, context):
+        for callback in self.callbacks['enter']:
+            callback(func, context)
+
+    def exit(self, func, context):
+        for callback in self.callbacks['exit']:
+            callback(func, context)
+
+    def include(self, path):
+        for callback in self.callbacks['include']:
+            callback(path)
+
+    def error(self, error):
+        # 错误逐层离开函数时只在最内层报告一次
+        if error is self.last_error:
+            return
+        self.last_error = error
+        for callback in self.callbacks['error']:
+            callback(error)
+
+    def hooked(self, func):
+        # 返回代替func被调用的包装，没有内置函数钩子时返回func本身
+        if not self.callbacks['builtin']:
+            return func
+        wrapper = self.builtins.get(id(func))
+        if wrapper is None:
+            wrapper = self.builtins[id(func)] = HookedBuiltInFunction(func, self.callbacks['builtin'])
+        wrapper.context = func.context
+        return wrapper
+
+
+class HookedBuiltInFunction(BuiltInFunction):
+    """
+    Stands in for a built-in function at a call site and reports the call
+    and its duration to the builtin hooks.
+    """
+    def __init__(self, builtin, callbacks):
+        super().__init__(builtin.func, builtin.name)
+        self.builtin = builtin  # 同时保证id(builtin)不会被重用
+        self.callbacks = callbacks
+
+    def call(self, args, context, pos_start, pos_end):
+        start = perf_counter_ns()
+        try:
+            return super().call(args, context, pos_start, pos_end)
+        finally:
+            elapsed = perf_counter_ns() - start
+            for callback in self.callbacks:
+                callback(self.builtin, args, elapsed)
+
+
+class InstrumentedInterpreter(Interpreter):
+    """
+    A tree-walking interpreter that reports its events to an
+    Instrumentation.
+    """
+    def __init__(self, instrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+        if instrumentation.callbacks['node']:
+            self.visit = self.visit_hooked
+
+    def execute(self, node, context):
+        res = super().execute(node, context)
+        if res.error:
+            self.instrumentation.error(res.error)
+        return res
+
+    def evaluate(self, func, context):
+        instrumentation = self.instrumentation
+        instrumentation.enter(func, context)
+        try:
+            return super().evaluate(func, context)
+        except ErrorSignal as signal:
+            instrumentation.error(signal.error)
+            raise
+        finally:
+            instrumentation.exit(func, context)
+
+    def visit_hooked(self, node, context):
+        for callback in self.instrumentation.callbacks['node']:
+            callback(node, context)
+        return Interpreter.visit(self, node, context)
+
+    def call(self, func, args, node, context):
+        if type(func) is BuiltInFunction:
+            func = self.instrumentation.hooked(func)
+        return super().call(func, args, node, context)
+
+
+class InstrumentedClosureCompiler(ClosureCompiler):
+    """
+    A closure compiler whose closures report their events to an
+    Instrumentation.
+    """
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+        if instrumentation.callbacks['node']:
+            self.compile = self.compile_hooked
+
+    def execute(self, node, context):
+        res = super().execute(node, context)
+        if res.error:
+            self.instrumentation.error(res.error)
+        return res
+
+    def evaluate(self, func, context):
+        instrumentation = self.instrumentation
+        instrumentation.enter(func, context)
+        try:
+            return func.code(context)
+        except ErrorSignal as signal:
+            instrumentation.error(signal.error)
+            raise
+        finally:
+            instrumentation.exit(func, context)
+
+    def compile_hooked(self, node):
+        code = ClosureCompiler.compile(self, node)
+        callbacks = self.instrumentation.callbacks['node']
+
+        def hooked(context):
+            for callback in callbacks:
+                callback(node, context)
+            return code(context)
+        return hooked
+
+    def compile_callee(self, node):
+        code = super().compile_callee(node)
+        instrumentation = self.instrumentation
+        if not instrumentation.callbacks['builtin']:
+            return code
+
+        def callee(context):
+            func = code(context)
+            if type(func) is BuiltInFunction:
+                return instrumentation.hooked(func)
+            return func
+        return callee
+
+
+class NodeCounter(object):
+    """
+    Counts the evaluated syntax tree nodes by type.
+    """
+    def __init__(self):
+        self.counts = {}
+
+    def node(self, node, _):
+        name = type(node).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def report(self, out=None):
+        out = sys.stderr if out is None else out
+        print(f'{"count":>10}  node', file=out)
+        for name, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+            print(f'{count:>10}  {name}', file=out)
+
+
+class BuiltinLatency(object):
+    """
+    A histogram of the duration of every built-in function: bucket i counts
+    the calls that took less than 2 ** i microseconds (and at least half of
+    that, except for bucket 0).
+    """
+    def __init__(self):
+        self.histograms = {}  # 名字 -> [调用次数, 总时间, 各个桶的计数]
+
+    def builtin(self, func, _, elapsed):
+        stats = self.histograms.get(func.name)
+        if stats is None:
+            stats = self.histograms[func.name] = [0, 0, []]
+        stats[0] += 1
+        stats[1] += elapsed
+        buckets = stats[2]
+        bucket = (elapsed // 1000).bit_length()
+        if bucket >= len(buckets):
+            buckets.extend([0] * (bucket + 1 - len(buckets)))
+        buckets[bucket] += 1
+
+    def report(self, out=None):
+        out = sys.stderr if out is None else out
+        print(f'{"calls":>10} {"mean us":>10}  built-in function: calls under 1, 2, 4, ... us', file=out)
+        rows = sorted(self.histograms.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, total, buckets) in rows:
+            print(f'{calls:>10} {total / calls / 1000:>10.2f}  {name}: {" ".join(map(str, buckets))}', file=out)
@@ -0,0 +1,536 @@
+from .values import Number, String, Bool
+from .resolver import LocalResolver
+from .. import constants
+from ..parse import nodes
+
+# 指令集
+# Every instruction takes two slots of CodeObject.code: the opcode and a
+# single integer argument (0 when unused).
+LOAD_CONST = 0  # consts[arg] = prototype value, see Single.instance
+LOAD_NULL = 1
+LOAD_NAME = 2
+LOOKUP_NAME = 3  # like LOAD_NAME but without updating the position
+STORE_NAME = 4
+STORE_CONST_NAME = 5
+DELETE_NAME = 6
+INCREMENT_NAME = 7
+DECREMENT_NAME = 8
+POP_TOP = 9
+LOCATE = 10  # set the position and context of TOS
+BINARY_OP = 11  # consts[arg] is the operator token type
+UNARY_OP = 12
+INDEX = 13
+GET_ATTR = 14
+SET_ATTR = 15
+BUILD_LIST = 16
+BUILD_DICT = 17
+LIST_APPEND = 18  # append TOS to the list value arg entries below it
+JUMP = 19
+POP_JUMP_IF_FALSE = 20
+POP_JUMP_IF_TRUE = 21
+OR_JUMP = 22  # jump if TOS.get() is truthy, else pop
+AND_JUMP = 23  # jump if TOS is false, else pop
+CHECK_NUMBER = 24
+FOR_SETUP = 25
+FOR_ITER = 26
+CONST_LOOP_ERROR = 27
+SETUP_LOOP = 28
+SETUP_TRY = 29
+SETUP_FINALLY = 30
+POP_BLOCK = 31
+BREAK_LOOP = 32
+CONTINUE_LOOP = 33
+CATCH = 34
+RERAISE = 35
+MAKE_FUNCTION = 36
+CALL = 37
+RETURN_VALUE = 38
+SWITCH_MATCH = 39
+ASSERT = 40
+THROW = 41
+THROW_EMPTY = 42
+EXIT = 43
+INCLUDE = 44
+ENTER_NAMESPACE = 45
+EXIT_NAMESPACE = 46
+USING = 47
+MAKE_STRUCT = 48
+NEW = 49
+LOAD_FAST = 50  # 读取函数帧的局部变量槽位
+STORE_FAST = 51
+TAIL_CALL = 52  # 被调用的是KittenScript函数时用新帧替换当前帧，否则执行随后的CALL
+AWAIT = 53  # 等待TOS完成，用结果替换它；arg为1时在async函数体中，挂起协程
+YIELD_VALUE = 54  # 把TOS交给生成器的消费者，用null替换它
+
+OPNAMES = {
+    value: name for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int)
+}
+
+# 运行时块类型
+LOOP_BLOCK = 0
+TRY_BLOCK = 1
+FINALLY_BLOCK = 2
+NAMESPACE_BLOCK = 3
+
+
+class CodeObject(object):
+    """
+    编译后的代码对象
+    code is a flat list of integers where code[pc] is an opcode and
+    code[pc + 1] its argument; positions[pc >> 1] holds the
+    (pos_start, pos_end) pair of the node each instruction came from.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.code = []
+        self.consts = []
+        self.names = []
+        self.positions = []
+        self.varnames = []  # 局部变量名，下标即槽位
+        self.index = {}  # 局部变量名到槽位
+
+    def __repr__(self):
+        return f'<code {self.name}>'
+
+    def dis(self):
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            line = f'{pc:>6} {OPNAMES[op]:<18} {arg}'
+            if op in (LOAD_NAME, LOOKUP_NAME, STORE_NAME, STORE_CONST_NAME, DELETE_NAME,
+                      INCREMENT_NAME, DECREMENT_NAME, GET_ATTR, SET_ATTR, FOR_SETUP,
+                      ENTER_NAMESPACE, EXIT_NAMESPACE, CONST_LOOP_ERROR):
+                line += f' ({self.names[arg]})'
+            elif op in (LOAD_FAST, STORE_FAST):
+                line += f' ({self.varnames[arg]})'
+            elif op in (LOAD_CONST, BINARY_OP, UNARY_OP, CATCH, USING, MAKE_STRUCT, NEW):
+                line += f' ({self.consts[arg]!r})'
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+class BytecodeCompiler(object):
+    """
+    字节码编译器
+    Translates the AST produced by Parser.parse() into CodeObjects for the
+    VirtualMachine. Every compile_* method leaves exactly one value on the
+    stack; compile_discard() evaluates a node for its side effects only.
+    """
+    def __init__(self):
+        self.code = None
+        self.blocks = []  # 编译期块栈，与运行时块栈一一对应
+        self.names = {}
+        self.locals = None  # 当前可以按槽位存取的局部变量
+        self.in_async = False  # 正在编译async函数体
+
+    def compile_program(self, node, name='<program>'):
+        self.code = CodeObject(name)
+        self.blocks = []
+        self.names = {}
+        self.locals = None
+        self.in_async = False
+        self.compile(node)
+        self.emit(RETURN_VALUE, 0, node)
+        return self.code
+
+    def compile_function(self, node, name, arg_names, should_auto_return, is_async=False):
+        code, blocks, names, locals_, in_async = self.code, self.blocks, self.names, self.locals, self.in_async
+        try:
+            self.code = CodeObject(name)
+            self.code.index = LocalResolver().resolve(arg_names, node)
+            self.code.varnames = list(self.code.index)
+            self.blocks = []
+            self.names = {}
+            self.locals = self.code.index
+            self.in_async = is_async
+            if should_auto_return:
+                if type(node) is nodes.CallNode:
+                    self.compile_tail_call(node)
+                else:
+                    self.compile(node)
+            else:
+                self.compile_discard(node)
+                self.emit(LOAD_NULL, 0, node)
+            self.emit(RETURN_VALUE, 0, node)
+            return self.code
+        finally:
+            self.code, self.blocks, self.names, self.locals, self.in_async = code, blocks, names, locals_, in_async
+
+    def emit(self, op, arg=0, node=None):
+        index = len(self.code.code)
+        self.code.code.append(op)
+        self.code.code.append(arg)
+        self.code.positions.append(
+            (node.pos_start, node.pos_end) if node is not None else (None, None)
+        )
+        return index
+
+    def label(self):
+        return len(self.code.code)
+
+    def patch(self, index, target=None):
+        self.code.code[index + 1] = self.label() if target is None else target
+
+    def name(self, name):
+        if name not in self.names:
+            self.names[name] = len(self.code.names)
+            self.code.names.append(name)
+        return self.names[name]
+
+    def const(self, value):
+        self.code.consts.append(value)
+        return len(self.code.consts) - 1
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        if not hasattr(self, method_name):
+            raise AttributeError(f'No compile method named {method_name}')
+        getattr(self, method_name)(node)
+
+    def compile_discard(self, node):
+        if isinstance(node, nodes.ListNode) and node.is_block:
+            for item in node.items:
+                self.compile_discard(item)
+            return
+        self.compile(node)
+        self.emit(POP_TOP, 0, node)
+
+    def compile_body(self, node, want):
+        # want为False时只编译副作用，不在栈上留下值
+        if want:
+            self.compile(node)
+        else:
+            self.compile_discard(node)
+
+    def compile_NumberNode(self, node):
+        self.emit(LOAD_CONST, self.const(Number(node.token.value)), node)
+
+    def compile_StringNode(self, node):
+        self.emit(LOAD_CONST, self.const(String(node.token.value)), node)
+
+    def compile_BoolNode(self, node):
+        self.emit(LOAD_CONST, self.const(Bool(node.token.value)), node)
+
+    def compile_NullNode(self, node):
+        self.emit(LOAD_NULL, 0, node)
+
+    def compile_BinaryOpNode(self, node):
+        self.compile(node.left)
+        self.compile(node.right)
+        self.emit(BINARY_OP, self.const(node.op.type), node)
+
+    def compile_UnaryOpNode(self, node):
+        self.compile(node.right)
+        self.emit(UNARY_OP, self.const(node.op.type), node)
+
+    def compile_AwaitNode(self, node):
+        self.compile(node.value)
+        self.emit(AWAIT, int(self.in_async), node)
+
+    def compile_VarAccessNode(self, node):
+        var_name = node.var_name.value
+        if self.locals is not None and var_name in self.locals:
+            self.emit(LOAD_FAST, self.locals[var_name], node)
+        else:
+            self.emit(LOAD_NAME, self.name(var_name), node)
+
+    def compile_VarAssignNode(self, node):
+        var_name = node.var_name.value
+        self.compile(node.value)
+        if self.locals is not None and var_name in self.locals:
+            self.emit(STORE_FAST, self.locals[var_name], node)
+        elif var_name.startswith('CONST'):
+            self.emit(STORE_CONST_NAME, self.name(var_name), node)
+        else:
+            self.emit(STORE_NAME, self.name(var_name), node)
+
+    def compile_IfNode(self, node):
+        ends = []
+        for condition, comp, should_return_null in node.cases:
+            self.compile(condition)
+            jump = self.emit(POP_JUMP_IF_FALSE, 0, condition)
+            self.compile_body(comp, not should_return_null)
+            self.emit(LOAD_NULL if should_return_null else LOCATE, 0, node)
+            ends.append(self.emit(JUMP, 0, node))
+            self.patch(jump)
+        if node.else_case:
+            else_case, should_return_null = node.else_case
+            self.compile_body(else_case, not should_return_null)
+            self.emit(LOAD_NULL if should_return_null else LOCATE, 0, node)
+        else:
+            self.emit(LOAD_NULL, 0, node)
+        for jump in ends:
+            self.patch(jump)
+
+    def compile_loop_body(self, node, list_distance):
+        self.blocks.append((LOOP_BLOCK, None))
+        if node.should_return_null:
+            self.compile_discard(node.body)
+        else:
+            self.compile(node.body)
+            self.emit(LIST_APPEND, list_distance, node)
+        self.blocks.pop()
+
+    def compile_ForNode(self, node):
+        var_name = node.var_name.value
+        if var_name.startswith('CONST'):
+            self.emit(CONST_LOOP_ERROR, self.name(var_name), node)
+        if not node.should_return_null:
+            self.emit(BUILD_LIST, 0, node)
+        for value, default in ((node.start_value, 0), (node.end_value, None), (node.step_value, 1)):
+            if value is None:
+                self.emit(LOAD_CONST, self.const(Number(default)), node)
+            else:
+                self.compile(value)
+                self.emit(CHECK_NUMBER, 0, value)
+        self.emit(FOR_SETUP, self.name(var_name), node)
+        setup = self.emit(SETUP_LOOP, 0, node)
+        head = self.emit(FOR_ITER, 0, node)
+        self.compile_loop_body(node, 2)
+        self.emit(JUMP, head, node)
+        self.patch(head)
+        self.emit(POP_BLOCK, 0, node)
+        if node.else_body:
+            self.compile_discard(node.else_body)
+        self.patch(setup)
+        self.emit(POP_TOP, 0, node)
+        if node.should_return_null:
+            self.emit(LOAD_NULL, 0, node)
+
+    def compile_WhileNode(self, node):
+        if not node.should_return_null:
+            self.emit(BUILD_LIST, 0, node)
+        setup = self.emit(SETUP_LOOP, 0, node)
+        head = self.label()
+        self.compile(node.condition)
+        jump = self.emit(POP_JUMP_IF_FALSE, 0, node)
+        self.compile_loop_body(node, 1)
+        self.emit(JUMP, head, node)
+        self.patch(jump)
+        self.emit(POP_BLOCK, 0, node)
+        if node.else_body:
+            self.compile_discard(node.else_body)
+        self.patch(setup)
+        if node.should_return_null:
+            self.emit(LOAD_NULL, 0, None)
+
+    def compile_ExitNode(self, node):
+        if node.status is not None:
+            self.compile(node.status)
+        self.emit(EXIT, int(node.status is not None), node)
+
+    def compile_ThrowNode(self, node):
+        if not node.details:
+            self.emit(THROW_EMPTY, 0, node)
+            return
+        self.compile(node.details)
+        self.compile(node.error_name)
+        self.emit(THROW, 0, node)
+
+    def compile_FunctionNode(self, node):
+        self.emit(MAKE_FUNCTION, self.const(self.function_info(node)), node)
+
+    def function_info(self, node):
+        # MAKE_FUNCTION的常量：(函数名, 函数体, 参数名, 是否自动返回, CodeObject, 是否async, 是否生成器)
+        func_name = (
+            node.func_name if isinstance(node.func_name, str) else
+            node.func_name.value
+        )
+        arg_names = [i.value for i in node.arg_name]
+        code = self.compile_function(node.body, func_name, arg_names, node.should_auto_return, node.is_async)
+        return func_name, node.body, arg_names, node.should_auto_return, code, node.is_async, node.is_generator
+
+    def compile_CallNode(self, node):
+        self.compile(node.func)
+        for arg in node.arguments:
+            self.compile(arg)
+        self.emit(CALL, len(node.arguments), node)
+
+    def compile_tail_call(self, node):
+        self.compile(node.func)
+        for arg in node.arguments:
+            self.compile(arg)
+        self.emit(TAIL_CALL, len(node.arguments), node)
+        self.emit(CALL, len(node.arguments), node)
+
+    def compile_IndexNode(self, node):
+        self.compile(node.list)
+        self.compile(node.index)
+        self.emit(INDEX, 0, node)
+
+    def compile_ListNode(self, node):
+        for item in node.items:
+            self.compile(item)
+        self.emit(BUILD_LIST, len(node.items), node)
+
+    def compile_DictNode(self, node):
+        for key, value in node.items.items():
+            self.compile(key)
+            self.compile(value)
+        self.emit(BUILD_DICT, len(node.items), node)
+
+    def compile_IncludeNode(self, node):
+        self.compile(node.module)
+        self.emit(INCLUDE, self.const(node), node)
+
+    def unwind_blocks(self, to_loop, node):
+        # 为return/break/continue生成离开块的指令，并内联finally块
+        blocks = self.blocks
+        try:
+            for index in range(len(blocks) - 1, -1, -1):
+                kind, finally_body = blocks[index]
+                if kind == LOOP_BLOCK and to_loop:
+                    return
+                self.emit(POP_BLOCK, 0, node)
+                if kind == FINALLY_BLOCK:
+                    self.blocks = blocks[:index]
+                    self.compile_discard(finally_body)
+        finally:
+            self.blocks = blocks
+
+    def compile_ReturnNode(self, node):
+        if (
+            self.locals is not None and type(node.return_value) is nodes.CallNode
+            and all(kind == LOOP_BLOCK for kind, _ in self.blocks)
+        ):
+            # 函数体中不在try或namespace里的return f(...)
+            self.compile_tail_call(node.return_value)
+        elif node.return_value:
+            self.compile(node.return_value)
+        else:
+            self.emit(LOAD_NULL, 0, node)
+        self.unwind_blocks(False, node)
+        self.emit(RETURN_VALUE, 0, node)
+
+    def compile_YieldNode(self, node):
+        if node.value:
+            self.compile(node.value)
+        else:
+            self.emit(LOAD_NULL, 0, node)
+        self.emit(YIELD_VALUE, 0, node)
+
+    def compile_ContinueNode(self, node):
+        if any(kind == LOOP_BLOCK for kind, _ in self.blocks):
+            self.unwind_blocks(True, node)
+        self.emit(CONTINUE_LOOP, 0, node)
+
+    def compile_BreakNode(self, node):
+        if any(kind == LOOP_BLOCK for kind, _ in self.blocks):
+            self.unwind_blocks(True, node)
+        self.emit(BREAK_LOOP, 0, node)
+
+    def compile_TryNode(self, node):
+        want = not node.should_return_null
+        finally_setup = None
+        if node.finally_body:
+            finally_setup = self.emit(SETUP_FINALLY, 0, node)
+            self.blocks.append((FINALLY_BLOCK, node.finally_body))
+
+        try_setup = self.emit(SETUP_TRY, 0, node)
+        self.blocks.append((TRY_BLOCK, None))
+        self.compile_body(node.try_body, want)
+        self.blocks.pop()
+        self.emit(POP_BLOCK, 0, node)
+        if node.else_body:
+            self.compile_discard(node.else_body)
+        jump = self.emit(JUMP, 0, node)
+
+        self.patch(try_setup)
+        names = (node.catch_name.value, node.catch_details.value)
+        self.emit(CATCH, self.const(names), node)
+        self.compile_body(node.catch_body, want)
+        self.patch(jump)
+
+        if node.finally_body:
+            self.blocks.pop()
+            self.emit(POP_BLOCK, 0, node)
+            self.compile_discard(node.finally_body)
+            end = self.emit(JUMP, 0, node)
+            self.patch(finally_setup)
+            self.compile_discard(node.finally_body)
+            self.emit(RERAISE, 0, node)
+            self.patch(end)
+
+        self.emit(LOCATE if want else LOAD_NULL, 0, node)
+
+    def compile_DeleteNode(self, node):
+        self.emit(DELETE_NAME, self.name(node.var_name.value), node)
+
+    def compile_AssertNode(self, node):
+        self.compile(node.condition)
+        if node.details:
+            self.compile(node.details)
+        self.emit(ASSERT, int(bool(node.details)), node)
+
+    def compile_SwitchNode(self, node):
+        want = node.should_auto_return
+        self.compile(node.condition)
+        ends = []
+        for expr, body, unless in node.cases:
+            self.compile(expr)
+            jumps = [self.emit(SWITCH_MATCH, 0, node)]
+            if unless:
+                self.compile(unless)
+                jumps.append(self.emit(POP_JUMP_IF_TRUE, 0, node))
+            self.emit(POP_TOP, 0, node)
+            self.compile_body(body, want)
+            self.emit(LOCATE if want else LOAD_NULL, 0, node)
+            ends.append(self.emit(JUMP, 0, node))
+            for jump in jumps:
+                self.patch(jump)
+        self.emit(POP_TOP, 0, node)
+        if node.default:
+            self.compile_body(node.default, want)
+            self.emit(LOCATE if want else LOAD_NULL, 0, node)
+        else:
+            self.emit(LOAD_NULL, 0, node)
+        for jump in ends:
+            self.patch(jump)
+
+    def compile_OrNode(self, node):
+        self.compile(node.left)
+        jump = self.emit(OR_JUMP, 0, node)
+        self.compile(node.right)
+        self.patch(jump)
+        self.emit(LOCATE, 0, node)
+
+    def compile_AndNode(self, node):
+        self.compile(node.left)
+        jump = self.emit(AND_JUMP, 0, node)
+        self.compile(node.right)
+        self.patch(jump)
+
+    def compile_AttrAccessNode(self, node):
+        self.compile(node.class_name)
+        self.emit(GET_ATTR, self.name(node.attr_name.value), node)
+
+    def compile_AttrAssignNode(self, node):
+        self.emit(LOOKUP_NAME, self.name(node.class_name.value), node)
+        self.compile(node.value)
+        self.emit(SET_ATTR, self.name(node.attr_name.value), node)
+
+    def compile_NamespaceNode(self, node):
+        name = self.name(node.namespace_name.value)
+        self.emit(ENTER_NAMESPACE, name, node)
+        self.blocks.append((NAMESPACE_BLOCK, None))
+        locals_, self.locals = self.locals, None
+        self.compile_discard(node.body)
+        self.locals = locals_
+        self.blocks.pop()
+        self.emit(EXIT_NAMESPACE, name, node)
+
+    def compile_UsingNode(self, node):
+        func_name = None if node.func_name.type == constants.MUL else node.func_name.value
+        self.emit(USING, self.const((node.namespace_name.value, func_name)), node)
+
+    def compile_VarAutoincrementNode(self, node):
+        op = INCREMENT_NAME if node.op.type == constants.PLUS else DECREMENT_NAME
+        self.emit(op, self.name(node.var_name.value), node)
+
+    def compile_StructNode(self, node):
+        name = node.name.value if node.name else None
+        self.emit(MAKE_STRUCT, self.const((name, [i.value for i in node.attrs])), node)
+
+    def compile_NewNode(self, node):
+        self.emit(NEW, self.const((node.name.value, str(node.name))), node)
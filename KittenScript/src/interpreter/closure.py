@@ -0,0 +1,774 @@
+import sys
+
+from .context import Context
+from .table import SymbolTable, lookup
+from .flow import ErrorSignal, ReturnSignal, BreakSignal, ContinueSignal, TailCallSignal
+from .interpreter import RTResult, Interpreter, Function, MemberFunction, suspendable_function
+from .values import (
+    null, Number, String, Bool, List, Dict,
+    Value, auto, locate, Namespace, Struct, number_range
+)
+from .. import constants, errors
+from ..parse.nodes import CallNode
+
+not_found = SymbolTable.not_found
+
+
+class CompiledFunction(Function):
+    """
+    A KittenScript function whose body has been compiled into a closure.
+    """
+    def __init__(self, name, body, arg_names, should_auto_return, code):
+        super().__init__(name, body, arg_names, should_auto_return)
+        self.code = code
+
+    def copy(self):
+        func = (
+            CompiledFunction(self.name, self.body, self.arg_names, self.should_auto_return, self.code)
+            .set_pos(self.pos_start, self.pos_end)
+            .set_context(self.context)
+        )
+        func.engine = self.engine
+        return func
+
+
+class ClosureCompiler(object):
+    """
+    闭包编译执行引擎
+    Compiles the AST produced by Parser.parse() once into a tree of nested
+    Python closures. Every closure takes the running Context and returns a
+    Value; runtime errors, return, break and continue travel as FlowSignal
+    exceptions instead of being checked after every node.
+    """
+    run_func = None
+    await_func = None  # 运行时提供的await实现，见coroutine.EventLoop.wait
+    machine = None  # 执行async函数和生成器函数的VirtualMachine，见suspendable_function
+    tail = False  # 正在编译函数体，且不在try或namespace中
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        if not hasattr(self, method_name):
+            raise AttributeError(f'No compile method named {method_name}')
+        return getattr(self, method_name)(node)
+
+    def execute(self, node, context):
+        res = RTResult()
+        code = self.compile(node)
+        try:
+            return res.success(code(context))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+
+    @staticmethod
+    def evaluate(func, context):
+        return func.code(context)
+
+    @staticmethod
+    def compile_NumberNode(node):
+        value = Number(node.token.value)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def number(context):
+            return value.instance(pos_start, pos_end, context)
+        return number
+
+    @staticmethod
+    def compile_StringNode(node):
+        value = String(node.token.value)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def string(context):
+            return value.instance(pos_start, pos_end, context)
+        return string
+
+    @staticmethod
+    def compile_BoolNode(node):
+        value = Bool(node.token.value)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def boolean(context):
+            return value.instance(pos_start, pos_end, context)
+        return boolean
+
+    @staticmethod
+    def compile_NullNode(node):
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def null_(context):
+            return null.instance(pos_start, pos_end, context)
+        return null_
+
+    def compile_BinaryOpNode(self, node):
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        op = node.op.type
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def binary_op(context):
+            result, error = left(context).binary_op(op, right(context))
+            if error:
+                raise ErrorSignal(error)
+            value = result if isinstance(result, Value) else auto(result)
+            value.pos_start = pos_start
+            value.pos_end = pos_end
+            value.context = context
+            return value
+        return binary_op
+
+    def compile_UnaryOpNode(self, node):
+        right = self.compile(node.right)
+        op = node.op.type
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def unary_op(context):
+            result, error = right(context).unary_op(op)
+            if error:
+                raise ErrorSignal(error)
+            return locate(auto(result), pos_start, pos_end, context)
+        return unary_op
+
+    def compile_YieldNode(self, node):
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def yield_(context):
+            # 生成器函数的函数体由vm执行，这里只会是不带生成器标记的函数，如工作进程中定义的
+            raise ErrorSignal(errors.RTError(
+                pos_start, pos_end,
+                '"yield" outside generator', context
+            ))
+        return yield_
+
+    def compile_AwaitNode(self, node):
+        value_code = self.compile(node.value)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def await_(context):
+            result = self.await_func(value_code(context), context, pos_start, pos_end)
+            return locate(auto(result), pos_start, pos_end, context)
+        return await_
+
+    @staticmethod
+    def compile_VarAccessNode(node):
+        var_name = node.var_name.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def var_access(context):
+            table = context.symbol_table
+            value = table.symbols.get(var_name, not_found)
+            if value is not_found:
+                value = lookup(table.parent, var_name)
+                if value is not_found:
+                    raise ErrorSignal(errors.VariableError(
+                        pos_start, pos_end,
+                        f'"{var_name}" is not defined', context
+                    ))
+            if not isinstance(value, Value):
+                value = auto(value)
+            value.pos_start = pos_start
+            value.pos_end = pos_end
+            value.context = context
+            return value
+        return var_access
+
+    def compile_VarAssignNode(self, node):
+        var_name = node.var_name.value
+        code = self.compile(node.value)
+        is_const = var_name.startswith('CONST')
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def var_assign(context):
+            value = code(context)
+            if is_const and lookup(context.symbol_table, var_name) is not not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'cannot redefine the const variable {var_name}', context
+                ))
+            context.symbol_table.symbols[var_name] = value
+            return locate(auto(value), pos_start, pos_end, context)
+        return var_assign
+
+    def compile_IfNode(self, node):
+        cases = [
+            (self.compile(condition), self.compile(comp), should_return_null)
+            for condition, comp, should_return_null in node.cases
+        ]
+        else_case = None
+        if node.else_case:
+            else_case = (self.compile(node.else_case[0]), node.else_case[1])
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def if_(context):
+            for condition, comp, should_return_null in cases:
+                if condition(context).is_true():
+                    value = comp(context)
+                    if should_return_null:
+                        value = null.copy()
+                    return locate(value, pos_start, pos_end, context)
+            if else_case is not None:
+                value = else_case[0](context)
+                if else_case[1]:
+                    value = null.copy()
+                return locate(value, pos_start, pos_end, context)
+            return locate(null.copy(), pos_start, pos_end, context)
+        return if_
+
+    def compile_ForNode(self, node):
+        var_name = node.var_name.value
+        start_code = self.compile(node.start_value) if node.start_value is not None else None
+        end_code = self.compile(node.end_value)
+        step_code = self.compile(node.step_value) if node.step_value is not None else None
+        body = self.compile(node.body)
+        else_body = self.compile(node.else_body) if node.else_body else None
+        should_return_null = node.should_return_null
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def number_of(code, context):
+            value = code(context)
+            if not isinstance(value, Number):
+                raise ErrorSignal(errors.VariableError(
+                    value.pos_start, value.pos_end,
+                    'must be a number', context
+                ))
+            return value.get()
+
+        def for_(context):
+            if var_name.startswith('CONST'):
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'cannot use the const variable "{var_name}" here', context
+                ))
+            i = number_of(start_code, context) if start_code is not None else 0
+            end = number_of(end_code, context)
+            step = number_of(step_code, context) if step_code is not None else 1
+
+            symbols = context.symbol_table.symbols
+            elements = None if should_return_null else []
+            for i in number_range(i, end, step):
+                symbols[var_name] = Number(i)
+                try:
+                    value = body(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+                if elements is not None:
+                    elements.append(value)
+            else:
+                if else_body is not None:
+                    else_body(context)
+
+            if should_return_null:
+                return locate(null.copy(), pos_start, pos_end, context)
+            return locate(List(elements), pos_start, pos_end, context)
+        return for_
+
+    def compile_WhileNode(self, node):
+        condition = self.compile(node.condition)
+        body = self.compile(node.body)
+        else_body = self.compile(node.else_body) if node.else_body else None
+        should_return_null = node.should_return_null
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def while_(context):
+            elements = None if should_return_null else []
+            while condition(context).is_true():
+                try:
+                    value = body(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+                if elements is not None:
+                    elements.append(value)
+            else:
+                if else_body is not None:
+                    else_body(context)
+
+            if should_return_null:
+                return null.copy()
+            return locate(List(elements), pos_start, pos_end, context)
+        return while_
+
+    def compile_ExitNode(self, node):
+        status_code = self.compile(node.status) if node.status is not None else None
+
+        def exit_(context):
+            if status_code is None:
+                sys.exit()
+            status = status_code(context).get()
+            if isinstance(status, (int, float)):
+                sys.exit(int(status))
+            raise SystemExit(str(status))
+        return exit_
+
+    def compile_ThrowNode(self, node):
+        pos_start, pos_end = node.pos_start, node.pos_end
+        if not node.details:
+            def rethrow(context):
+                raise ErrorSignal(errors.RTError(
+                    pos_start, pos_end,
+                    'no active exception to throw', context
+                ))
+            return rethrow
+
+        details_code = self.compile(node.details)
+        error_name_code = self.compile(node.error_name)
+
+        def throw(context):
+            details = auto(details_code(context)).get()
+            error_name = auto(error_name_code(context))
+            if not isinstance(error_name, String):
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    'error name must be string', context
+                ))
+            error_name = error_name.get()
+            if not hasattr(errors, error_name):
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'no error named "{error_name}"', context
+                ))
+            if error_name == 'BaseError':
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    'cannot throw BaseError', context
+                ))
+            error_type = getattr(errors, error_name)
+            try:
+                error = error_type(pos_start, pos_end, details, context)
+            except (TypeError, ValueError, RuntimeError):
+                error = errors.RTError(
+                    pos_start, pos_end,
+                    'must throw a runtime-error', context
+                )
+            raise ErrorSignal(error)
+        return throw
+
+    def compile_FunctionNode(self, node):
+        if node.is_async or node.is_generator:
+            def suspendable(context):
+                func_value = suspendable_function(self, node, context)
+                context.symbol_table.symbols[func_value.name] = func_value
+                return func_value
+            return suspendable
+        func_name = (
+            node.func_name if isinstance(node.func_name, str) else
+            node.func_name.value
+        )
+        body = node.body
+        tail, self.tail = self.tail, True
+        try:
+            if node.should_auto_return and type(body) is CallNode:
+                code = self.compile_tail_call(body)
+            else:
+                code = self.compile(body)
+        finally:
+            self.tail = tail
+        arg_names = [i.value for i in node.arg_name]
+        should_auto_return = node.should_auto_return
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def function(context):
+            func_value = locate(
+                CompiledFunction(func_name, body, arg_names, should_auto_return, code),
+                pos_start, pos_end, context
+            )
+            func_value.engine = self
+            context.symbol_table.symbols[func_name] = func_value
+            return func_value
+        return function
+
+    def compile_callee(self, node):
+        # 编译被调用的函数表达式，子类可以在这里包装被调用的值
+        return self.compile(node)
+
+    def compile_CallNode(self, node):
+        func_code = self.compile_callee(node.func)
+        arguments = [self.compile(arg) for arg in node.arguments]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def call(context):
+            func = func_code(context)
+            args = [arg(context) for arg in arguments]
+            if isinstance(func, Function):
+                value = func.call(args, context, pos_start, pos_end)
+            else:
+                func = func.copy().set_pos(pos_start, pos_end)
+                res = func.execute(args, RTResult())
+                if res.error:
+                    raise ErrorSignal(res.error)
+                value = res.value
+            if not isinstance(value, Value):
+                value = auto(value)
+            value.pos_start = pos_start
+            value.pos_end = pos_end
+            value.context = context
+            return value
+        return call
+
+    def compile_tail_call(self, node):
+        func_code = self.compile_callee(node.func)
+        arguments = [self.compile(arg) for arg in node.arguments]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def tail_call(context):
+            func = func_code(context)
+            args = [arg(context) for arg in arguments]
+            if type(func) is CompiledFunction:
+                raise TailCallSignal(func, args, context, pos_start, pos_end)
+            if type(func) is MemberFunction and type(func.func) is CompiledFunction:
+                raise TailCallSignal(func.func, [func.value] + args, context, pos_start, pos_end)
+            if isinstance(func, Function):
+                value = func.call(args, context, pos_start, pos_end)
+            else:
+                func = func.copy().set_pos(pos_start, pos_end)
+                res = func.execute(args, RTResult())
+                if res.error:
+                    raise ErrorSignal(res.error)
+                value = res.value
+            return locate(auto(value), pos_start, pos_end, context)
+        return tail_call
+
+    def compile_IndexNode(self, node):
+        list_code = self.compile(node.list)
+        index_code = self.compile(node.index)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def index(context):
+            result, error = list_code(context).index_by(index_code(context))
+            if error:
+                raise ErrorSignal(error)
+            return locate(auto(result), pos_start, pos_end, context)
+        return index
+
+    def compile_ListNode(self, node):
+        items = [self.compile(item) for item in node.items]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def list_(context):
+            return locate(List([item(context) for item in items]), pos_start, pos_end, context)
+        return list_
+
+    def compile_DictNode(self, node):
+        items = [(self.compile(key), self.compile(value)) for key, value in node.items.items()]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def dict_(context):
+            result = {}
+            for key_code, value_code in items:
+                key = key_code(context).get()
+                value = value_code(context)
+                try:
+                    result[key] = value
+                except TypeError:
+                    raise ErrorSignal(errors.DictError(
+                        pos_start, pos_end,
+                        f'unhashable value: {key}', context
+                    ))
+            return locate(Dict(result), pos_start, pos_end, context)
+        return dict_
+
+    def compile_IncludeNode(self, node):
+        module_code = self.compile(node.module)
+        includer = Interpreter()
+        includer.run_func = self.run_func
+
+        def include(context):
+            res = includer.include_module(module_code(context), context, node)
+            if res.error:
+                raise ErrorSignal(res.error)
+            return res.value
+        return include
+
+    def compile_ReturnNode(self, node):
+        if self.tail and type(node.return_value) is CallNode:
+            value_code = self.compile_tail_call(node.return_value)
+        else:
+            value_code = self.compile(node.return_value) if node.return_value else None
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def return_(context):
+            value = value_code(context) if value_code is not None else null.copy()
+            raise ReturnSignal(locate(auto(value), pos_start, pos_end, context))
+        return return_
+
+    @staticmethod
+    def compile_ContinueNode(_):
+        def continue_(_):
+            raise ContinueSignal()
+        return continue_
+
+    @staticmethod
+    def compile_BreakNode(_):
+        def break_(_):
+            raise BreakSignal()
+        return break_
+
+    def compile_TryNode(self, node):
+        tail, self.tail = self.tail, False  # try中的调用返回后还要处理错误，不能替换帧
+        try:
+            try_body = self.compile(node.try_body)
+            catch_body = self.compile(node.catch_body)
+            else_body = self.compile(node.else_body) if node.else_body else None
+            finally_body = self.compile(node.finally_body) if node.finally_body else None
+        finally:
+            self.tail = tail
+        catch_name = node.catch_name.value
+        catch_details = node.catch_details.value
+        should_return_null = node.should_return_null
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def try_(context):
+            try:
+                try:
+                    value = try_body(context)
+                except ErrorSignal as signal:
+                    name, details = signal.error.catch()
+                    symbols = context.symbol_table.symbols
+                    symbols[catch_name] = String(name)
+                    symbols[catch_details] = String(details)
+                    value = catch_body(context)
+                else:
+                    if else_body is not None:
+                        else_body(context)
+            finally:
+                if finally_body is not None:
+                    finally_body(context)
+
+            if should_return_null:
+                value = null.copy()
+            return locate(value, pos_start, pos_end, context)
+        return try_
+
+    @staticmethod
+    def compile_DeleteNode(node):
+        var_name = node.var_name.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def delete(context):
+            value = context.symbol_table.remove(var_name)
+            if value is not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'"{var_name}" is not defined', context
+                ))
+            if var_name.startswith('CONST_'):
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'cannot delete the const variable {var_name}', context
+                ))
+            return locate(null.copy(), pos_start, pos_end, context)
+        return delete
+
+    def compile_AssertNode(self, node):
+        condition_code = self.compile(node.condition)
+        details_code = self.compile(node.details) if node.details else None
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def assert_(context):
+            condition = auto(condition_code(context))
+            details = ''
+            if details_code is not None:
+                details = auto(details_code(context)).get()
+            if not condition.is_true():
+                raise ErrorSignal(errors.AssertError(
+                    pos_start, pos_end, details, context
+                ))
+            return locate(null.copy(), pos_start, pos_end, context)
+        return assert_
+
+    def compile_SwitchNode(self, node):
+        condition_code = self.compile(node.condition)
+        cases = [
+            (self.compile(expr), self.compile(body), self.compile(unless) if unless else None)
+            for expr, body, unless in node.cases
+        ]
+        default_code = self.compile(node.default) if node.default else None
+        should_auto_return = node.should_auto_return
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def switch(context):
+            condition = auto(condition_code(context))
+            for expr_code, body_code, unless_code in cases:
+                ee, error = condition.ee_by(auto(expr_code(context)))
+                if error:
+                    raise ErrorSignal(error)
+                if not ee:
+                    continue
+                if unless_code is not None and auto(unless_code(context)).is_true():
+                    continue
+                body = auto(body_code(context))
+                if not should_auto_return:
+                    body = null.copy()
+                return locate(body, pos_start, pos_end, context)
+            if default_code is not None:
+                default = auto(default_code(context))
+                if not should_auto_return:
+                    default = null.copy()
+                return locate(default, pos_start, pos_end, context)
+            return locate(null.copy(), pos_start, pos_end, context)
+        return switch
+
+    def compile_OrNode(self, node):
+        left_code = self.compile(node.left)
+        right_code = self.compile(node.right)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def or_(context):
+            left = auto(left_code(context))
+            if left.get():
+                return locate(left, pos_start, pos_end, context)
+            return locate(auto(right_code(context)), pos_start, pos_end, context)
+        return or_
+
+    def compile_AndNode(self, node):
+        left_code = self.compile(node.left)
+        right_code = self.compile(node.right)
+
+        def and_(context):
+            left = auto(left_code(context))
+            if not left.is_true():
+                return left
+            return auto(right_code(context))
+        return and_
+
+    def compile_AttrAccessNode(self, node):
+        class_code = self.compile(node.class_name)
+        attr_name = node.attr_name.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def attr_access(context):
+            cls = class_code(context)
+            attr, error = cls.getattr(attr_name)
+            if error:
+                raise ErrorSignal(error)
+            if not isinstance(cls, Namespace):
+                if isinstance(attr, Function) and (not isinstance(attr, MemberFunction)):
+                    attr = attr.bind(cls)
+            return locate(attr, pos_start, pos_end, context)
+        return attr_access
+
+    def compile_AttrAssignNode(self, node):
+        class_name = node.class_name.value
+        attr_name = node.attr_name.value
+        value_code = self.compile(node.value)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def attr_assign(context):
+            cls = lookup(context.symbol_table, class_name)
+            if cls is not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'"{class_name}" is not defined', context
+                ))
+            value = value_code(context)
+            cls.setattr(attr_name, value)
+            return locate(value, pos_start, pos_end, context)
+        return attr_assign
+
+    def compile_NamespaceNode(self, node):
+        name = node.namespace_name.value
+        tail, self.tail = self.tail, False
+        try:
+            body = self.compile(node.body)
+        finally:
+            self.tail = tail
+        pos_start = node.pos_start
+
+        def namespace(context):
+            new_context = Context(f'{name}', context, pos_start)
+            new_context.symbol_table = SymbolTable(context.symbol_table)
+            body(new_context)
+            new_value = Namespace(name)
+            for key, value in new_context.symbol_table.symbols.items():
+                new_value.setattr(key, value)
+            context.symbol_table.symbols[name] = new_value
+            return new_value
+        return namespace
+
+    @staticmethod
+    def compile_UsingNode(node):
+        namespace_name = node.namespace_name.value
+        use_all = node.func_name.type == constants.MUL
+        attr_name = node.func_name.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def using(context):
+            namespace = lookup(context.symbol_table, namespace_name)
+            if namespace is not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'namespace "{namespace_name}" is not defined', context
+                ))
+            if not isinstance(namespace, Namespace):
+                raise ErrorSignal(errors.ClassError(
+                    pos_start, pos_end,
+                    f'"{namespace_name}" is not a namespace', context
+                ))
+            if use_all:
+                context.symbol_table.update(namespace.attrs)
+            else:
+                attr_value, error = namespace.getattr(attr_name)
+                if error:
+                    raise ErrorSignal(error)
+                context.symbol_table.symbols[attr_name] = attr_value
+            return null.copy()
+        return using
+
+    @staticmethod
+    def compile_VarAutoincrementNode(node):
+        name = node.var_name.value
+        increment = node.op.type == constants.PLUS
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def autoincrement(context):
+            val = lookup(context.symbol_table, name)
+            if val is not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'variable {name} is not defined', context
+                ))
+            if name.startswith('CONST_'):
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    'auto-increment or auto-decrement were not allowed to apply in const variables',
+                    context
+                ))
+            ans, error = val.plus_by(Number(1)) if increment else val.minus_by(Number(1))
+            if error:
+                raise ErrorSignal(error)
+            ans = auto(ans)
+            context.symbol_table.symbols[name] = ans
+            return locate(ans, pos_start, pos_end, context)
+        return autoincrement
+
+    @staticmethod
+    def compile_StructNode(node):
+        name = node.name.value if node.name else '<anonymous>'
+        attrs = [i.value for i in node.attrs]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def struct_(context):
+            struct = Struct(name, attrs)
+            if node.name:
+                context.symbol_table.symbols[name] = struct
+            return locate(struct, pos_start, pos_end, context)
+        return struct_
+
+    @staticmethod
+    def compile_NewNode(node):
+        name = node.name.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def new(context):
+            val = lookup(context.symbol_table, name)
+            if val is not_found:
+                raise ErrorSignal(errors.VariableError(
+                    pos_start, pos_end,
+                    f'struct {node.name} is not defined', context
+                ))
+            val, error = auto(val).new()
+            if error:
+                raise ErrorSignal(error)
+            return locate(auto(val), pos_start, pos_end, context)
+        return new
@@ -1,4 +1,7 @@
 class Context(object):
+    tail_calls = 0  # 被这个帧替换掉的尾调用帧数
+    tail = False  # 树遍历引擎中，处于尾部的调用能否替换这个帧
+    
     def __init__(self, display_name, parent=None, parent_entry_pos=None):
         self.display_name = display_name
         self.parent = parent
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+
+from .flow import ErrorSignal
+from .values import Value, _Getter, auto
+from .. import errors
+
+
+class Awaitable(Value):
+    """
+    A value that can be awaited: an operation of an async builtin, or the
+    call of an async function (Coroutine). factory returns the Python
+    awaitable that does the work; it is started on the event loop the first
+    time the value is awaited or gathered, and awaiting it again returns the
+    same result.
+    """
+    def __init__(self, factory, name):
+        self.factory = factory
+        self.name = name
+        self.task = None
+        super().__init__()
+
+    def __repr__(self):
+        return f'<awaitable {self.name}>'
+
+    def get(self):
+        return _Getter(self)
+
+    def copy(self):
+        return self  # 只会执行一次，复制后仍是同一个
+
+    def start(self):
+        # 只能在事件循环的线程中调用
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.factory())
+        return self.task
+
+
+class Coroutine(Awaitable):
+    """
+    The call of an async function. The body is run by the vm on the event
+    loop thread: at every await its frames are suspended, the loop waits
+    for the awaited value and goes on with other coroutines meanwhile, and
+    then the frames continue with the result. So one piece of KittenScript
+    code runs at a time, and all the waiting is done by the loop.
+    """
+    def __init__(self, func, args, context, pos_start, pos_end):
+        super().__init__(self.run, func.name)
+        self.body = func.machine.suspendable(func, args, context, pos_start, pos_end)
+
+    def __repr__(self):
+        return f'<coroutine {self.name}>'
+
+    async def run(self):
+        step, arg = self.body.send, None
+        while True:
+            try:
+                value = step(arg)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                if not isinstance(value, Awaitable):
+                    raise TypeError(f'{value!r} is not awaitable')
+                step, arg = self.body.send, await value.start()
+            except Exception as err:  # 在await处抛出，交给函数体的try处理
+                step, arg = self.body.throw, err
+
+
+async def resolve(value):
+    return await value.start()
+
+
+class EventLoop(object):
+    """
+    事件循环
+    The asyncio event loop of a runtime. It runs in a daemon thread of its
+    own, started the first time something is awaited, and every await of
+    the runtime waits on it.
+    """
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=loop.run_forever, name='KittenScript-loop', daemon=True)
+                self.thread.start()
+                self.loop = loop
+        return self.loop
+
+    def close(self):
+        # 停止事件循环并等待线程结束；之后再await会启动新的事件循环
+        with self.lock:
+            loop, self.loop = self.loop, None
+            if loop is None:
+                return
+            loop.call_soon_threadsafe(loop.stop)
+            self.thread.join()
+            self.thread = None
+            loop.close()
+
+    def wait(self, value, context, pos_start, pos_end):
+        """
+        Evaluates `await value` outside the body of an async function (there
+        the vm suspends the coroutine instead): the calling thread blocks
+        until the value is done. An error in the awaited value is raised
+        here. On the loop thread, in a function called by a coroutine, this
+        would wait for the loop forever, so it is an error.
+        """
+        try:
+            if not isinstance(value, Awaitable):
+                raise TypeError(f'{value!r} is not awaitable')
+            if threading.current_thread() is self.thread:
+                raise RuntimeError('await outside an async function cannot be used while a coroutine runs')
+            loop = self.loop or self.start()
+            return asyncio.run_coroutine_threadsafe(resolve(value), loop).result()
+        except ErrorSignal:
+            raise
+        except Exception as err:
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                str(err) or type(err).__name__, context
+            ))
+
+
+def sleep(seconds):
+    return Awaitable(lambda: asyncio.sleep(seconds), 'sleep')
+
+
+def in_executor(name, func, *args):
+    # asyncio没有异步文件操作，阻塞的调用交给事件循环的默认线程池
+    return Awaitable(lambda: asyncio.get_running_loop().run_in_executor(None, func, *args), name)
+
+
+def system(cmd):
+    async def shell():
+        process = await asyncio.create_subprocess_shell(cmd)
+        return await process.wait()
+    return Awaitable(shell, 'system_async')
+
+
+def gather(items):
+    """
+    Waits for all the awaitables at the same time and returns their results
+    in order. The first error is raised.
+    """
+    for item in items:
+        if not isinstance(item, Awaitable):
+            raise TypeError(f'{item!r} is not awaitable')
+
+    async def wait_all():
+        results = await asyncio.gather(*(item.start() for item in items))
+        return [auto(result) for result in results]
+    return Awaitable(wait_all, 'gather')
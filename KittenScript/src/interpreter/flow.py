@@ -0,0 +1,42 @@
+class FlowSignal(Exception):
+    """
+    非局部控制流信号
+    Base class of the exceptions used by the execution engines to leave an
+    expression early (runtime errors, return, break and continue).
+    """
+
+
+class ErrorSignal(FlowSignal):
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+
+class ReturnSignal(FlowSignal):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class TailCallSignal(FlowSignal):
+    """
+    尾调用信号
+    Raised by `return f(...)` instead of calling f, so that Function.call
+    can run f in place of the returning frame. context is the context the
+    call would have used as its parent.
+    """
+    def __init__(self, func, args, context, pos_start, pos_end):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.context = context
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+
+
+class BreakSignal(FlowSignal):
+    pass
+
+
+class ContinueSignal(FlowSignal):
+    pass
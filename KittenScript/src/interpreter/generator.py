@@ -0,0 +1,54 @@
+from .values import Value
+
+
+class Iterator(Value):
+    """
+    A lazy sequence: the items are produced one at a time, when they are
+    asked for. It is also a Python iterator, so builtins such as list() and
+    next() consume it, and it can only be consumed once.
+    """
+    def __init__(self, iterator, name):
+        self.iterator = iterator
+        self.name = name
+        super().__init__()
+
+    def __repr__(self):
+        return f'<iterator {self.name}>'
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.iterator)
+
+    def get(self):
+        return self
+
+    def copy(self):
+        return self  # 复制后仍消费同一个序列
+
+
+class Generator(Iterator):
+    """
+    The call of a function that contains yield. The body is run by the vm
+    in the thread that asks for the next item: yield suspends its frames
+    and hands the item over, and the next item continues them. A generator
+    that is discarded before the end simply drops its frames.
+    """
+    def __init__(self, func, args, context, pos_start, pos_end):
+        super().__init__(func.machine.suspendable(func, args, context, pos_start, pos_end), func.name)
+
+    def __repr__(self):
+        return f'<generator {self.name}>'
+
+
+def next_item(iterator, *default):
+    try:
+        return next(iterator)
+    except StopIteration:
+        if default:
+            return default[0]
+        raise ValueError('the iterator is exhausted') from None
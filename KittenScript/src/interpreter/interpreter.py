@@ -1,16 +1,20 @@
 import os
 import sys
 import traceback
-from functools import lru_cache
-
 from .context import Context
-from .table import SymbolTable
+from .table import SymbolTable, fold
+from .resolver import may_observe
+from .flow import ErrorSignal, ReturnSignal, BreakSignal, ContinueSignal, TailCallSignal
+from .bytecode import BytecodeCompiler
+from .coroutine import Coroutine
+from .generator import Generator
 from .values import (
     null, Single, Number, String, Bool,
     Value, List, Dict, auto, Namespace,
-    Struct
+    Struct, number_range, locate, ConstantPool
 )
 from .. import constants, errors
+from ..parse.nodes import CallNode
 
 
 class RTResult(object):
@@ -79,6 +83,9 @@ class Function(Value):
         def execute(self, *args):
             return self.func.execute(*args)
     
+    engine = None  # 定义函数的执行引擎，调用时由它执行函数体
+    bound = None  # 最近一次绑定到对象上的MemberFunction
+    
     def __init__(self, name, body, arg_names, should_auto_return):
         super().__init__()
         self.name = name
@@ -90,38 +97,74 @@ class Function(Value):
         return f'<function {self.name}>'
     
     def copy(self):
-        return (
+        func = (
             Function(self.name, self.body, self.arg_names, self.should_auto_return)
             .set_pos(self.pos_start, self.pos_end)
             .set_context(self.context)
         )
+        func.engine = self.engine
+        return func
+    
+    def bind(self, value):
+        # 同一个对象反复访问同一个方法时复用上次的MemberFunction
+        member = self.bound
+        if member is None or member.value is not value:
+            member = self.bound = MemberFunction(value, self)
+        return member
     
     def execute(self, args, res):
         res = RTResult()
-        interpreter = Interpreter()
-        new_context = Context(self.name, self.context, self.pos_start)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
-        
-        if len(args) != len(self.arg_names):
-            return res.failure(errors.FunctionError(
-                self.pos_start, self.pos_end,
-                f'must {len(self.arg_names)} values, not {len(args)}', self.context
-            ))
-        for i in range(len(args)):
-            arg_name = self.arg_names[i]
-            arg_value = args[i]
-            arg_value.set_context(new_context)
-            new_context.symbol_table.set(arg_name, arg_value)
-        
-        value = res.register(interpreter.visit(self.body, new_context))
-        if res.should_return() and res.func_return_value is None:
-            return res
-        return_value = (value if self.should_auto_return else None) or res.func_return_value or null.copy()
-        return res.success(return_value)
+        try:
+            value = self.call(args, self.context, self.pos_start, self.pos_end)
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+        return res.success(value)
+    
+    def call(self, args, context, pos_start, pos_end):
+        """
+        Calls the function in a new frame. A call in tail position raises
+        TailCallSignal, and the callee then runs in place of the finished
+        frame: when it was called from that frame, its variables are folded
+        into the scope of the new frame, so name lookup sees exactly what a
+        nested call would see, while the chain of tables stays short.
+        """
+        func, parent, entry_pos, scope, tail_calls = self, context, pos_start, context.symbol_table, 0
+        while True:
+            if len(args) != len(func.arg_names):
+                raise ErrorSignal(errors.FunctionError(
+                    pos_start, pos_end,
+                    f'must {len(func.arg_names)} values, not {len(args)}', context
+                ))
+            new_context = Context(func.name, parent, entry_pos)
+            new_context.tail_calls = tail_calls
+            new_context.symbol_table = SymbolTable(scope)
+            symbols = new_context.symbol_table.symbols
+            for arg_name, arg_value in zip(func.arg_names, args):
+                arg_value.context = new_context
+                symbols[arg_name] = arg_value
+            
+            try:
+                value = func.engine.evaluate(func, new_context)
+            except ReturnSignal as signal:
+                return signal.value
+            except TailCallSignal as signal:
+                func, args, context = signal.func, signal.args, signal.context
+                pos_start, pos_end = signal.pos_start, signal.pos_end
+                if context is new_context:
+                    # 从当前帧发起的尾调用：保留调用者，当前帧的变量并入新帧的作用域
+                    # 旧帧也改用合并后的符号表，免得引用它的值把所有旧帧串在一起
+                    scope = new_context.symbol_table = fold(new_context.symbol_table, parent.symbol_table)
+                    tail_calls += 1
+                else:
+                    parent, entry_pos, scope, tail_calls = context, pos_start, context.symbol_table, 0
+                continue
+            if func.should_auto_return:
+                return value
+            return null.copy()
     
     def get(self):
         return self.FunctionGetter(self)
-    
+
 
 class PythonFunction(Function):
     def __init__(self, py_func, name):
@@ -134,20 +177,20 @@ class PythonFunction(Function):
     def copy(self):
         return PythonFunction(self.func, self.name).set_pos(self.pos_start, self.pos_end).set_context(self.context)
     
-    def execute(self, args, res):
+    def call(self, args, context, pos_start, pos_end):
         try:
             result = self.func(*args)
         except (Exception, SystemExit) as err:
-            return res.failure(errors.FunctionError(
-                self.pos_start, self.pos_end,
-                f'error in python-function: {err}', self.context
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                f'error in python-function: {err}', context
             ))
         if not isinstance(result, Value):
-            return res.failure(errors.FunctionError(
-                self.pos_start, self.pos_end,
-                f'return value must be a value object', self.context
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                f'return value must be a value object', context
             ))
-        return res.success(result)
+        return result
     
 
 class BuiltInFunction(PythonFunction):
@@ -157,16 +200,18 @@ class BuiltInFunction(PythonFunction):
     def copy(self):
         return BuiltInFunction(self.func, self.name).set_pos(self.pos_start, self.pos_end).set_context(self.context)
     
-    def execute(self, args, res):
+    def call(self, args, context, pos_start, pos_end):
         try:
             args = [i.get() for i in args]
             result = self.func(*args)
+        except ErrorSignal:
+            raise  # 如list(生成器)中KittenScript代码的错误，保留原来的调用栈
         except (Exception, SystemExit) as err:
-            return res.failure(errors.FunctionError(
-                self.pos_start, self.pos_end,
-                str(err), self.context
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                str(err), context
             ))
-        return res.success(auto(result))
+        return auto(result)
     
     
 class MemberFunction(Function):
@@ -186,299 +231,339 @@ class MemberFunction(Function):
             set_attrs(self.attrs)
         )
     
-    def execute(self, args, res):
-        return super().execute([self.value] + args, res)
+    def call(self, args, context, pos_start, pos_end):
+        return self.func.call([self.value] + args, context, pos_start, pos_end)
+
+
+class AsyncFunction(Function):
+    """
+    An async function. Calling it checks the arguments and returns a
+    Coroutine, the body of func runs when the coroutine is awaited.
+    """
+    def __init__(self, func: Function):
+        self.func = func
+        super().__init__(func.name, func.body, func.arg_names, func.should_auto_return)
+    
+    def __repr__(self):
+        return f'<async function {self.name}>'
+    
+    def copy(self):
+        return AsyncFunction(self.func).set_pos(self.pos_start, self.pos_end).set_context(self.context)
+    
+    def call(self, args, context, pos_start, pos_end):
+        if len(args) != len(self.arg_names):
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                f'must {len(self.arg_names)} values, not {len(args)}', context
+            ))
+        return Coroutine(self.func, args, context, pos_start, pos_end)
+
+
+class GeneratorFunction(Function):
+    """
+    A function that contains yield. Calling it checks the arguments and
+    returns a Generator, the body of func runs as its items are asked for.
+    """
+    def __init__(self, func: Function):
+        self.func = func
+        super().__init__(func.name, func.body, func.arg_names, func.should_auto_return)
+    
+    def __repr__(self):
+        return f'<generator function {self.name}>'
+    
+    def copy(self):
+        return GeneratorFunction(self.func).set_pos(self.pos_start, self.pos_end).set_context(self.context)
+    
+    def call(self, args, context, pos_start, pos_end):
+        if len(args) != len(self.arg_names):
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                f'must {len(self.arg_names)} values, not {len(args)}', context
+            ))
+        return Generator(self.func, args, context, pos_start, pos_end)
+
+
+def suspendable_function(engine, node, context):
+    """
+    Defines the async or generator function of node for the tree or closure
+    engine. Only the frames of the vm can be suspended at an await or yield,
+    so the body is compiled to bytecode and run by a VirtualMachine of the
+    engine.
+    """
+    machine = engine.machine
+    if machine is None:
+        from .vm import VirtualMachine  # vm在导入时需要本模块
+        machine = engine.machine = VirtualMachine()
+        machine.run_func, machine.await_func = engine.run_func, engine.await_func
+    info = machine.functions.get(node)
+    if info is None:
+        info = machine.functions[node] = BytecodeCompiler().function_info(node)
+    return machine.make_function(info, node.pos_start, node.pos_end, context)
 
 
 class Interpreter(object):
+    """
+    树遍历解释器
+    Every visit method returns the Value of its node directly. Runtime
+    errors, return, break and continue leave the visit methods as
+    FlowSignal exceptions, so plain expressions do not have to allocate an
+    RTResult or check it after every subexpression. execute() turns the
+    outcome back into an RTResult for the callers of the engine.
+    """
     run_func = None
+    await_func = None  # 运行时提供的await实现，见coroutine.EventLoop.wait
+    machine = None  # 执行async函数和生成器函数的VirtualMachine，见suspendable_function
+    pool = ConstantPool()
+    
+    def __init__(self):
+        self.methods = {}
+    
+    def execute(self, node, context):
+        res = RTResult()
+        try:
+            return res.success(self.visit(node, context))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+    
+    def evaluate(self, func, context):
+        # 在已经准备好的调用帧中执行函数体
+        context.tail = True
+        if func.should_auto_return and type(func.body) is CallNode:
+            return self.tail_call(func.body, context)
+        return self.visit(func.body, context)
     
     def visit(self, node, context):
-        method_name = f'visit_{type(node).__name__}'
-        if not hasattr(self, method_name):
-            raise AttributeError(f'No visit method named {method_name}')
-        method = getattr(self, method_name)
+        method = self.methods.get(type(node))
+        if method is None:
+            method_name = f'visit_{type(node).__name__}'
+            if not hasattr(self, method_name):
+                raise AttributeError(f'No visit method named {method_name}')
+            method = self.methods[type(node)] = getattr(self, method_name)
         return method(node, context)
     
-    @staticmethod
-    @lru_cache(None)
-    def visit_NumberNode(node, context):
-        return RTResult().success(
-            Number(node.token.value)
-            .set_pos(node.pos_start, node.pos_end)
-            .set_context(context)
-        )
+    def visit_NumberNode(self, node, context):
+        return self.pool.load(node, Number, node.token.value, context)
     
-    @staticmethod
-    @lru_cache(None)
-    def visit_StringNode(node, context):
-        return RTResult().success(
-            String(node.token.value)
-            .set_pos(node.pos_start, node.pos_end)
-            .set_context(context)
-        )
+    def visit_StringNode(self, node, context):
+        return self.pool.load(node, String, node.token.value, context)
     
-    @staticmethod
-    @lru_cache(None)
-    def visit_BoolNode(node, context):
-        return RTResult().success(
-            Bool(node.token.value)
-            .set_pos(node.pos_start, node.pos_end)
-            .set_context(context)
-        )
+    def visit_BoolNode(self, node, context):
+        return self.pool.load(node, Bool, node.token.value, context)
     
     @staticmethod
-    @lru_cache(None)
     def visit_NullNode(node, context):
-        return RTResult().success(
-            null.copy()
-            .set_pos(node.pos_start, node.pos_end)
-            .set_context(context)
-        )
+        return null.instance(node.pos_start, node.pos_end, context)
     
     def visit_BinaryOpNode(self, node, context):
-        res = RTResult()
-        left = res.register(self.visit(node.left, context))
-        if res.should_return():
-            return res
-        
-        right = res.register(self.visit(node.right, context))
-        if res.should_return():
-            return res
-        
+        left = self.visit(node.left, context)
+        right = self.visit(node.right, context)
         result, error = left.binary_op(node.op.type, right)
         if error:
-            return res.failure(error)
-        return res.success(auto(result).set_pos(node.pos_start, node.pos_end).set_context(context))
+            raise ErrorSignal(error)
+        return locate(auto(result), node.pos_start, node.pos_end, context)
     
     def visit_UnaryOpNode(self, node, context):
-        res = RTResult()
-        num = res.register(self.visit(node.right, context))
-        if res.should_return():
-            return res
+        num = self.visit(node.right, context)
         result, error = num.unary_op(node.op.type)
         if error:
-            return res.failure(error)
-        
-        return res.success(auto(result).set_pos(node.pos_start, node.pos_end).set_context(context))
+            raise ErrorSignal(error)
+        return locate(auto(result), node.pos_start, node.pos_end, context)
+    
+    def visit_YieldNode(self, node, context):
+        # 生成器函数的函数体由vm执行，这里只会是不带生成器标记的函数，如工作进程中定义的
+        raise ErrorSignal(errors.RTError(
+            node.pos_start, node.pos_end,
+            '"yield" outside generator', context
+        ))
+    
+    def visit_AwaitNode(self, node, context):
+        value = self.visit(node.value, context)
+        result = self.await_func(value, context, node.pos_start, node.pos_end)
+        return locate(auto(result), node.pos_start, node.pos_end, context)
     
     @staticmethod
     def visit_VarAccessNode(node, context):
-        res = RTResult()
         var_name = node.var_name.value
         value = context.symbol_table.get(var_name)
         if value == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'"{var_name}" is not defined', context
             ))
-        value = auto(value).set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(value)
+        return locate(auto(value), node.pos_start, node.pos_end, context)
     
     def visit_VarAssignNode(self, node, context):
-        res = RTResult()
         var_name = node.var_name.value
-        value = res.register(self.visit(node.value, context))
-        if res.should_return():
-            return res
-
+        value = self.visit(node.value, context)
+        
         if var_name.startswith('CONST'):
             if context.symbol_table.get(var_name) != context.symbol_table.not_found:
-                return res.failure(errors.VariableError(
+                raise ErrorSignal(errors.VariableError(
                     node.pos_start, node.pos_end,
                     f'cannot redefine the const variable {var_name}', context
                 ))
         
         context.symbol_table.set(var_name, value)
-        return res.success(auto(value).set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(auto(value), node.pos_start, node.pos_end, context)
     
     def visit_IfNode(self, node, context):
-        res = RTResult()
-        
         for condition, comp, should_return_null in node.cases:
-            condition_value = res.register(self.visit(condition, context))
-            if res.should_return():
-                return res
-            
-            if condition_value.is_true():
-                comp_value = res.register(self.visit(comp, context))
-                if res.should_return():
-                    return res
-                return res.success(
-                    null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+            if self.visit(condition, context).is_true():
+                comp_value = self.visit(comp, context)
+                return (
+                    locate(null.copy(), node.pos_start, node.pos_end, context)
                     if should_return_null else
-                    comp_value.set_pos(node.pos_start, node.pos_end).set_context(context)
+                    locate(comp_value, node.pos_start, node.pos_end, context)
                 )
         
         if node.else_case:
             else_case, should_return_null = node.else_case
-            else_value = res.register(self.visit(else_case, context))
-            if res.should_return():
-                return res
-            return res.success(
-                null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+            else_value = self.visit(else_case, context)
+            return (
+                locate(null.copy(), node.pos_start, node.pos_end, context)
                 if should_return_null else
-                else_value.set_pos(node.pos_start, node.pos_end).set_context(context)
+                locate(else_value, node.pos_start, node.pos_end, context)
             )
         
-        return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(null.copy(), node.pos_start, node.pos_end, context)
     
     def visit_ForNode(self, node, context):
-        res = RTResult()
-        elements = []
         var_name = node.var_name.value
         if var_name.startswith('CONST'):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'cannot use the const variable "{var_name}" here', context
             ))
         
         start_value = Number(0)
         if node.start_value is not None:
-            start_value = res.register(self.visit(node.start_value, context))
-            if res.should_return():
-                return res
+            start_value = self.visit(node.start_value, context)
             if not isinstance(start_value, Number):
-                return res.failure(errors.VariableError(
+                raise ErrorSignal(errors.VariableError(
                     start_value.pos_start, start_value.pos_end,
                     'must be a number', context
                 ))
         
-        end_value = res.register(self.visit(node.end_value, context))
-        if res.should_return():
-            return res
+        end_value = self.visit(node.end_value, context)
         if not isinstance(end_value, Number):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 end_value.pos_start, end_value.pos_end,
                 'must be a number', context
             ))
         
         step_value = Number(1)
         if node.step_value is not None:
-            step_value = res.register(self.visit(node.step_value, context))
-            if res.should_return():
-                return res
+            step_value = self.visit(node.step_value, context)
             if not isinstance(step_value, Number):
-                return res.failure(errors.VariableError(
+                raise ErrorSignal(errors.VariableError(
                     step_value.pos_start, step_value.pos_end,
                     'must be a number', context
                 ))
         
-        i = start_value.get()
-        condition = (lambda: i < end_value.get()) if step_value.get() >= 0 else (lambda: i > end_value.get())
+        symbols = context.symbol_table.symbols
+        elements = None if node.should_return_null else []
+        # 循环体看不到循环变量时不必每轮装箱，离开循环时再写入最后的值
+        observed = may_observe(node.body, var_name)
+        last = None
         flag = True
         
-        while condition():
-            context.symbol_table.set(var_name, Number(i))
-            i += step_value.get()
-            value = res.register(self.visit(node.body, context))
-            
-            if res.should_return() and (not res.loop_continue) and (not res.loop_break):
-                return res
-            if res.loop_continue:
-                continue
-            if res.loop_break:
-                flag = False
-                break
-            elements.append(value)
-            
-        if flag:
-            if node.else_body:
-                res.register(self.visit(node.else_body, context))
-                if res.should_return():
-                    return res
+        try:
+            for i in number_range(start_value.get(), end_value.get(), step_value.get()):
+                if observed:
+                    symbols[var_name] = Number(i)
+                else:
+                    last = i
+                try:
+                    value = self.visit(node.body, context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    flag = False
+                    break
+                if elements is not None:
+                    elements.append(value)
+        finally:
+            if last is not None:
+                symbols[var_name] = Number(last)
+        
+        if flag and node.else_body:
+            self.visit(node.else_body, context)
         
-        return res.success(
-            null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+        return (
+            locate(null.copy(), node.pos_start, node.pos_end, context)
             if node.should_return_null else
-            List(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+            locate(List(elements), node.pos_start, node.pos_end, context)
         )
     
     def visit_WhileNode(self, node, context):
-        res = RTResult()
-        elements = []
+        elements = None if node.should_return_null else []
         flag = True
-        while True:
-            condition = res.register(self.visit(node.condition, context))
-            if res.should_return():
-                return res
-            if not condition.is_true():
-                break
-            
-            value = res.register(self.visit(node.body, context))
-            if res.should_return() and (not res.loop_continue) and (not res.loop_break):
-                return res
-            if res.loop_continue:
+        while self.visit(node.condition, context).is_true():
+            try:
+                value = self.visit(node.body, context)
+            except ContinueSignal:
                 continue
-            if res.loop_break:
+            except BreakSignal:
                 flag = False
                 break
-            elements.append(value)
-        if flag:
-            if node.else_body:
-                res.register(self.visit(node.else_body, context))
-                if res.should_return():
-                    return res
-            
-        return res.success(
+            if elements is not None:
+                elements.append(value)
+        
+        if flag and node.else_body:
+            self.visit(node.else_body, context)
+        
+        return (
             null.copy() if node.should_return_null else
-            List(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+            locate(List(elements), node.pos_start, node.pos_end, context)
         )
     
     def visit_ExitNode(self, node, context):
-        res = RTResult()
         if node.status is None:
             sys.exit()
-        status = res.register(self.visit(node.status, context))
-        if res.should_return():
-            return res
-        status = status.get()
+        status = self.visit(node.status, context).get()
         if isinstance(status, (int, float)):
             sys.exit(int(status))
         raise SystemExit(str(status))
     
     def visit_ThrowNode(self, node, context):
-        res = RTResult()
         if not node.details:
-            return res.failure(errors.RTError(
+            raise ErrorSignal(errors.RTError(
                 node.pos_start, node.pos_end,
                 'no active exception to throw', context
             ))
-        details = auto(res.register(self.visit(node.details, context)))
-        if res.should_return():
-            return res
-        details = details.get()
-        error_name = auto(res.register(self.visit(node.error_name, context)))
-        if res.should_return():
-            return res
+        details = auto(self.visit(node.details, context)).get()
+        error_name = auto(self.visit(node.error_name, context))
         if not isinstance(error_name, String):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 'error name must be string', context
             ))
         error_name = error_name.get()
         if not hasattr(errors, error_name):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'no error named "{error_name}"', context
             ))
         if error_name == 'BaseError':
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 'cannot throw BaseError', context
             ))
         error_type = getattr(errors, error_name)
         try:
-            return res.failure(error_type(node.pos_start, node.pos_end, details, context))
+            error = error_type(node.pos_start, node.pos_end, details, context)
         except (TypeError, ValueError, RuntimeError):
-            return res.failure(errors.RTError(
+            error = errors.RTError(
                 node.pos_start, node.pos_end,
                 'must throw a runtime-error', context
-            ))
+            )
+        raise ErrorSignal(error)
     
-    @staticmethod
-    def visit_FunctionNode(node, context):
-        res = RTResult()
+    def visit_FunctionNode(self, node, context):
+        if node.is_async or node.is_generator:
+            func_value = suspendable_function(self, node, context)
+            context.symbol_table.set(func_value.name, func_value)
+            return func_value
         func_name = (
             node.func_name if isinstance(node.func_name, str) else
             node.func_name.value
@@ -490,77 +575,71 @@ class Interpreter(object):
             .set_pos(node.pos_start, node.pos_end)
             .set_context(context)
         )
+        func_value.engine = self
         context.symbol_table.set(func_name, func_value)
-        return res.success(func_value)
+        return func_value
     
     def visit_CallNode(self, node, context):
-        res = RTResult()
-        args = []
-        func = res.register(self.visit(node.func, context))
-        if res.should_return():
-            return res
-        func = func.copy().set_pos(node.pos_start, node.pos_end)
-        
-        for arg in node.arguments:
-            args.append(res.register(self.visit(arg, context)))
-            if res.should_return():
-                return res
-        
-        return_value = res.register(func.execute(args, RTResult()))
-        if res.should_return():
-            return res
-        return res.success(
-            auto(return_value).set_pos(node.pos_start, node.pos_end).
-            set_context(context)
-        )
+        func = self.visit(node.func, context)
+        args = [self.visit(arg, context) for arg in node.arguments]
+        return self.call(func, args, node, context)
+    
+    def tail_call(self, node, context):
+        func = self.visit(node.func, context)
+        args = [self.visit(arg, context) for arg in node.arguments]
+        if type(func) is Function:
+            raise TailCallSignal(func, args, context, node.pos_start, node.pos_end)
+        if type(func) is MemberFunction and type(func.func) is Function:
+            raise TailCallSignal(func.func, [func.value] + args, context, node.pos_start, node.pos_end)
+        return self.call(func, args, node, context)
+    
+    @staticmethod
+    def call(func, args, node, context):
+        if isinstance(func, Function):
+            return_value = func.call(args, context, node.pos_start, node.pos_end)
+        else:
+            func = func.copy().set_pos(node.pos_start, node.pos_end)
+            res = func.execute(args, RTResult())
+            if res.error:
+                raise ErrorSignal(res.error)
+            return_value = res.value
+        return locate(auto(return_value), node.pos_start, node.pos_end, context)
     
     def visit_IndexNode(self, node, context):
-        res = RTResult()
-        lst = res.register(self.visit(node.list, context))
-        if res.should_return():
-            return res
-        index = res.register(self.visit(node.index, context))
-        if res.should_return():
-            return res
+        lst = self.visit(node.list, context)
+        index = self.visit(node.index, context)
         result, error = lst.index_by(index)
         if error:
-            return res.failure(error)
-        return res.success(auto(result).set_pos(node.pos_start, node.pos_end).set_context(context))
+            raise ErrorSignal(error)
+        return locate(auto(result), node.pos_start, node.pos_end, context)
     
     def visit_ListNode(self, node, context):
-        res = RTResult()
-        elements = []
-        for element_node in node.items:
-            elements.append(res.register(self.visit(element_node, context)))
-            if res.should_return():
-                return res
-        return res.success(List(elements).set_pos(node.pos_start, node.pos_end).set_context(context))
+        elements = [self.visit(element_node, context) for element_node in node.items]
+        return locate(List(elements), node.pos_start, node.pos_end, context)
     
     def visit_DictNode(self, node, context):
-        res = RTResult()
         items = {}
         for key, value in node.items.items():
-            key = res.register(self.visit(key, context))
-            if res.should_return():
-                return res
-            key = key.get()
-            value = res.register(self.visit(value, context))
-            if res.should_return():
-                return res
+            key = self.visit(key, context).get()
+            value = self.visit(value, context)
             try:
                 items[key] = value
             except TypeError:
-                return res.failure(errors.DictError(
+                raise ErrorSignal(errors.DictError(
                     node.pos_start, node.pos_end,
                     f'unhashable value: {key}', context
                 ))
-        return res.success(Dict(items).set_pos(node.pos_start, node.pos_end).set_context(context))
-
+        return locate(Dict(items), node.pos_start, node.pos_end, context)
+    
     def visit_IncludeNode(self, node, context):
+        module = self.visit(node.module, context)
+        res = self.include_module(module, context, node)
+        if res.error:
+            raise ErrorSignal(res.error)
+        return res.value
+
+    def include_module(self, module, context, node):
         res = RTResult()
-        module = res.register(self.visit(node.module, context))
-        if res.should_return():
-            return res
         if not isinstance(module.value, str):
             return res.failure(errors.IncludeError(
                 node.pos_start, node.pos_end,
@@ -637,17 +716,17 @@ class Interpreter(object):
                 ))
             
             for k, i in functions.items():
-                functions[k] = i.set_pos(node.pos_start, node.pos_end).set_context(context)
+                functions[k] = locate(i, node.pos_start, node.pos_end, context)
             
             context.symbol_table.update(functions)
-            return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+            return res.success(locate(null.copy(), node.pos_start, node.pos_end, context))
         
         elif ks:
             result, error, ctx = self.run_func(path, code)
             if error:
                 return res.failure(error)
             context.symbol_table.update(ctx.symbol_table.symbols)
-            return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+            return res.success(locate(null.copy(), node.pos_start, node.pos_end, context))
         
         else:
             return res.failure(errors.IncludeError(
@@ -656,207 +735,156 @@ class Interpreter(object):
             ))
         
     def visit_ReturnNode(self, node, context):
-        res = RTResult()
         value = null.copy()
         if node.return_value:
-            value = res.register(self.visit(node.return_value, context))
-            if res.should_return():
-                return res
-        return res.success_return(
-            auto(value).set_pos(node.pos_start, node.pos_end).set_context(context)
-        )
+            if context.tail and type(node.return_value) is CallNode:
+                value = self.tail_call(node.return_value, context)
+            else:
+                value = self.visit(node.return_value, context)
+        raise ReturnSignal(locate(auto(value), node.pos_start, node.pos_end, context))
     
     @staticmethod
     def visit_ContinueNode(_, __):
-        return RTResult().success_continue()
-
+        raise ContinueSignal()
+    
     @staticmethod
     def visit_BreakNode(_, __):
-        return RTResult().success_break()
+        raise BreakSignal()
     
     def visit_TryNode(self, node, context):
-        res = RTResult()
-        try_res = res.register(self.visit(node.try_body, context))
-        if not res.error:
-            if node.else_body:
-                res.register(self.visit(node.else_body, context))
-                if res.should_return():
-                    return res
-            
-            if node.finally_body:
-                res.register(self.visit(node.finally_body, context))
-                if res.should_return():
-                    return res
-                
-            return res.success(
-                null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-                if node.should_return_null else
-                try_res.set_pos(node.pos_start, node.pos_end).set_context(context)
-            )
+        tail, context.tail = context.tail, False  # try中的调用返回后还要处理错误，不能替换帧
+        try:
+            try:
+                value = self.visit(node.try_body, context)
+            except ErrorSignal as signal:
+                name, details = signal.error.catch()
+                context.symbol_table.set(node.catch_name.value, String(name))
+                context.symbol_table.set(node.catch_details.value, String(details))
+                value = self.visit(node.catch_body, context)
+            else:
+                if node.else_body:
+                    self.visit(node.else_body, context)
+        finally:
+            try:
+                if node.finally_body:
+                    self.visit(node.finally_body, context)
+            finally:
+                context.tail = tail
         
-        name, details = res.error.catch()
-        context.symbol_table.set(node.catch_name.value, String(name))
-        context.symbol_table.set(node.catch_details.value, String(details))
-        catch_res = res.register(self.visit(node.catch_body, context))
-        if node.finally_body:
-            res.register(self.visit(node.finally_body, context))
-            if res.should_return():
-                return res
-        if res.should_return():
-            return res
-        return res.success(
-            null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+        return (
+            locate(null.copy(), node.pos_start, node.pos_end, context)
             if node.should_return_null else
-            catch_res.set_pos(node.pos_start, node.pos_end).set_context(context)
+            locate(value, node.pos_start, node.pos_end, context)
         )
     
     @staticmethod
     def visit_DeleteNode(node, context):
-        res = RTResult()
         value = context.symbol_table.remove(node.var_name.value)
         if value == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'"{node.var_name.value}" is not defined', context
             ))
         if node.var_name.value.startswith('CONST_'):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'cannot delete the const variable {node.var_name.value}', context
             ))
-        return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(null.copy(), node.pos_start, node.pos_end, context)
     
     def visit_AssertNode(self, node, context):
-        res = RTResult()
-        condition = auto(res.register(self.visit(node.condition, context)))
-        if res.should_return():
-            return res
+        condition = auto(self.visit(node.condition, context))
         details = ''
         if node.details:
-            details = auto(res.register(self.visit(node.details, context))).get()
+            details = auto(self.visit(node.details, context)).get()
         if not condition.is_true():
-            return res.failure(errors.AssertError(
+            raise ErrorSignal(errors.AssertError(
                 node.pos_start, node.pos_end, details, context
             ))
-        return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(null.copy(), node.pos_start, node.pos_end, context)
     
     def visit_SwitchNode(self, node, context):
-        res = RTResult()
-        condition = auto(res.register(self.visit(node.condition, context)))
-        if res.should_return():
-            return res
+        condition = auto(self.visit(node.condition, context))
         for expr, body, unless in node.cases:
-            expr = auto(res.register(self.visit(expr, context)))
-            if res.should_return():
-                return res
+            expr = auto(self.visit(expr, context))
             ee, error = condition.ee_by(expr)
             if error:
-                return res.failure(error)
+                raise ErrorSignal(error)
             if ee:
                 unl = True
                 if unless:
-                    unless = auto(res.register(self.visit(unless, context)))
-                    unl = not unless.is_true()
-                if res.should_return():
-                    return res
+                    unl = not auto(self.visit(unless, context)).is_true()
                 if unl:
-                    body = auto(res.register(self.visit(body, context)))
-                    if res.should_return():
-                        return res
-                    return res.success(
-                        body.set_pos(node.pos_start, node.pos_end).set_context(context)
+                    body = auto(self.visit(body, context))
+                    return (
+                        locate(body, node.pos_start, node.pos_end, context)
                         if node.should_auto_return else
-                        null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+                        locate(null.copy(), node.pos_start, node.pos_end, context)
                     )
         if node.default:
-            default = auto(res.register(self.visit(node.default, context)))
-            if res.should_return():
-                return res
-            return res.success(
-                default.set_pos(node.pos_start, node.pos_end).set_context(context)
+            default = auto(self.visit(node.default, context))
+            return (
+                locate(default, node.pos_start, node.pos_end, context)
                 if node.should_auto_return else
-                null.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+                locate(null.copy(), node.pos_start, node.pos_end, context)
             )
-        return res.success(null.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(null.copy(), node.pos_start, node.pos_end, context)
     
     def visit_OrNode(self, node, context):
-        res = RTResult()
-        left = auto(res.register(self.visit(node.left, context)))
-        if res.should_return():
-            return res
+        left = auto(self.visit(node.left, context))
         if left.get():
-            return res.success(left.set_pos(node.pos_start, node.pos_end).set_context(context))
-        
-        right = auto(res.register(self.visit(node.right, context)))
-        if res.should_return():
-            return res
-        return res.success(right.set_pos(node.pos_start, node.pos_end).set_context(context))
-
+            return locate(left, node.pos_start, node.pos_end, context)
+        right = auto(self.visit(node.right, context))
+        return locate(right, node.pos_start, node.pos_end, context)
+    
     def visit_AndNode(self, node, context):
-        res = RTResult()
-        left = auto(res.register(self.visit(node.left, context)))
-        if res.should_return():
-            return res
+        left = auto(self.visit(node.left, context))
         if not left.is_true():
-            return res.success(left)
-    
-        right = auto(res.register(self.visit(node.right, context)))
-        if res.should_return():
-            return res
-        return res.success(right)
+            return left
+        return auto(self.visit(node.right, context))
     
     def visit_AttrAccessNode(self, node, context):
-        res = RTResult()
-        cls = res.register(self.visit(node.class_name, context))
-        if res.error:
-            return res
+        cls = self.visit(node.class_name, context)
         attr, error = cls.getattr(node.attr_name.value)
         if error:
-            return res.failure(error)
+            raise ErrorSignal(error)
         if not isinstance(cls, Namespace):
             if isinstance(attr, Function) and (not isinstance(attr, MemberFunction)):
-                attr = MemberFunction(cls, attr)
-        return res.success(attr.set_pos(node.pos_start, node.pos_end).set_context(context))
+                attr = attr.bind(cls)
+        return locate(attr, node.pos_start, node.pos_end, context)
     
     def visit_AttrAssignNode(self, node, context):
-        res = RTResult()
         cls = context.symbol_table.get(node.class_name.value)
         if cls == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'"{node.class_name.value}" is not defined', context
             ))
-        value = res.register(self.visit(node.value, context))
-        if res.error:
-            return res
+        value = self.visit(node.value, context)
         cls.setattr(node.attr_name.value, value)
-        return res.success(value.set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(value, node.pos_start, node.pos_end, context)
     
     def visit_NamespaceNode(self, node, context):
-        res = RTResult()
         name = node.namespace_name.value
         new_context = Context(f'{name}', context, node.pos_start)
         new_context.symbol_table = SymbolTable(context.symbol_table)
-        res.register(self.visit(node.body, new_context))
-        if res.should_return():
-            return res
+        self.visit(node.body, new_context)
         new_value = Namespace(name)
         for key, value in new_context.symbol_table.symbols.items():
             new_value.setattr(key, value)
         context.symbol_table.set(name, new_value)
-        return res.success(new_value)
+        return new_value
     
     @staticmethod
     def visit_UsingNode(node, context):
-        res = RTResult()
         namespace = context.symbol_table.get(node.namespace_name.value)
         if namespace == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'namespace "{node.namespace_name.value}" is not defined', context
             ))
         if not isinstance(namespace, Namespace):
-            return res.failure(errors.ClassError(
+            raise ErrorSignal(errors.ClassError(
                 node.pos_start, node.pos_end,
                 f'"{node.namespace_name.value}" is not a namespace', context
             ))
@@ -866,52 +894,49 @@ class Interpreter(object):
             attr_name = node.func_name.value
             attr_value, error = namespace.getattr(attr_name)
             if error:
-                return res.failure(error)
+                raise ErrorSignal(error)
             context.symbol_table.set(attr_name, attr_value)
-        return res.success(null.copy())
+        return null.copy()
     
     @staticmethod
     def visit_VarAutoincrementNode(node, context):
-        res = RTResult()
         name = node.var_name.value
         val = context.symbol_table.get(name)
         if val == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'variable {name} is not defined', context
             ))
         if name.startswith('CONST_'):
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 'auto-increment or auto-decrement were not allowed to apply in const variables',
                 context
             ))
         ans, error = val.plus_by(Number(1)) if node.op.type == constants.PLUS else val.minus_by(Number(1))
         if error:
-            return res.failure(error)
+            raise ErrorSignal(error)
         ans = auto(ans)
         context.symbol_table.set(name, ans)
-        return res.success(ans.set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(ans, node.pos_start, node.pos_end, context)
     
     @staticmethod
     def visit_StructNode(node, context):
-        res = RTResult()
         name = node.name.value if node.name else '<anonymous>'
         struct = Struct(name, [i.value for i in node.attrs])
         if node.name:
             context.symbol_table.set(name, struct)
-        return res.success(struct.set_pos(node.pos_start, node.pos_end).set_context(context))
+        return locate(struct, node.pos_start, node.pos_end, context)
     
     @staticmethod
     def visit_NewNode(node, context):
-        res = RTResult()
         val = context.symbol_table.get(node.name.value)
         if val == context.symbol_table.not_found:
-            return res.failure(errors.VariableError(
+            raise ErrorSignal(errors.VariableError(
                 node.pos_start, node.pos_end,
                 f'struct {node.name} is not defined', context
             ))
         val, error = auto(val).new()
         if error:
-            return res.failure(error)
-        return res.success(auto(val).set_pos(node.pos_start, node.pos_end).set_context(context))
+            raise ErrorSignal(error)
+        return locate(auto(val), node.pos_start, node.pos_end, context)
@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+from .. import constants
+from ..parse import nodes
+from ..tokens import Token
+
+
+class LocalResolver(object):
+    """
+    局部变量解析
+    Finds the names a function body binds in its own symbol table, so that
+    BytecodeCompiler can give each of them a fixed slot in the FrameTable of
+    the call. KittenScript looks free variables up through the calling
+    frames, so only depth 0 (the function's own frame) can be resolved
+    statically; everything else is still looked up by name.
+    """
+    def __init__(self):
+        self.names = {}
+
+    def resolve(self, arg_names, body):
+        self.names = {}
+        for name in arg_names:
+            self.bind(name)
+        self.visit(body)
+        return self.names
+
+    def bind(self, name):
+        # const变量需要重定义检查，仍按名字存取
+        if not name.startswith('CONST') and name not in self.names:
+            self.names[name] = len(self.names)
+
+    def visit(self, node):
+        if isinstance(node, (list, tuple)):
+            for item in node:
+                self.visit(item)
+            return
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self.visit(key)
+                self.visit(value)
+            return
+        if type(node).__module__ != nodes.__name__:
+            return
+
+        method = getattr(self, f'visit_{type(node).__name__}', None)
+        if method is not None and method(node) is False:
+            return
+        for value in vars(node).values():
+            self.visit(value)
+
+    def visit_VarAssignNode(self, node):
+        self.bind(node.var_name.value)
+
+    def visit_ForNode(self, node):
+        self.bind(node.var_name.value)
+
+    def visit_TryNode(self, node):
+        self.bind(node.catch_name.value)
+        self.bind(node.catch_details.value)
+
+    def visit_VarAutoincrementNode(self, node):
+        self.bind(node.var_name.value)
+
+    def visit_StructNode(self, node):
+        if node.name:
+            self.bind(node.name.value)
+
+    def visit_FunctionNode(self, node):
+        # 函数体属于另一个帧
+        self.bind(node.func_name if isinstance(node.func_name, str) else node.func_name.value)
+        return False
+
+    def visit_NamespaceNode(self, node):
+        # 命名空间体在自己的符号表中执行
+        self.bind(node.namespace_name.value)
+        return False
+
+
+@lru_cache(maxsize=1024)
+def may_observe(node, name):
+    """
+    Whether evaluating node may read the variable name, either directly or
+    through a call, since a called function can see its caller's variables.
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+            continue
+        if isinstance(item, Token):
+            # 任何同名标识符（读取、赋值、删除、catch等）都视为可见
+            if item.type == constants.IDENTIFIER and item.value == name:
+                return True
+            continue
+        if type(item).__module__ != nodes.__name__:
+            continue
+        if isinstance(item, (nodes.CallNode, nodes.IncludeNode, nodes.UsingNode, nodes.AwaitNode)):
+            return True
+        if isinstance(item, nodes.BinaryOpNode) and item.op.type == constants.AT:
+            return True
+        stack.extend(vars(item).values())
+    return False
@@ -8,17 +8,14 @@ class SymbolTable(object):
             return self
     
     not_found = _NotFound()
+    index = None  # 局部变量槽位表，见FrameTable
     
     def __init__(self, parent=None):
         self.symbols = {}
         self.parent = parent
         
     def get(self, name):
-        value = self.symbols.get(name, self.not_found)
-        if value == self.not_found:
-            if self.parent:
-                value = self.parent.get(name)
-        return value
+        return lookup(self, name)
     
     def set(self, name, value):
         self.symbols[name] = value
@@ -37,3 +34,78 @@ class SymbolTable(object):
         if self.parent:
             table.parent = self.parent.copy()
         return table
+
+
+class FrameTable(SymbolTable):
+    """
+    函数调用帧的符号表
+    The local variables found by LocalResolver live in the slots list at the
+    positions given by index, which is shared by every call of the same
+    function. Names bound dynamically (include, using) still go to symbols.
+    """
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.slots = [self.not_found] * len(index)
+    
+    def set(self, name, value):
+        slot = self.index.get(name)
+        if slot is None:
+            self.symbols[name] = value
+        else:
+            self.slots[slot] = value
+    
+    def remove(self, name):
+        slot = self.index.get(name)
+        if slot is None:
+            return super().remove(name)
+        if self.slots[slot] is self.not_found:
+            return self.not_found
+        self.slots[slot] = self.not_found
+    
+    def update(self, dictionary: dict):
+        for name, value in dictionary.items():
+            self.set(name, value)
+    
+    def copy(self):
+        table = super().copy()
+        for name, slot in self.index.items():
+            if self.slots[slot] is not self.not_found:
+                table.symbols[name] = self.slots[slot]
+        return table
+
+
+def fold(table, base):
+    """
+    Merges the tables on the chain from table up to base (excluded) into one
+    SymbolTable whose parent is base. Looking a name up in the result finds
+    the same value as looking it up from table.
+    """
+    chain = []
+    while table is not base:
+        chain.append(table)
+        table = table.parent
+    folded = SymbolTable(base)
+    symbols = folded.symbols
+    for table in reversed(chain):
+        if table.index is not None:
+            for name, slot in table.index.items():
+                if table.slots[slot] is not SymbolTable.not_found:
+                    symbols[name] = table.slots[slot]
+        symbols.update(table.symbols)
+    return folded
+
+
+def lookup(table, name):
+    # 沿父符号表查找变量，找不到返回SymbolTable.not_found
+    not_found = SymbolTable.not_found
+    while table is not None:
+        value = table.symbols.get(name, not_found)
+        if value is not not_found:
+            return value
+        if table.index is not None:
+            slot = table.index.get(name)
+            if slot is not None and table.slots[slot] is not not_found:
+                return table.slots[slot]
+        table = table.parent
+    return not_found
@@ -1,5 +1,12 @@
+import operator
+from types import MappingProxyType
+
 from .. import constants, errors
 
+# 没有属性的值共用这个只读的空表，第一次setattr时才分配字典
+EMPTY_ATTRS = MappingProxyType({})
+new_object = object.__new__
+
 def auto(value):
     if isinstance(value, Value):
         return value
@@ -21,18 +28,67 @@ def auto(value):
     return Value()
 
 
+def locate(value, pos_start, pos_end, context):
+    # 等价于value.set_pos(pos_start, pos_end).set_context(context)，但不经过方法调用
+    value.pos_start = pos_start
+    value.pos_end = pos_end
+    value.context = context
+    return value
+
+
+def number_range(start, end, step):
+    # for循环依次取到的值，全为整数时直接使用range
+    if type(start) is int and type(end) is int and type(step) is int and step:
+        return range(start, end, step)
+    return _number_steps(start, end, step)
+
+
+def _number_steps(i, end, step):
+    if step >= 0:
+        while i < end:
+            yield i
+            i += step
+    else:
+        while i > end:
+            yield i
+            i += step
+
+
 class Value(object):
+    __slots__ = ('pos_start', 'pos_end', 'context', 'attrs')
     op_funcs = [
         'by_pos', 'by_neg', 'by_not', 'by_xat', 'by_invert', 'plus_by', 'minus_by',
         'mul_by', 'div_by', 'floor_by', 'index_by', 'arrow_by', 'ee_by', 'ne_by',
         'lt_by', 'lte_by', 'gt_by', 'gte_by', 'pow_by', 'question_by', 'xor_by',
         'lshift_by', 'rshift_by', 'and_by', 'or_by'
     ]
+    # 运算符对应的方法名，每个类据此生成自己的分派表
+    unary_funcs = {
+        constants.PLUS: 'by_pos', constants.MINUS: 'by_neg', constants.NOT: 'by_not',
+        constants.XAT: 'by_xat', constants.INVERT: 'by_invert'
+    }
+    binary_funcs = {
+        constants.AND: 'and_by', constants.OR: 'or_by', constants.PLUS: 'plus_by',
+        constants.MINUS: 'minus_by', constants.MUL: 'mul_by', constants.DIV: 'div_by',
+        constants.FLOOR: 'floor_by', constants.MOD: 'mod_by', constants.POW: 'pow_by',
+        constants.LT: 'lt_by', constants.LTE: 'lte_by', constants.EE: 'ee_by',
+        constants.NE: 'ne_by', constants.GT: 'gt_by', constants.GTE: 'gte_by',
+        constants.XOR: 'xor_by', constants.LSHIFT: 'lshift_by', constants.RSHIFT: 'rshift_by',
+        constants.QUESTION: 'question_by', constants.DOUBLE: 'double_by', constants.AT: 'at_by'
+    }
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.make_dispatch()
+    
+    @classmethod
+    def make_dispatch(cls):
+        cls.unary_dispatch = {op: getattr(cls, name) for op, name in cls.unary_funcs.items()}
+        cls.binary_dispatch = {op: getattr(cls, name) for op, name in cls.binary_funcs.items()}
     
     def __init__(self):
-        self.set_pos()
-        self.set_context()
-        self.attrs = {}
+        self.pos_start = self.pos_end = self.context = None
+        self.attrs = EMPTY_ATTRS
 
     def __str__(self):
         val = self.get()
@@ -156,6 +212,9 @@ class Value(object):
     def or_by(self, other):
         return self.get() | other.get(), None
     
+    def double_by(self, other):
+        return other.contains(self)
+    
     def at_by(self, other):
         ans = []
         for i in self.get():
@@ -175,70 +234,24 @@ class Value(object):
         ))
     
     def unary_op(self, op):
+        func = self.unary_dispatch.get(op)
+        if func is None:
+            return self.invalid(op, self)
         try:
-            if op == constants.PLUS:
-                return self.by_pos()
-            if op == constants.MINUS:
-                return self.by_neg()
-            if op == constants.NOT:
-                return self.by_not()
-            if op == constants.XAT:
-                return self.by_xat()
-            if op == constants.INVERT:
-                return self.by_invert()
+            return func(self)
         except (Exception, SystemExit):
             return self.invalid(op, self, 'illegal operation')
-        return self.invalid(op, self)
     
     def binary_op(self, op, other):
         if not isinstance(other, Value):
             return self.invalid(op, other)
+        func = self.binary_dispatch.get(op)
+        if func is None:
+            return self.invalid(op, other)
         try:
-            if op == constants.AND:
-                return self.and_by(other)
-            if op == constants.OR:
-                return self.or_by(other)
-            if op == constants.PLUS:
-                return self.plus_by(other)
-            if op == constants.MINUS:
-                return self.minus_by(other)
-            if op == constants.MUL:
-                return self.mul_by(other)
-            if op == constants.DIV:
-                return self.div_by(other)
-            if op == constants.FLOOR:
-                return self.floor_by(other)
-            if op == constants.MOD:
-                return self.mod_by(other)
-            if op == constants.POW:
-                return self.pow_by(other)
-            if op == constants.LT:
-                return self.lt_by(other)
-            if op == constants.LTE:
-                return self.lte_by(other)
-            if op == constants.EE:
-                return self.ee_by(other)
-            if op == constants.NE:
-                return self.ne_by(other)
-            if op == constants.GT:
-                return self.gt_by(other)
-            if op == constants.GTE:
-                return self.gte_by(other)
-            if op == constants.XOR:
-                return self.xor_by(other)
-            if op == constants.LSHIFT:
-                return self.lshift_by(other)
-            if op == constants.RSHIFT:
-                return self.rshift_by(other)
-            if op == constants.QUESTION:
-                return self.question_by(other)
-            if op == constants.DOUBLE:
-                return other.contains(self)
-            if op == constants.AT:
-                return self.at_by(other)
+            return func(self, other)
         except (Exception, SystemExit):
             return self.invalid(op, other, f'illegal operation {op} for {self} and {other}')
-        return self.invalid(op, other)
     
     def index_by(self, index):
         return self.invalid('GET-INDEX', index)
@@ -270,20 +283,37 @@ class Value(object):
         return attr, None
     
     def setattr(self, name, value):
+        if self.attrs is EMPTY_ATTRS:
+            self.attrs = {}
         self.attrs[name] = value
         return null.copy(), None
     
     def set_attrs(self, attrs):
         if isinstance(attrs, dict):
-            self.attrs = attrs.copy()
+            self.attrs = attrs.copy() if attrs else EMPTY_ATTRS
         return self
 
 
+Value.make_dispatch()
+
+
 class Single(Value):
+    __slots__ = ('value',)
+    
     def __init__(self, value):
         self.value = value
         super().__init__()
     
+    def instance(self, pos_start, pos_end, context):
+        # 由常量原型得到一个新的值，不经过__init__
+        value = new_object(type(self))
+        value.value = self.value
+        value.attrs = EMPTY_ATTRS
+        value.pos_start = pos_start
+        value.pos_end = pos_end
+        value.context = context
+        return value
+    
     def copy(self):
         return (
             Single(self.value).
@@ -300,6 +330,27 @@ class Single(Value):
     
     
 class Number(Single):
+    __slots__ = ()
+    
+    def unary_op(self, op):
+        func = NUMBER_UNARY_OPS.get(op)
+        if func is not None:
+            try:
+                return func(self.value), None
+            except (Exception, SystemExit):
+                pass  # 交给通用路径生成错误
+        return super().unary_op(op)
+    
+    def binary_op(self, op, other):
+        if type(other) is Number:
+            func = NUMBER_OPS.get(op)
+            if func is not None:
+                try:
+                    return func(self.value, other.value), None
+                except (Exception, SystemExit):
+                    pass  # 除零等错误交给通用路径，错误信息保持不变
+        return super().binary_op(op, other)
+    
     def zero(self, other):
         return None, errors.MathError(other.pos_start, other.pos_end, 'division by zero', self.context)
     
@@ -328,6 +379,15 @@ class Number(Single):
 
 
 class String(Single):
+    __slots__ = ()
+    
+    def binary_op(self, op, other):
+        if type(other) is String:
+            func = STRING_OPS.get(op)
+            if func is not None:
+                return func(self.value, other.value), None
+        return super().binary_op(op, other)
+    
     def copy(self):
         return (
             String(self.value).
@@ -356,6 +416,8 @@ class String(Single):
 
 
 class Bool(Single):
+    __slots__ = ()
+    
     def copy(self):
         return (
             Bool(self.value).
@@ -368,12 +430,58 @@ class Bool(Single):
         return Bool([True, False][self.value]), None
 
 
+# Number与Number、String与String之间的运算直接作用于Python值
+NUMBER_UNARY_OPS = {
+    constants.PLUS: operator.pos, constants.MINUS: operator.neg,
+    constants.NOT: operator.not_, constants.INVERT: operator.invert
+}
+NUMBER_OPS = {
+    constants.PLUS: operator.add, constants.MINUS: operator.sub, constants.MUL: operator.mul,
+    constants.DIV: operator.truediv, constants.FLOOR: operator.floordiv, constants.MOD: operator.mod,
+    constants.POW: operator.pow, constants.LT: operator.lt, constants.LTE: operator.le,
+    constants.EE: operator.eq, constants.NE: operator.ne, constants.GT: operator.gt,
+    constants.GTE: operator.ge, constants.XOR: operator.xor, constants.LSHIFT: operator.lshift,
+    constants.RSHIFT: operator.rshift, constants.AND: operator.and_, constants.OR: operator.or_
+}
+STRING_OPS = {
+    constants.PLUS: operator.add, constants.LT: operator.lt, constants.LTE: operator.le,
+    constants.EE: operator.eq, constants.NE: operator.ne, constants.GT: operator.gt,
+    constants.GTE: operator.ge
+}
+
 Bool.true = Bool(True)
 Bool.false = Bool(False)
 null = Single(None)
 
 
+class ConstantPool(object):
+    """
+    常量池
+    Boxes the literal of each syntax tree node once. The pooled values are
+    prototypes that are never handed to a script: load() returns a new
+    instance located at the node, so setting attributes or positions on
+    the result cannot change the literal, and the pool keeps no Context
+    alive. At most maxsize nodes are kept, the oldest are dropped first.
+    """
+    def __init__(self, maxsize=constants.CONSTANT_POOL_SIZE):
+        self.maxsize = maxsize
+        self.values = {}
+    
+    def load(self, node, cls, raw, context):
+        value = self.values.get(node)
+        if value is None:
+            if len(self.values) >= self.maxsize:
+                try:
+                    self.values.pop(next(iter(self.values)), None)
+                except (RuntimeError, StopIteration):
+                    pass  # 另一个线程同时修改了常量池
+            value = self.values[node] = cls(raw)
+        return value.instance(node.pos_start, node.pos_end, context)
+
+
 class List(Value):
+    __slots__ = ('items',)
+    
     def __init__(self, items):
         super().__init__()
         self.items = items
@@ -449,6 +557,8 @@ class List(Value):
 
 
 class Dict(Value):
+    __slots__ = ('items',)
+    
     def __init__(self, items):
         super().__init__()
         self.items = items
@@ -534,12 +644,13 @@ class Struct(Value):
     
     def new(self):
         obj = Object(self.name)
-        for i in self.attrs:
-            obj.attrs[i] = null.copy()
+        obj.attrs = {i: null.copy() for i in self.attrs}
         return obj, None
     
     
 class Object(Value):
+    __slots__ = ('name',)
+    
     def __init__(self, name):
         self.name = name
         super().__init__()
@@ -0,0 +1,754 @@
+import sys
+
+from .bytecode import (
+    LOAD_CONST, LOAD_NULL, LOAD_NAME, LOOKUP_NAME, STORE_NAME, STORE_CONST_NAME,
+    DELETE_NAME, INCREMENT_NAME, DECREMENT_NAME, POP_TOP, LOCATE, BINARY_OP, UNARY_OP,
+    INDEX, GET_ATTR, SET_ATTR, BUILD_LIST, BUILD_DICT, LIST_APPEND, JUMP,
+    POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE, OR_JUMP, AND_JUMP, CHECK_NUMBER, FOR_SETUP,
+    FOR_ITER, CONST_LOOP_ERROR, SETUP_LOOP, SETUP_TRY, SETUP_FINALLY, POP_BLOCK,
+    BREAK_LOOP, CONTINUE_LOOP, CATCH, RERAISE, MAKE_FUNCTION, CALL, RETURN_VALUE,
+    SWITCH_MATCH, ASSERT, THROW, THROW_EMPTY, EXIT, INCLUDE, ENTER_NAMESPACE,
+    EXIT_NAMESPACE, USING, MAKE_STRUCT, NEW, LOOP_BLOCK, TRY_BLOCK, FINALLY_BLOCK,
+    NAMESPACE_BLOCK, LOAD_FAST, STORE_FAST, TAIL_CALL, AWAIT, YIELD_VALUE, BytecodeCompiler
+)
+from .context import Context
+from .table import SymbolTable, FrameTable, fold, lookup
+from .flow import ErrorSignal
+from .interpreter import RTResult, Interpreter, Function, MemberFunction, AsyncFunction, GeneratorFunction
+from .values import (
+    null, Number, String, List, Dict,
+    Value, auto, locate, Namespace, Struct
+)
+from .. import constants, errors
+
+not_found = SymbolTable.not_found
+SUSPENDED = object()  # dispatch()挂起协程或生成器时的返回值
+
+
+class BytecodeFunction(Function):
+    """
+    A KittenScript function whose body has been compiled into a CodeObject.
+    """
+    def __init__(self, name, body, arg_names, should_auto_return, code, machine):
+        super().__init__(name, body, arg_names, should_auto_return)
+        self.code = code
+        self.machine = machine
+
+    def copy(self):
+        return (
+            BytecodeFunction(
+                self.name, self.body, self.arg_names, self.should_auto_return, self.code, self.machine
+            )
+            .set_pos(self.pos_start, self.pos_end)
+            .set_context(self.context)
+        )
+
+    def call(self, args, context, pos_start, pos_end):
+        return self.machine.run(self.machine.make_frame(self, args, context, pos_start, pos_end))
+
+
+class Frame(object):
+    """
+    调用帧
+    blocks holds (kind, handler, stack level, context, restart) tuples pushed
+    by SETUP_LOOP, SETUP_TRY, SETUP_FINALLY and ENTER_NAMESPACE. depth is the
+    number of frames below and including this one.
+    """
+    def __init__(self, code, context, call_pos=(None, None)):
+        self.code = code
+        self.context = context
+        self.slots = context.symbol_table.slots if context.symbol_table.index is not None else None
+        self.call_pos = call_pos
+        self.caller = None
+        self.stack = []
+        self.blocks = []
+        self.pc = 0
+        self.depth = 0
+
+
+class Task(object):
+    # 由suspendable()执行的函数体：挂起时frame是挂起的帧，entry是函数体的帧（尾调用会替换它）
+    def __init__(self):
+        self.frame = None
+        self.entry = None
+
+
+class VirtualMachine(object):
+    """
+    字节码虚拟机
+    Compiles the AST produced by Parser.parse() with BytecodeCompiler and
+    runs it on an explicit value stack. Calls between KittenScript functions
+    push a new Frame instead of recursing in Python, and runtime errors
+    unwind the block stacks of the frames until a try or finally handler is
+    found.
+
+    The frames live on the heap, so the depth of recursion is bounded by
+    stack_memory (in bytes, about constants.FRAME_MEMORY per frame) instead of
+    the Python stack. A call beyond it raises an RTError. A call in tail
+    position (TAIL_CALL) replaces the returning frame instead of pushing one.
+    Because nothing of a call lives on the Python stack, the frames of a
+    coroutine or generator can be suspended at an await or yield and
+    continued later, see suspendable(). The other engines run async and
+    generator functions here too.
+    """
+    run_func = None
+    await_func = None  # 运行时提供的await实现，见coroutine.EventLoop.wait
+
+    def __init__(self, stack_memory=constants.STACK_MEMORY):
+        self.max_depth = max(stack_memory // constants.FRAME_MEMORY, 1)
+        self.depth = 0  # 调用内置函数时所在帧的深度，内置函数可能再次进入run
+        self.functions = {}  # 其他引擎定义的async函数和生成器函数：FunctionNode -> function_info()
+
+    def execute(self, node, context):
+        res = RTResult()
+        try:
+            code = BytecodeCompiler().compile_program(node)
+            return res.success(self.run(Frame(code, context)))
+        except ErrorSignal as signal:
+            return res.failure(signal.error)
+
+    @staticmethod
+    def make_frame(func, args, context, pos_start, pos_end):
+        if len(args) != len(func.arg_names):
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                f'must {len(func.arg_names)} values, not {len(args)}', context
+            ))
+        new_context = Context(func.name, context, pos_start)
+        table = new_context.symbol_table = FrameTable(func.code.index, context.symbol_table)
+        for arg_name, arg_value in zip(func.arg_names, args):
+            arg_value.context = new_context
+            table.set(arg_name, arg_value)
+        return Frame(func.code, new_context, (pos_start, pos_end))
+
+    def make_function(self, info, pos_start, pos_end, context):
+        # info是BytecodeCompiler.function_info()的结果
+        func_name, body, arg_names, should_auto_return, code, is_async, is_generator = info
+        value = locate(
+            BytecodeFunction(func_name, body, arg_names, should_auto_return, code, self),
+            pos_start, pos_end, context
+        )
+        if is_async:
+            value = locate(AsyncFunction(value), pos_start, pos_end, context)
+        elif is_generator:
+            value = locate(GeneratorFunction(value), pos_start, pos_end, context)
+        return value
+
+    def suspendable(self, func, args, context, pos_start, pos_end):
+        """
+        Runs the body of a coroutine or generator as a Python generator. At
+        every await in the body of an async function and at every yield its
+        frames are suspended and the awaited or yielded value is yielded;
+        the value sent back is the result of the await or yield, and an
+        exception thrown in is raised there as a KittenScript error. The
+        generator returns the return value of the body.
+        """
+        task = Task()
+        frame = self.make_frame(func, args, context, pos_start, pos_end)
+        frame.depth = self.depth + 1
+        value = self.dispatch(frame, frame, task)
+        while value is SUSPENDED:
+            frame = task.frame
+            pos_start, pos_end = frame.code.positions[(frame.pc >> 1) - 1]
+            try:
+                result = yield frame.stack[-1]
+            except ErrorSignal as signal:
+                frame = self.unwind(frame, task.entry, signal.error)
+            except Exception as err:
+                frame = self.unwind(frame, task.entry, errors.FunctionError(
+                    pos_start, pos_end,
+                    str(err) or type(err).__name__, frame.context
+                ))
+            else:
+                frame.stack[-1] = locate(auto(result), pos_start, pos_end, frame.context)
+            value = self.dispatch(frame, task.entry, task)
+        return value
+
+    @staticmethod
+    def unwind(frame, entry, error):
+        # 寻找能处理错误的try/finally块，返回跳转后的帧
+        while True:
+            blocks = frame.blocks
+            while blocks:
+                kind, handler, level, context, _ = blocks.pop()
+                frame.context = context
+                if kind == TRY_BLOCK or kind == FINALLY_BLOCK:
+                    del frame.stack[level:]
+                    frame.stack.append(error)
+                    frame.pc = handler
+                    return frame
+            if frame is entry:
+                raise ErrorSignal(error)
+            frame = frame.caller
+
+    def run(self, frame):
+        frame.depth = self.depth + 1
+        return self.dispatch(frame, frame, None)
+
+    def dispatch(self, frame, entry, task):
+        # 从frame继续执行，直到entry返回；task不为None时，函数体中的await和yield会挂起并返回SUSPENDED
+        while True:
+            code = frame.code
+            instructions, consts, names, positions = code.code, code.consts, code.names, code.positions
+            stack, blocks, context, pc, slots = frame.stack, frame.blocks, frame.context, frame.pc, frame.slots
+            try:
+                while True:
+                    op = instructions[pc]
+                    arg = instructions[pc + 1]
+                    pc += 2
+
+                    if op == LOAD_FAST:
+                        value = slots[arg]
+                        if value is not_found:
+                            name = code.varnames[arg]
+                            value = lookup(context.symbol_table.parent, name)
+                            if value is not_found:
+                                pos_start, pos_end = positions[(pc >> 1) - 1]
+                                raise ErrorSignal(errors.VariableError(
+                                    pos_start, pos_end,
+                                    f'"{name}" is not defined', context
+                                ))
+                        if not isinstance(value, Value):
+                            value = auto(value)
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+                        stack.append(value)
+
+                    elif op == LOAD_NAME:
+                        name = names[arg]
+                        table = context.symbol_table
+                        value = table.symbols.get(name, not_found)
+                        if value is not_found:
+                            value = lookup(table.parent, name)
+                            if value is not_found:
+                                pos_start, pos_end = positions[(pc >> 1) - 1]
+                                raise ErrorSignal(errors.VariableError(
+                                    pos_start, pos_end,
+                                    f'"{name}" is not defined', context
+                                ))
+                        if not isinstance(value, Value):
+                            value = auto(value)
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+                        stack.append(value)
+
+                    elif op == LOAD_CONST:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack.append(consts[arg].instance(pos_start, pos_end, context))
+
+                    elif op == BINARY_OP:
+                        right = stack.pop()
+                        result, error = stack[-1].binary_op(consts[arg], right)
+                        if error:
+                            raise ErrorSignal(error)
+                        value = result if isinstance(result, Value) else auto(result)
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+                        stack[-1] = value
+
+                    elif op == POP_JUMP_IF_FALSE:
+                        if not stack.pop().is_true():
+                            pc = arg
+
+                    elif op == JUMP:
+                        pc = arg
+
+                    elif op == POP_TOP:
+                        stack.pop()
+
+                    elif op == STORE_FAST:
+                        value = stack[-1]
+                        slots[arg] = value
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+
+                    elif op == STORE_NAME:
+                        value = stack[-1]
+                        context.symbol_table.symbols[names[arg]] = value
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+
+                    elif op == CALL:
+                        if arg:
+                            args = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            args = []
+                        func = stack.pop()
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        if type(func) is BytecodeFunction:
+                            callee = func
+                        elif type(func) is MemberFunction and type(func.func) is BytecodeFunction:
+                            callee = func.func
+                            args.insert(0, func.value)
+                        else:
+                            self.depth = frame.depth
+                            if isinstance(func, Function):
+                                value = func.call(args, context, pos_start, pos_end)
+                            else:
+                                func = func.copy().set_pos(pos_start, pos_end)
+                                res = func.execute(args, RTResult())
+                                if res.error:
+                                    raise ErrorSignal(res.error)
+                                value = res.value
+                            if not isinstance(value, Value):
+                                value = auto(value)
+                            stack.append(locate(value, pos_start, pos_end, context))
+                            continue
+                        if frame.depth >= self.max_depth:
+                            raise ErrorSignal(errors.RTError(
+                                pos_start, pos_end,
+                                'maximum recursion depth exceeded', context
+                            ))
+                        new_frame = self.make_frame(callee, args, context, pos_start, pos_end)
+                        new_frame.caller = frame
+                        new_frame.depth = frame.depth + 1
+                        frame.pc = pc
+                        frame = new_frame
+                        code = frame.code
+                        instructions, consts, names, positions = (
+                            code.code, code.consts, code.names, code.positions
+                        )
+                        stack, blocks, context, pc, slots = frame.stack, frame.blocks, frame.context, 0, frame.slots
+
+                    elif op == RETURN_VALUE:
+                        value = stack.pop()
+                        if frame is entry:
+                            return value
+                        if not isinstance(value, Value):
+                            value = auto(value)
+                        value.pos_start, value.pos_end = frame.call_pos
+                        frame = frame.caller
+                        code = frame.code
+                        instructions, consts, names, positions = (
+                            code.code, code.consts, code.names, code.positions
+                        )
+                        stack, blocks, context, pc, slots = (
+                            frame.stack, frame.blocks, frame.context, frame.pc, frame.slots
+                        )
+                        value.context = context
+                        stack.append(value)
+
+                    elif op == TAIL_CALL:
+                        func = stack[-arg - 1]
+                        if type(func) is BytecodeFunction:
+                            callee = func
+                            args = stack[len(stack) - arg:]
+                        elif type(func) is MemberFunction and type(func.func) is BytecodeFunction:
+                            callee = func.func
+                            args = [func.value] + stack[len(stack) - arg:]
+                        else:
+                            continue
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        # 尾调用总是从当前帧发起：保留调用者，当前帧的变量并入新帧的作用域
+                        # 旧帧也改用合并后的符号表，免得引用它的值把所有旧帧串在一起
+                        new_frame = self.make_frame(callee, args, context, pos_start, pos_end)
+                        new_context = new_frame.context
+                        new_context.parent = context.parent
+                        new_context.parent_entry_pos = context.parent_entry_pos
+                        new_context.tail_calls = context.tail_calls + 1
+                        new_context.symbol_table.parent = context.symbol_table = fold(
+                            context.symbol_table, context.parent.symbol_table
+                        )
+                        new_frame.call_pos = frame.call_pos
+                        new_frame.caller = frame.caller
+                        new_frame.depth = frame.depth
+                        if frame is entry:
+                            entry = new_frame
+                        frame = new_frame
+                        code = frame.code
+                        instructions, consts, names, positions = (
+                            code.code, code.consts, code.names, code.positions
+                        )
+                        stack, blocks, context, pc, slots = frame.stack, frame.blocks, frame.context, 0, frame.slots
+
+                    elif op == FOR_ITER:
+                        state = stack[-1]
+                        i = state[0]
+                        if (i < state[1]) if state[3] else (i > state[1]):
+                            state[4][state[5]] = Number(i)
+                            state[0] = i + state[2]
+                        else:
+                            pc = arg
+
+                    elif op == LIST_APPEND:
+                        value = stack.pop()
+                        stack[-arg].items.append(value)
+
+                    elif op == LOAD_NULL:
+                        value = null.copy()
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+                        stack.append(value)
+
+                    elif op == LOCATE:
+                        value = stack[-1]
+                        value.pos_start, value.pos_end = positions[(pc >> 1) - 1]
+                        value.context = context
+
+                    elif op == INDEX:
+                        index = stack.pop()
+                        result, error = stack[-1].index_by(index)
+                        if error:
+                            raise ErrorSignal(error)
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack[-1] = locate(auto(result), pos_start, pos_end, context)
+
+                    elif op == UNARY_OP:
+                        result, error = stack[-1].unary_op(consts[arg])
+                        if error:
+                            raise ErrorSignal(error)
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack[-1] = locate(auto(result), pos_start, pos_end, context)
+
+                    elif op == POP_JUMP_IF_TRUE:
+                        if stack.pop().is_true():
+                            pc = arg
+
+                    elif op == OR_JUMP:
+                        if auto(stack[-1]).get():
+                            pc = arg
+                        else:
+                            stack.pop()
+
+                    elif op == AND_JUMP:
+                        if not stack[-1].is_true():
+                            pc = arg
+                        else:
+                            stack.pop()
+
+                    elif op == INCREMENT_NAME or op == DECREMENT_NAME:
+                        name = names[arg]
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        value = lookup(context.symbol_table, name)
+                        if value is not_found:
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'variable {name} is not defined', context
+                            ))
+                        if name.startswith('CONST_'):
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                'auto-increment or auto-decrement were not allowed to apply in const variables',
+                                context
+                            ))
+                        if op == INCREMENT_NAME:
+                            result, error = value.plus_by(Number(1))
+                        else:
+                            result, error = value.minus_by(Number(1))
+                        if error:
+                            raise ErrorSignal(error)
+                        value = auto(result)
+                        context.symbol_table.set(name, value)
+                        stack.append(locate(value, pos_start, pos_end, context))
+
+                    elif op == GET_ATTR:
+                        cls = stack[-1]
+                        attr, error = cls.getattr(names[arg])
+                        if error:
+                            raise ErrorSignal(error)
+                        if not isinstance(cls, Namespace):
+                            if isinstance(attr, Function) and (not isinstance(attr, MemberFunction)):
+                                attr = attr.bind(cls)
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack[-1] = locate(attr, pos_start, pos_end, context)
+
+                    elif op == LOOKUP_NAME:
+                        name = names[arg]
+                        value = lookup(context.symbol_table, name)
+                        if value is not_found:
+                            pos_start, pos_end = positions[(pc >> 1) - 1]
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'"{name}" is not defined', context
+                            ))
+                        stack.append(value)
+
+                    elif op == SET_ATTR:
+                        value = stack.pop()
+                        stack[-1].setattr(names[arg], value)
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack[-1] = locate(value, pos_start, pos_end, context)
+
+                    elif op == BUILD_LIST:
+                        if arg:
+                            items = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            items = []
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack.append(locate(List(items), pos_start, pos_end, context))
+
+                    elif op == BUILD_DICT:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        items = stack[-2 * arg:] if arg else []
+                        del stack[len(stack) - 2 * arg:]
+                        result = {}
+                        for i in range(0, len(items), 2):
+                            key = items[i].get()
+                            try:
+                                result[key] = items[i + 1]
+                            except TypeError:
+                                raise ErrorSignal(errors.DictError(
+                                    pos_start, pos_end,
+                                    f'unhashable value: {key}', context
+                                ))
+                        stack.append(locate(Dict(result), pos_start, pos_end, context))
+
+                    elif op == STORE_CONST_NAME:
+                        name = names[arg]
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        if lookup(context.symbol_table, name) is not not_found:
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'cannot redefine the const variable {name}', context
+                            ))
+                        value = stack[-1]
+                        context.symbol_table.symbols[name] = value
+                        locate(value, pos_start, pos_end, context)
+
+                    elif op == CHECK_NUMBER:
+                        value = stack[-1]
+                        if not isinstance(value, Number):
+                            raise ErrorSignal(errors.VariableError(
+                                value.pos_start, value.pos_end,
+                                'must be a number', context
+                            ))
+
+                    elif op == FOR_SETUP:
+                        step = stack.pop().get()
+                        end = stack.pop().get()
+                        start = stack.pop().get()
+                        name = names[arg]
+                        table = context.symbol_table
+                        if table.index is not None and name in table.index:
+                            stack.append([start, end, step, step >= 0, table.slots, table.index[name]])
+                        else:
+                            stack.append([start, end, step, step >= 0, table.symbols, name])
+
+                    elif op == SETUP_LOOP:
+                        blocks.append((LOOP_BLOCK, arg, len(stack), context, pc))
+
+                    elif op == SETUP_TRY:
+                        blocks.append((TRY_BLOCK, arg, len(stack), context, 0))
+
+                    elif op == SETUP_FINALLY:
+                        blocks.append((FINALLY_BLOCK, arg, len(stack), context, 0))
+
+                    elif op == POP_BLOCK:
+                        context = frame.context = blocks.pop()[3]
+
+                    elif op == BREAK_LOOP or op == CONTINUE_LOOP:
+                        if not blocks or blocks[-1][0] != LOOP_BLOCK:
+                            pos_start, pos_end = positions[(pc >> 1) - 1]
+                            keyword = 'break' if op == BREAK_LOOP else 'continue'
+                            raise ErrorSignal(errors.RTError(
+                                pos_start, pos_end,
+                                f'"{keyword}" outside loop', context
+                            ))
+                        _, handler, level, context, restart = blocks[-1]
+                        frame.context = context
+                        del stack[level:]
+                        if op == BREAK_LOOP:
+                            blocks.pop()
+                            pc = handler
+                        else:
+                            pc = restart
+
+                    elif op == CATCH:
+                        name, details = stack.pop().catch()
+                        catch_name, catch_details = consts[arg]
+                        context.symbol_table.set(catch_name, String(name))
+                        context.symbol_table.set(catch_details, String(details))
+
+                    elif op == RERAISE:
+                        raise ErrorSignal(stack.pop())
+
+                    elif op == MAKE_FUNCTION:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        value = self.make_function(consts[arg], pos_start, pos_end, context)
+                        context.symbol_table.set(value.name, value)
+                        stack.append(value)
+
+                    elif op == SWITCH_MATCH:
+                        expr = auto(stack.pop())
+                        ee, error = auto(stack[-1]).ee_by(expr)
+                        if error:
+                            raise ErrorSignal(error)
+                        if not ee:
+                            pc = arg
+
+                    elif op == DELETE_NAME:
+                        name = names[arg]
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        if context.symbol_table.remove(name) is not_found:
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'"{name}" is not defined', context
+                            ))
+                        if name.startswith('CONST_'):
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'cannot delete the const variable {name}', context
+                            ))
+                        stack.append(locate(null.copy(), pos_start, pos_end, context))
+
+                    elif op == ASSERT:
+                        details = auto(stack.pop()).get() if arg else ''
+                        condition = auto(stack.pop())
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        if not condition.is_true():
+                            raise ErrorSignal(errors.AssertError(
+                                pos_start, pos_end, details, context
+                            ))
+                        stack.append(locate(null.copy(), pos_start, pos_end, context))
+
+                    elif op == THROW:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        error_name = auto(stack.pop())
+                        details = auto(stack.pop()).get()
+                        raise ErrorSignal(self.make_error(error_name, details, pos_start, pos_end, context))
+
+                    elif op == THROW_EMPTY:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        raise ErrorSignal(errors.RTError(
+                            pos_start, pos_end,
+                            'no active exception to throw', context
+                        ))
+
+                    elif op == EXIT:
+                        if not arg:
+                            sys.exit()
+                        status = stack.pop().get()
+                        if isinstance(status, (int, float)):
+                            sys.exit(int(status))
+                        raise SystemExit(str(status))
+
+                    elif op == AWAIT:
+                        if arg and task is not None:
+                            frame.pc = pc
+                            task.frame, task.entry = frame, entry
+                            return SUSPENDED
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        self.depth = frame.depth
+                        result = self.await_func(stack[-1], context, pos_start, pos_end)
+                        stack[-1] = locate(auto(result), pos_start, pos_end, context)
+
+                    elif op == YIELD_VALUE:
+                        if task is None:
+                            pos_start, pos_end = positions[(pc >> 1) - 1]
+                            raise ErrorSignal(errors.RTError(
+                                pos_start, pos_end,
+                                '"yield" outside generator', context
+                            ))
+                        frame.pc = pc
+                        task.frame, task.entry = frame, entry
+                        return SUSPENDED
+
+                    elif op == INCLUDE:
+                        includer = Interpreter()
+                        includer.run_func = self.run_func
+                        res = includer.include_module(stack.pop(), context, consts[arg])
+                        if res.error:
+                            raise ErrorSignal(res.error)
+                        stack.append(res.value)
+
+                    elif op == ENTER_NAMESPACE:
+                        blocks.append((NAMESPACE_BLOCK, 0, len(stack), context, 0))
+                        new_context = Context(names[arg], context, positions[(pc >> 1) - 1][0])
+                        new_context.symbol_table = SymbolTable(context.symbol_table)
+                        context = frame.context = new_context
+
+                    elif op == EXIT_NAMESPACE:
+                        name = names[arg]
+                        symbols = context.symbol_table.symbols
+                        context = frame.context = blocks.pop()[3]
+                        value = Namespace(name)
+                        for key, attr in symbols.items():
+                            value.setattr(key, attr)
+                        context.symbol_table.set(name, value)
+                        stack.append(value)
+
+                    elif op == USING:
+                        namespace_name, attr_name = consts[arg]
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        namespace = lookup(context.symbol_table, namespace_name)
+                        if namespace is not_found:
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'namespace "{namespace_name}" is not defined', context
+                            ))
+                        if not isinstance(namespace, Namespace):
+                            raise ErrorSignal(errors.ClassError(
+                                pos_start, pos_end,
+                                f'"{namespace_name}" is not a namespace', context
+                            ))
+                        if attr_name is None:
+                            context.symbol_table.update(namespace.attrs)
+                        else:
+                            attr, error = namespace.getattr(attr_name)
+                            if error:
+                                raise ErrorSignal(error)
+                            context.symbol_table.set(attr_name, attr)
+                        stack.append(null.copy())
+
+                    elif op == MAKE_STRUCT:
+                        name, attrs = consts[arg]
+                        struct = Struct(name or '<anonymous>', attrs)
+                        if name:
+                            context.symbol_table.set(name, struct)
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        stack.append(locate(struct, pos_start, pos_end, context))
+
+                    elif op == NEW:
+                        name, display_name = consts[arg]
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        value = lookup(context.symbol_table, name)
+                        if value is not_found:
+                            raise ErrorSignal(errors.VariableError(
+                                pos_start, pos_end,
+                                f'struct {display_name} is not defined', context
+                            ))
+                        value, error = auto(value).new()
+                        if error:
+                            raise ErrorSignal(error)
+                        stack.append(locate(auto(value), pos_start, pos_end, context))
+
+                    elif op == CONST_LOOP_ERROR:
+                        pos_start, pos_end = positions[(pc >> 1) - 1]
+                        raise ErrorSignal(errors.VariableError(
+                            pos_start, pos_end,
+                            f'cannot use the const variable "{names[arg]}" here', context
+                        ))
+
+                    else:
+                        raise SystemError(f'unknown opcode {op}')
+            except ErrorSignal as signal:
+                frame = self.unwind(frame, entry, signal.error)
+
+    @staticmethod
+    def make_error(error_name, details, pos_start, pos_end, context):
+        if not isinstance(error_name, String):
+            return errors.VariableError(
+                pos_start, pos_end,
+                'error name must be string', context
+            )
+        error_name = error_name.get()
+        if not hasattr(errors, error_name):
+            return errors.VariableError(
+                pos_start, pos_end,
+                f'no error named "{error_name}"', context
+            )
+        if error_name == 'BaseError':
+            return errors.VariableError(
+                pos_start, pos_end,
+                'cannot throw BaseError', context
+            )
+        error_type = getattr(errors, error_name)
+        try:
+            return error_type(pos_start, pos_end, details, context)
+        except (TypeError, ValueError, RuntimeError):
+            return errors.RTError(
+                pos_start, pos_end,
+                'must throw a runtime-error', context
+            )
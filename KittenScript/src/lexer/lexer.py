@@ -1,186 +1,155 @@
+import re
+
 from .. import constants, errors
 from ..tokens import Token
-from .position import Position
+from .position import Position, Source
 
 
-class LexerResult(object):
-    token = None
-    error = None
-    
-    def success(self, token: Token):
-        self.token = token
-        return self
-    
-    def failure(self, error):
-        self.error = error
-        return self
+def _char_class(chars):
+    return '[' + ''.join(re.escape(char) for char in sorted(chars) if char) + ']'
+
+
+def _operators():
+    # 双字符运算符在前，保证最长匹配
+    double, single = [], []
+    for char, (_, expectation_dict) in constants.OP_DICT.items():
+        double.extend(re.escape(char + expectation) for expectation in expectation_dict)
+        single.append(re.escape(char))
+    return '|'.join(double + single)
+
+
+# 各分支的先后顺序与逐字符扫描时的判断顺序一致
+TOKEN_RE = re.compile('|'.join([
+    r'(?P<comment>#[^\n]*)',
+    f'(?P<space>{_char_class(constants.WHITESPACES)}+)',
+    f'(?P<escape>\\\\{_char_class(constants.NEWLINE_CHAR)}?)',
+    f'(?P<newline>{_char_class(constants.NEWLINE_CHAR)})',
+    r'(?P<number>[0-9][0-9_]*(?:\.[0-9_]*)?|\.[0-9_]*)',  # 最多一个小数点，"_"被忽略
+    f'(?P<identifier>{_char_class(constants.LETTERS)}{_char_class(constants.LETTERS_DIGITS)}*)',
+    f'(?P<operator>{_operators()})',
+    r'(?P<string>"(?:[^"\\\n]|\\[^\n])*"'
+    r"|'(?:[^'\\\n]|\\[^\n])*'"
+    r'|`[^`\n]*`)',  # `...`类似于r'...'，参考python2
+    r'(?P<quote>["\'`])',  # 没有结束的字符串
+]))
+UNTERMINATED_RE = {
+    '"': re.compile(r'"(?:[^"\\\n]|\\[^\n])*\\?'),
+    "'": re.compile(r"'(?:[^'\\\n]|\\[^\n])*\\?"),
+    '`': re.compile(r'`[^`\n]*'),
+}
+ESCAPE_RE = re.compile(r'\\(.)')
+
+
+def _escape(match):
+    char = match.group(1)
+    return constants.ESCAPE_CHARACTERS.get(char, char)
 
 
 class Lexer(object):
+    """
+    词法分析器
+    Splits the source with one compiled regular expression built from
+    constants.OP_DICT, WHITESPACES and the identifier characters. Tokens
+    only record offsets into the shared Source. generate_tokens() yields
+    the tokens lazily; make_tokens() collects them into a list.
+    """
     def __init__(self, file: str, code: str):
         self.file = file
         self.code = code
+        self.source = Source(file, code)
         self.in_paren = False
-        
-        self.current_char = None
-        self.position = Position(-1, 0, -1, file, code)
-        self.advance()
         self.defines = {}
-        
-    def advance(self):
-        self.position.advance(self.current_char)
-        if self.position.index < len(self.code):
-            self.current_char = self.code[self.position.index]
-        else:
-            self.current_char = None
-
+        self.error = None
+    
     def make_tokens(self):
-        tokens = []
-        while self.current_char:
-            if self.current_char == '#':  # 注释
-                self.skip_comment()
-                continue
+        tokens = list(self.generate_tokens())
+        if self.error:
+            return [], self.error
+        return tokens, None
+    
+    def generate_tokens(self):
+        """
+        Yields the tokens of the code one by one, ending with EOF. If the
+        code cannot be tokenized, self.error is set and EOF is yielded at
+        the position of the error, so a parser reading the stream stops.
+        """
+        code, source = self.code, self.source
+        match = TOKEN_RE.match
+        length = len(code)
+        index = 0
+        
+        while index < length:
+            m = match(code, index)
+            if m is None:
+                # 非法字符错误
+                self.error = errors.IllegalCharError(
+                    Position(index, source),
+                    Position(index + 1, source, True),
+                    f'"{code[index]}"'
+                )
+                break
             
-            if self.current_char in constants.WHITESPACES:  # 空格和制表符
-                self.advance()
-                continue
-                
-            if self.current_char == '\\':  # 当是\时，忽略后面的换行符
-                self.advance()
-                if self.current_char in constants.NEWLINE_CHAR:
-                    self.advance()
-                continue
-                
-            if self.current_char in constants.NEWLINE_CHAR:  # 换行
-                if not self.in_paren:
-                    tokens.append(Token(constants.NEWLINE, pos_start=self.position))
-                self.advance()
-                continue
-                
-            if self.current_char in constants.DIGITS:  # 数字
-                res = self.make_number()
-                if res.error:
-                    return [], res.error
-                tokens.append(res.token)
-                continue
-                
-            if self.current_char in constants.LETTERS_DIGITS:  # 标识符或关键字
-                tokens.append(self.make_identifier().token)
-                continue
-                
-            if self.current_char in constants.OP_DICT:  # 操作符处理
-                if self.current_char in constants.PAREN_START:
+            kind = m.lastgroup
+            end = m.end()
+            
+            if kind == 'identifier':  # 标识符或关键字
+                name = m.group()
+                if name in self.defines:
+                    name = self.defines.get(name)
+                if name in constants.KEYWORDS:
+                    if name in constants.SPECIAL_KEYWORDS:
+                        tok_type, name = constants.SPECIAL_KEYWORDS[name]
+                    else:
+                        tok_type = constants.KEYWORD
+                else:
+                    tok_type = constants.IDENTIFIER
+                yield self.token(tok_type, name, index, end)
+            
+            elif kind == 'operator':  # 操作符处理
+                text = m.group()
+                if text in constants.PAREN_START:
                     self.in_paren = True
-                elif self.current_char in constants.PAREN_END:
+                elif text in constants.PAREN_END:
                     self.in_paren = False
-                op_info = constants.OP_DICT[self.current_char]
-                tokens.append(self.make_operator(op_info[0], op_info[1]).token)
-                continue
-                
-            if self.current_char in {'"', "'", '`'}:  # 字符串处理
-                res = self.make_string(self.current_char)
-                if res.error:
-                    return [], res.error
-                tokens.append(res.token)
-                continue
-
-            pos_start = self.position.copy()
-            char = self.current_char
-            self.advance()
-            # 非法字符错误
-            return [], errors.IllegalCharError(pos_start, self.position, f'"{char}"')
-        
-        tokens.append(Token(constants.EOF, pos_start=self.position))
-        return tokens, None
-    
-    def skip_comment(self):
-        self.advance()
-        while self.current_char and self.current_char != '\n':
-            self.advance()
-    
-    def make_number(self):
-        res = LexerResult()
-        num = ''
-        dot = 0  # 是否有小数点
-        pos_start = self.position.copy()
-        while self.current_char and ((self.current_char in constants.DIGITS) or self.current_char in ('.', '_')):
-            if self.current_char == '.':
-                dot += 1
-                if dot > 1:
-                    break
-            if self.current_char == '_':
-                self.advance()
-                continue
-            num += self.current_char
-            self.advance()
+                op_info = constants.OP_DICT[text[0]]
+                tok_type = op_info[1][text[1]] if len(text) > 1 else op_info[0]
+                yield self.token(tok_type, None, index, end)
             
-        if dot:
-            if num == '.':  # 如果只有一个".",就是分隔符
-                return res.success(Token(constants.POINT, pos_start=self.position))
-            return res.success(Token(constants.FLOAT, float(num), pos_start, self.position))
-        
-        return res.success(Token(constants.INT, int(num), pos_start, self.position))
-    
-    def make_identifier(self):
-        res = LexerResult()
-        name = ''
-        pos_start = self.position.copy()
-        
-        while self.current_char and (self.current_char in constants.LETTERS_DIGITS):
-            name += self.current_char
-            self.advance()
-        
-        if name in self.defines:
-            name = self.defines.get(name)
-        if name in constants.KEYWORDS:
-            if name in constants.SPECIAL_KEYWORDS:
-                type_, value = constants.SPECIAL_KEYWORDS[name]
-                return res.success(Token(type_, value, pos_start, self.position))
-            tok_type = constants.KEYWORD
-        else:
-            tok_type = constants.IDENTIFIER
+            elif kind == 'newline':  # 换行
+                if not self.in_paren:
+                    yield self.token(constants.NEWLINE, None, index, index + 1)
             
-        return res.success(Token(tok_type, name, pos_start, self.position))
-    
-    def make_operator(self, start_type: str, expectation_dict: dict):
-        res = LexerResult()
-        tok_type = start_type
-        pos_start = self.position.copy()
-        
-        self.advance()
-        for expectation, type_ in expectation_dict.items():
-            if self.current_char == expectation:
-                self.advance()
-                tok_type = type_
-                break
-        
-        return res.success(Token(tok_type, pos_start=pos_start, pos_end=self.position))
-    
-    def make_string(self, quotation):
-        res = LexerResult()
-        string = ''
-        pos_start = self.position.copy()
-        escape_character = False
-        
-        self.advance()
-        while self.current_char != quotation or escape_character:
-            if not self.current_char or self.current_char == '\n':
+            elif kind == 'number':  # 数字
+                num = m.group().replace('_', '')
+                if num == '.':  # 如果只有一个".",就是分隔符
+                    yield self.token(constants.POINT, None, end, end + 1)
+                elif '.' in num:
+                    yield self.token(constants.FLOAT, float(num), index, end)
+                else:
+                    yield self.token(constants.INT, int(num), index, end)
+            
+            elif kind == 'string':  # 字符串处理
+                string = m.group()[1:-1]
+                if code[index] != '`' and '\\' in string:
+                    string = ESCAPE_RE.sub(_escape, string)
+                yield self.token(constants.STRING, string, index, end)
+            
+            elif kind == 'quote':
+                quotation = code[index]
+                stop = UNTERMINATED_RE[quotation].match(code, index).end()
                 # Excepted "'", '"' or "`"
                 details = 'Excepted \'"\'' if quotation == '"' else f'Excepted "{quotation}"'
-                return res.failure(errors.InvalidSyntaxError(pos_start, self.position, details))
-            if escape_character:
-                # 转义字符
-                string += constants.ESCAPE_CHARACTERS.get(self.current_char, self.current_char)
-                escape_character = False
-                self.advance()
-                continue
-            # `...`类似于r'...'，参考python2
-            if self.current_char == '\\' and quotation != '`':
-                escape_character = True
-                self.advance()
-                continue
-            string += self.current_char
-            self.advance()
+                self.error = errors.InvalidSyntaxError(
+                    Position(index, source),
+                    Position(stop, source, True),
+                    details
+                )
+                break
             
-        self.advance()
-        return res.success(Token(constants.STRING, string, pos_start, self.position))
+            # 注释、空白和\后面的换行直接跳过
+            index = end
+        
+        yield self.token(constants.EOF, None, index, index + 1)
+    
+    def token(self, tok_type, value, start, end):
+        return Token.at(tok_type, value, start, end, self.source)
@@ -1,18 +1,65 @@
-class Position(object):
-    def __init__(self, index: int, line: int, column: int, file: str, text: str):
-        self.index = index
-        self.line = line
-        self.column = column
+from bisect import bisect_right
+
+
+class Source(object):
+    """
+    源代码
+    Holds the file name and the text shared by every position of a file.
+    The index of line starts is only built when a line or column is needed,
+    i.e. when an error is rendered.
+    """
+    __slots__ = ('file', 'text', 'line_starts')
+    
+    def __init__(self, file: str, text: str):
         self.file = file
         self.text = text
+        self.line_starts = None
+    
+    def locate(self, index: int):
+        # 返回(行, 行首下标)
+        if self.line_starts is None:
+            starts = [0]
+            find = self.text.find
+            start = find('\n')
+            while start >= 0:
+                starts.append(start + 1)
+                start = find('\n', start + 1)
+            self.line_starts = starts
+        line = bisect_right(self.line_starts, index) - 1
+        return line, self.line_starts[line]
+
+
+class Position(object):
+    """
+    Offset into a Source. An end position (is_end) lies just after the last
+    character of a token, so it is reported on the line of that character
+    even when the character is a newline.
+    """
+    __slots__ = ('index', 'source', 'is_end')
+    
+    def __init__(self, index: int, source: Source, is_end: bool = False):
+        self.index = index
+        self.source = source
+        self.is_end = is_end
+    
+    @property
+    def file(self):
+        return self.source.file
+    
+    @property
+    def text(self):
+        return self.source.text
+    
+    @property
+    def line(self):
+        return self.source.locate(self.index - 1 if self.is_end and self.index else self.index)[0]
     
-    def advance(self, current_char: str = None):
-        self.index += 1
-        self.column += 1
-        
-        if current_char == '\n':
-            self.column = 0
-            self.line += 1
+    @property
+    def column(self):
+        if self.is_end and self.index:
+            return self.index - self.source.locate(self.index - 1)[1]
+        return self.index - self.source.locate(self.index)[1]
     
     def copy(self):
-        return Position(self.index, self.line, self.column, self.file, self.text)
+        # 位置不可变，无需复制
+        return self
@@ -0,0 +1,213 @@
+import os
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import constants
+from .parse import nodes
+from .tokens import Token
+from .interpreter.flow import ErrorSignal
+from .interpreter.table import lookup
+from .interpreter.values import Value, List, Dict, Number, null, auto
+from .interpreter.interpreter import RTResult, Function
+
+FunctionSpec = namedtuple('FunctionSpec', ['name', 'arg_names', 'body', 'should_auto_return'])
+
+templates = {}  # 工作进程中：(引擎, 栈内存) -> 准备好内置函数的Runtime
+
+
+class WorkerError(Exception):
+    """
+    A KittenScript error or Python exception in a worker process, carrying
+    the traceback printed there.
+    """
+    def __init__(self, message):
+        super().__init__(f'error in worker process\n\n{message}')
+        self.message = message
+
+
+def export(value, functions=True):
+    """
+    Converts a value into plain Python data that can be sent to a worker
+    process. Functions are sent as their syntax tree, unless functions is
+    false.
+    """
+    if not isinstance(value, Value):
+        return value
+    if isinstance(value, Function):
+        if value.body is None or not functions:
+            raise TypeError(f'cannot send {value!r} to a worker process')
+        return FunctionSpec(value.name, list(value.arg_names), value.body, value.should_auto_return)
+    if isinstance(value, List):
+        return [export(item, functions) for item in value.items]
+    if isinstance(value, Dict):
+        return {key: export(item, functions) for key, item in value.items.items()}
+    data = value.get()
+    if data is not None and not isinstance(data, (bool, int, float, str)):
+        raise TypeError(f'cannot send {value!r} to a worker process')
+    return data
+
+
+def names(node):
+    # 语法树中出现的所有标识符
+    found = set()
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, Token):
+            if item.type == constants.IDENTIFIER:
+                found.add(item.value)
+        elif type(item).__module__ == nodes.__name__:
+            stack.extend(vars(item).values())
+    return found
+
+
+def needed_variables(func, table):
+    """
+    Returns the variables func may read, directly or through the functions
+    it calls, as plain data. They are looked up from table through its
+    whole chain, so the locals of the calling function are found too.
+    Builtins are left out, every worker has its own.
+    """
+    needed = {}
+    pending = list(names(func.body))
+    while pending:
+        name = pending.pop()
+        if name in needed:
+            continue
+        value = lookup(table, name)
+        if not isinstance(value, Value) or (isinstance(value, Function) and value.body is None):
+            continue
+        try:
+            needed[name] = export(value)
+        except TypeError:
+            continue  # 不能发送的值在工作进程中按未定义处理
+        if isinstance(value, Function):
+            pending.extend(names(value.body))
+    return needed
+
+
+def define(runtime, spec):
+    # 在工作进程的运行时中定义函数，由运行时的引擎执行对应的FunctionNode
+    pos_start, pos_end = spec.body.pos_start, spec.body.pos_end
+    node = nodes.FunctionNode(
+        Token(constants.IDENTIFIER, spec.name, pos_start, pos_end),
+        [Token(constants.IDENTIFIER, name, pos_start, pos_end) for name in spec.arg_names],
+        spec.body, spec.should_auto_return
+    )
+    value, error, _ = runtime.execute('<worker>', '', node)
+    if error:
+        raise WorkerError(error.as_string())
+    return value
+
+
+def restore(runtime, data):
+    if isinstance(data, FunctionSpec):
+        return define(runtime, data)
+    if isinstance(data, list):
+        return List([restore(runtime, item) for item in data])
+    if isinstance(data, dict):
+        return Dict({key: restore(runtime, item) for key, item in data.items()})
+    return auto(data) if data is not None else null.copy()
+
+
+def call(func, args):
+    res = func.execute(args, RTResult())
+    if res.error:
+        raise WorkerError(res.error.as_string())
+    return res.value
+
+
+def run_chunk(engine, stack_memory, variables, spec, chunk, reduce):
+    """
+    Runs in a worker process: maps the function over the chunk, or folds
+    the chunk with it when reduce is set.
+    """
+    from .basic import Runtime  # basic在导入时需要本模块
+    try:
+        template = templates.get((engine, stack_memory))
+        if template is None:
+            template = templates[engine, stack_memory] = Runtime(
+                None, engine, use_cache=False, stack_memory=stack_memory
+            )
+        runtime = template.clone()
+        for name, data in variables.items():
+            runtime.symbol_table.set(name, restore(runtime, data))
+        func = define(runtime, spec)
+        items = [restore(runtime, item) for item in chunk]
+        if reduce:
+            result = items[0]
+            for item in items[1:]:
+                result = call(func, [result, item])
+            return True, export(result, False)
+        return True, [export(call(func, [item]), False) for item in items]
+    except WorkerError as err:
+        return False, err.message
+    except (Exception, SystemExit):
+        return False, traceback.format_exc()
+
+
+def submit(runtime, context, func, items, workers, reduce):
+    # 把列表分块交给运行时的进程池，按顺序返回每一块的结果
+    if not isinstance(func, Function) or func.body is None:
+        raise TypeError('the first argument must be a KittenScript function')
+    if not isinstance(items, List):
+        raise TypeError('the second argument must be a list')
+    if workers is not None and not isinstance(workers, Number):
+        raise TypeError('the number of workers must be a number')
+    workers = (workers and workers.get()) or os.cpu_count() or 1
+    spec = export(func)
+    variables = needed_variables(func, context.symbol_table)
+    data = [export(item) for item in items.items]
+    size = max(1, -(-len(data) // (workers * 4)))
+    pool = runtime.pools.get(workers)
+    if pool is None:
+        pool = runtime.pools.setdefault(workers, ProcessPoolExecutor(workers))
+    futures = [
+        pool.submit(run_chunk, runtime.engine, runtime.stack_memory, variables, spec, data[i:i + size], reduce)
+        for i in range(0, len(data), size)
+    ]
+    results = []
+    for future in futures:
+        try:
+            ok, result = future.result()
+        except Exception:
+            raise WorkerError(traceback.format_exc()) from None
+        if not ok:
+            raise WorkerError(result)
+        results.append(result)
+    return results
+
+
+def pmap(runtime, context, pos_start, pos_end, func=None, items=None, workers=None):
+    """
+    Calls the function on every item in worker processes and returns the
+    results in order. The function and the variables it reads are copied to
+    the workers, so assignments to them there are not seen by the script.
+    """
+    results = []
+    for chunk in submit(runtime, context, func, items, workers, False):
+        results.extend(restore(runtime, item) for item in chunk)
+    return results
+
+
+def preduce(runtime, context, pos_start, pos_end, func=None, items=None, init=None, workers=None):
+    """
+    Folds the items with the function, starting from init. Every worker
+    folds a slice of the list and the partial results are folded in order
+    here, so the function has to be associative.
+    """
+    if init is None:
+        raise TypeError('preduce() needs a function, a list and an initial value')
+    result = init
+    for partial in submit(runtime, context, func, items, workers, True):
+        res = func.execute([result, restore(runtime, partial)], RTResult())
+        if res.error:
+            raise ErrorSignal(res.error)
+        result = res.value
+    return result
@@ -246,11 +246,13 @@ class ThrowNode(object):
 
 
 class FunctionNode(object):
-    def __init__(self, func_name, arg_name, body, should_auto_return):
+    def __init__(self, func_name, arg_name, body, should_auto_return, is_async=False, is_generator=False):
         self.func_name = func_name or '<lambda>'
         self.arg_name = arg_name
         self.body = body
         self.should_auto_return = should_auto_return
+        self.is_async = is_async
+        self.is_generator = is_generator
 
         self.pos_end = body.pos_end
         if func_name:
@@ -271,6 +273,8 @@ class FunctionNode(object):
             'name': name.as_json(),
             'body': self.body.as_json(),
             'oneline': self.should_auto_return,
+            'async': self.is_async,
+            'generator': self.is_generator,
         }
             
             
@@ -337,6 +341,20 @@ class DictNode(object):
         }
 
 
+class AwaitNode(object):
+    def __init__(self, value, pos_start):
+        self.value = value
+        
+        self.pos_start = pos_start
+        self.pos_end = self.value.pos_end
+        
+    def as_json(self):
+        return {
+            'type': 'await',
+            'value': self.value.as_json(),
+        }
+        
+        
 class IncludeNode(object):
     def __init__(self, module):
         self.module = module
@@ -364,6 +382,19 @@ class ReturnNode(object):
         }
         
         
+class YieldNode(object):
+    def __init__(self, value, pos_start, pos_end):
+        self.value = value
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+        
+    def as_json(self):
+        return {
+            'type': 'yield',
+            'value': self.value.as_json() if self.value else None,
+        }
+        
+        
 class ContinueNode(object):
     def __init__(self, pos_start, pos_end):
         self.pos_start = pos_start
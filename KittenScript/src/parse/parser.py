@@ -1,9 +1,12 @@
-from typing import List
+from typing import Iterable
 
 from . import nodes
 from .. import constants, errors
 from ..tokens import Token
 
+# 运算符 -> 优先级，数字越大结合越紧
+OP_PRIORITIES = {op: priority for priority, ops in enumerate(constants.OP_PRIORITY) for op in ops}
+
 
 class ParserResult(object):
     node = None
@@ -48,14 +51,19 @@ class ParserResult(object):
     
 
 class Parser(object):
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[Token]):
+        # 列表直接使用，其它可迭代对象(如Lexer.generate_tokens())按需读取
+        if isinstance(tokens, list):
+            self.tokens, self.stream = tokens, None
+        else:
+            self.tokens, self.stream = [], iter(tokens)
         self.index = -1
         self.current_token = None
         self.advance()
         
         self.in_loop = False
         self.in_func = False
+        self.has_yield = False  # 正在解析的函数体中出现了yield
         
     def advance(self):
         self.index += 1
@@ -63,9 +71,18 @@ class Parser(object):
         return self.current_token
     
     def update(self):
+        if self.stream is not None and self.index >= len(self.tokens):
+            self.read_tokens()
         if 0 <= self.index < len(self.tokens):
             self.current_token = self.tokens[self.index]
             
+    def read_tokens(self):
+        for token in self.stream:
+            self.tokens.append(token)
+            if self.index < len(self.tokens):
+                return
+        self.stream = None
+    
     def reverse(self, amount=1):
         self.index -= amount
         self.update()
@@ -566,6 +583,10 @@ class Parser(object):
     
     def func_expr(self):
         res = ParserResult()
+        is_async = self.current_token.matches(constants.KEYWORD, 'async')
+        if is_async:
+            res.register(self.advance())
+            res.register_advancement()
         if not self.current_token.matches(constants.KEYWORD, 'function'):
             return res.failure(errors.InvalidSyntaxError(
                 self.current_token.pos_start, self.current_token.pos_end,
@@ -616,7 +637,8 @@ class Parser(object):
         res.register(self.advance())
         res.register_advancement()
         flag = False
-        self.in_func = True
+        in_func, self.in_func = self.in_func, True
+        has_yield, self.has_yield = self.has_yield, False
         if self.current_token.matches(constants.KEYWORD, 'do'):
             res.register(self.advance())
             res.register_advancement()
@@ -639,8 +661,14 @@ class Parser(object):
         
         if res.error:
             return res
-        self.in_func = False
-        return res.success(nodes.FunctionNode(var_name, arg_name, body, flag))
+        self.in_func = in_func
+        is_generator, self.has_yield = self.has_yield, has_yield
+        if is_async and is_generator:
+            return res.failure(errors.InvalidSyntaxError(
+                var_name.pos_start, var_name.pos_end,
+                'an async function cannot yield'
+            ))
+        return res.success(nodes.FunctionNode(var_name, arg_name, body, flag, is_async, is_generator))
     
     def lambda_expr(self):
         res = ParserResult()
@@ -1144,6 +1172,8 @@ class Parser(object):
     def expr(self):
         res = ParserResult()
         tok = self.current_token
+        if tok.type != constants.KEYWORD:  # 不是关键字开头，只能是运算表达式
+            return self.logic_expr()
     
         if tok.matches(constants.KEYWORD, 'var'):
             var_expr = res.register(self.var_expr())
@@ -1203,7 +1233,7 @@ class Parser(object):
                 return res
             return res.success(while_expr)
     
-        if tok.matches(constants.KEYWORD, 'function'):
+        if tok.matches(constants.KEYWORD, 'function') or tok.matches(constants.KEYWORD, 'async'):
             func_expr = res.register(self.func_expr())
             if res.error:
                 return res
@@ -1292,7 +1322,14 @@ class Parser(object):
             res.register_advancement()
             return res.success(nodes.NewNode(identifier))
         
-        left = res.register(self.comp_expr())
+        return self.logic_expr()
+    
+    def logic_expr(self):
+        """
+        logic-expr ::= binary-expr ((AND | OR) binary-expr)*
+        """
+        res = ParserResult()
+        left = res.register(self.binary_expr())
         if res.error:
             return res
         while (self.current_token.matches(constants.KEYWORD, 'and') or
@@ -1300,7 +1337,7 @@ class Parser(object):
             tok = self.current_token
             res.register(self.advance())
             res.register_advancement()
-            right = res.register(self.comp_expr())
+            right = res.register(self.binary_expr())
             if res.error:
                 return res
             if tok.matches(constants.KEYWORD, 'and'):
@@ -1310,6 +1347,30 @@ class Parser(object):
                 
         return res.success(left)
         
+    def binary_expr(self, min_priority=0):
+        """
+        优先级爬升法
+        binary-expr ::= get-expr (BINARY-OP get-expr)*
+        Parses the same left associative trees as comp-expr, but only recurses
+        when an operator of higher priority follows, instead of descending
+        through every level of constants.OP_PRIORITY for each operand.
+        """
+        res = ParserResult()
+        left = res.register(self.get_expr())
+        if res.error:
+            return res
+        priority = OP_PRIORITIES.get(self.current_token.type)
+        while priority is not None and priority >= min_priority:
+            tok = self.current_token
+            res.register(self.advance())
+            res.register_advancement()
+            right = res.register(self.binary_expr(priority + 1))
+            if res.error:
+                return res
+            left = nodes.BinaryOpNode(left, tok, right)
+            priority = OP_PRIORITIES.get(self.current_token.type)
+        return res.success(left)
+        
     def comp_expr(self):
         """
         comp-expr ::= term-expr ((LT | LTE | EE | NE | GT | GTE) term-expr)*
@@ -1335,7 +1396,18 @@ class Parser(object):
         return self.bin_op(constants.OP_PRIORITY[3], self.get_expr)
     
     def get_expr(self):
+        """
+        get-expr ::= AWAIT get-expr | atom (POINT identifier)* [index-expr | call]
+        """
         res = ParserResult()
+        if self.current_token.matches(constants.KEYWORD, 'await'):
+            pos_start = self.current_token.pos_start
+            res.register(self.advance())
+            res.register_advancement()
+            value = res.register(self.get_expr())
+            if res.error:
+                return res
+            return res.success(nodes.AwaitNode(value, pos_start))
         cls = res.register(self.atom())
         if res.error:
             return res
@@ -1422,7 +1494,7 @@ class Parser(object):
     
     def stmt(self):
         """
-        stmt ::= return-expr | continue-expr | break-expr | PASS | expr
+        stmt ::= return-expr | yield-expr | continue-expr | break-expr | PASS | expr
         """
         res = ParserResult()
         pos_start = self.current_token.pos_start.copy()
@@ -1442,6 +1514,19 @@ class Parser(object):
             if not expr:
                 self.reverse(res.to_reverse_count)
             return res.success(nodes.ReturnNode(expr, pos_start, self.current_token.pos_end.copy()))
+        if self.current_token.matches(constants.KEYWORD, 'yield'):
+            if not self.in_func:
+                return res.failure(errors.OutsideError(
+                    self.current_token.pos_start, self.current_token.pos_end,
+                    '"yield" outside function'
+                ))
+            self.has_yield = True
+            res.register(self.advance())
+            res.register_advancement()
+            expr = res.try_register(self.expr())
+            if not expr:
+                self.reverse(res.to_reverse_count)
+            return res.success(nodes.YieldNode(expr, pos_start, self.current_token.pos_end.copy()))
         if self.current_token.matches(constants.KEYWORD, 'continue'):
             if not self.in_loop:
                 return res.failure(errors.OutsideError(
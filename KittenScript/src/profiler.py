@@ -0,0 +1,317 @@
+import sys
+import threading
+from time import perf_counter_ns
+
+from .interpreter.context import Context
+from .interpreter.interpreter import Interpreter
+from .interpreter.closure import ClosureCompiler
+
+
+def function_name(key):
+    name, file, line = key
+    if line is None:
+        return f'{name} ({file})'
+    return f'{name} ({file}:{line})'
+
+
+class Profiler(object):
+    """
+    确定性剖析器
+    Records the calls, inclusive and exclusive time of every KittenScript
+    function, keyed by its name and the position of its definition, and the
+    time spent on every source line. The engines report to it through
+    ProfilingInterpreter and ProfilingClosureCompiler, so a runtime without
+    a profiler runs the plain engines and pays nothing for it.
+    """
+    def __init__(self):
+        self.functions = {}  # (名字, 文件, 行) -> [调用次数, 包含时间, 独占时间]
+        self.lines = {}  # (文件, 行) -> [进入次数, 时间]
+        self.sources = {}  # (文件, 行) -> 该行上的一个位置，用于显示源码
+        self.definitions = {}  # id(函数体) -> 函数的键
+        self.root = [0, {}]  # 调用树的根，节点为[独占时间, {键: 子节点}]
+        self.frames = []  # [键, 开始时间, 子调用时间, 调用树节点]
+        self.active = {}  # 键 -> 正在执行的层数，递归时包含时间只计最外层
+        self.line = None
+        self.mark = 0
+        self.total = 0
+
+    def engine(self, name):
+        # 返回执行name引擎时使用的剖析版引擎
+        if name == 'vm':
+            raise ValueError('the vm engine cannot be profiled, use tree or closure')
+        return ProfilingClosureCompiler(self) if name == 'closure' else ProfilingInterpreter(self)
+
+    def start(self, file):
+        self.enter(('<program>', file, None))
+        self.mark = perf_counter_ns()
+
+    def stop(self):
+        self.resume(None)
+        if self.frames:
+            self.total += perf_counter_ns() - self.frames[0][1]
+        while self.frames:
+            self.leave()
+
+    def define(self, name, body, pos):
+        # 记录函数体对应的定义位置
+        self.definitions[id(body)] = (name, pos.file, pos.line + 1)
+
+    def function_key(self, func):
+        key = self.definitions.get(id(func.body))
+        if key is None:
+            key = (func.name, '?', None)
+        return key
+
+    def line_key(self, node):
+        pos = node.pos_start
+        if pos is None:
+            return None
+        key = (pos.file, pos.line + 1)
+        self.sources.setdefault(key, pos)
+        return key
+
+    def enter(self, key):
+        parent = self.frames[-1][3] if self.frames else self.root
+        node = parent[1].get(key)
+        if node is None:
+            node = parent[1][key] = [0, {}]
+        self.frames.append([key, perf_counter_ns(), 0, node])
+        self.active[key] = self.active.get(key, 0) + 1
+
+    def leave(self):
+        key, start, children, node = self.frames.pop()
+        elapsed = perf_counter_ns() - start
+        stats = self.functions.get(key)
+        if stats is None:
+            stats = self.functions[key] = [0, 0, 0]
+        stats[0] += 1
+        stats[2] += elapsed - children
+        self.active[key] -= 1
+        if not self.active[key]:
+            stats[1] += elapsed
+        node[0] += elapsed - children
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+    def switch(self, line):
+        # 执行移到另一行：之前的时间记到原来的行上，返回原来的行
+        previous = self.line
+        if line is not None and line != previous:
+            self.resume(line)
+            self.lines[line][0] += 1
+        return previous
+
+    def resume(self, line):
+        # 子节点执行完后回到原来的行，不计进入次数
+        if line == self.line:
+            return
+        now = perf_counter_ns()
+        if self.line is not None:
+            self.lines[self.line][1] += now - self.mark
+        if line is not None and line not in self.lines:
+            self.lines[line] = [0, 0]
+        self.line = line
+        self.mark = now
+
+    def report(self, out=None, limit=20):
+        """
+        Prints the functions sorted by exclusive time and the lines sorted
+        by time, at most limit rows each.
+        """
+        out = sys.stderr if out is None else out
+        print(f'{self.total / 1e9:.6f} seconds in total', file=out)
+        print(file=out)
+        print(f'{"calls":>10} {"inclusive":>12} {"exclusive":>12}  function', file=out)
+        functions = sorted(self.functions.items(), key=lambda item: item[1][2], reverse=True)
+        for key, (calls, inclusive, exclusive) in functions[:limit]:
+            print(f'{calls:>10} {inclusive / 1e9:>12.6f} {exclusive / 1e9:>12.6f}  {function_name(key)}', file=out)
+        print(file=out)
+        print(f'{"hits":>10} {"time":>12}  line', file=out)
+        lines = sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)
+        for key, (hits, time) in lines[:limit]:
+            print(f'{hits:>10} {time / 1e9:>12.6f}  {key[0]}:{key[1]}  {self.source_line(key)}', file=out)
+
+    def source_line(self, key):
+        pos = self.sources[key]
+        text = pos.text
+        start = pos.index - pos.column
+        end = text.find('\n', start)
+        return text[start:end if end >= 0 else len(text)].strip()
+
+    def collapsed(self):
+        """
+        Returns the exclusive time of every call stack in microseconds, one
+        "outer;inner count" line per stack, the input format of
+        flamegraph.pl and similar tools.
+        """
+        lines = []
+
+        def walk(node, names):
+            for key, child in node[1].items():
+                path = names + [function_name(key).replace(';', ',')]
+                if child[0] >= 1000:
+                    lines.append(f'{";".join(path)} {child[0] // 1000}')
+                walk(child, path)
+
+        walk(self.root, [])
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class SamplingProfiler(object):
+    """
+    采样剖析器
+    A background thread snapshots the KittenScript call stack of the
+    profiled thread every interval seconds. The engines need no help: the
+    innermost Python frame with a `context` variable holds the running
+    Context, and its parent chain, the one RTError.generate_traceback
+    walks, is the call stack. Works with every engine, and the cost is one
+    stack walk per sample instead of a hook on every call and line.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval  # 采样间隔(秒)，实际间隔不小于sys.getswitchinterval()
+        self.samples = {}  # (最外层名字, ..., 最内层名字) -> 样本数
+        self.target = None  # 被采样线程的标识
+        self.thread = None
+        self.stopped = threading.Event()
+        self.mark = 0
+        self.total = 0
+
+    @staticmethod
+    def engine(_):
+        return None  # 不需要剖析版的引擎
+
+    def start(self, _):
+        self.target = threading.get_ident()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample, name='KittenScript sampler', daemon=True)
+        self.mark = perf_counter_ns()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        self.total += perf_counter_ns() - self.mark
+
+    def sample(self):
+        samples = self.samples
+        while not self.stopped.wait(self.interval):
+            stack = self.snapshot(sys._current_frames().get(self.target))
+            if stack:
+                samples[stack] = samples.get(stack, 0) + 1
+
+    @staticmethod
+    def snapshot(frame):
+        # 从最内层的python帧向外找正在执行的Context
+        while frame is not None:
+            if 'context' in frame.f_code.co_varnames:
+                context = frame.f_locals.get('context')
+                if isinstance(context, Context):
+                    names = []
+                    while context is not None:
+                        names.append(context.display_name)
+                        context = context.parent
+                    return tuple(reversed(names))
+            frame = frame.f_back
+        return None
+
+    def report(self, out=None, limit=20):
+        """
+        Prints the functions sorted by the samples taken while they were
+        running themselves (self) or anywhere below them (total).
+        """
+        out = sys.stderr if out is None else out
+        count = sum(self.samples.values())
+        print(f'{count} samples in {self.total / 1e9:.6f} seconds', file=out)
+        print(file=out)
+        functions = {}
+        for stack, samples in self.samples.items():
+            for name in set(stack):
+                functions.setdefault(name, [0, 0])[1] += samples
+            functions[stack[-1]][0] += samples
+        print(f'{"self":>10} {"total":>10}  function', file=out)
+        rows = sorted(functions.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (own, total) in rows[:limit]:
+            print(f'{own:>10} {total:>10}  {name}', file=out)
+
+    def collapsed(self):
+        """
+        Returns the number of samples of every call stack, one
+        "outer;inner count" line per stack, the input format of
+        flamegraph.pl and similar tools.
+        """
+        lines = [
+            f'{";".join(name.replace(";", ",") for name in stack)} {samples}'
+            for stack, samples in self.samples.items()
+        ]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    A tree-walking interpreter that reports every function call and every
+    change of source line to a Profiler.
+    """
+    def __init__(self, profiler):
+        super().__init__()
+        self.profiler = profiler
+        self.lines = {}  # id(节点) -> 行
+
+    def visit(self, node, context):
+        profiler = self.profiler
+        line = self.lines.get(id(node), False)
+        if line is False:
+            line = self.lines[id(node)] = profiler.line_key(node)
+        previous = profiler.switch(line)
+        try:
+            return super().visit(node, context)
+        finally:
+            profiler.resume(previous)
+
+    def evaluate(self, func, context):
+        profiler = self.profiler
+        profiler.enter(profiler.function_key(func))
+        try:
+            return super().evaluate(func, context)
+        finally:
+            profiler.leave()
+
+    def visit_FunctionNode(self, node, context):
+        func = super().visit_FunctionNode(node, context)
+        self.profiler.define(func.name, node.body, node.pos_start)
+        return func
+
+
+class ProfilingClosureCompiler(ClosureCompiler):
+    """
+    A closure compiler whose closures report every function call and every
+    change of source line to a Profiler.
+    """
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def compile(self, node):
+        code = super().compile(node)
+        profiler = self.profiler
+        line = profiler.line_key(node)
+
+        def profiled(context):
+            previous = profiler.switch(line)
+            try:
+                return code(context)
+            finally:
+                profiler.resume(previous)
+        return profiled
+
+    def evaluate(self, func, context):
+        profiler = self.profiler
+        profiler.enter(profiler.function_key(func))
+        try:
+            return func.code(context)
+        finally:
+            profiler.leave()
+
+    def compile_FunctionNode(self, node):
+        func_name = node.func_name if isinstance(node.func_name, str) else node.func_name.value
+        self.profiler.define(func_name, node.body, node.pos_start)
+        return super().compile_FunctionNode(node)
@@ -0,0 +1,100 @@
+import concurrent.futures
+
+from . import errors
+from .interpreter.flow import ErrorSignal
+from .interpreter.values import Value, _Getter, auto
+from .interpreter.interpreter import Function, BuiltInFunction
+
+
+class Future(Value):
+    """
+    The result of a function started by spawn(), computed in a thread of
+    the runtime's pool.
+    """
+    def __init__(self, future, name):
+        self.future = future
+        self.name = name
+        super().__init__()
+
+    def __repr__(self):
+        state = 'done' if self.future.done() else 'running'
+        return f'<future {self.name} {state}>'
+
+    def get(self):
+        return _Getter(self)
+
+    def copy(self):
+        return (
+            Future(self.future, self.name).
+            set_pos(self.pos_start, self.pos_end).
+            set_context(self.context).
+            set_attrs(self.attrs)
+        )
+
+
+class TaskFunction(BuiltInFunction):
+    """
+    A built-in function of the task API. Unlike other builtins it receives
+    the calling context, the position of the call and the values
+    themselves, and a KittenScript error raised by a task leaves it
+    unchanged, with the traceback of the task.
+    """
+    def __repr__(self):
+        return f'<built-in function {self.name}>'
+
+    def copy(self):
+        return TaskFunction(self.func, self.name).set_pos(self.pos_start, self.pos_end).set_context(self.context)
+
+    def call(self, args, context, pos_start, pos_end):
+        try:
+            result = self.func(context, pos_start, pos_end, *args)
+        except ErrorSignal:
+            raise
+        except (Exception, SystemExit) as err:
+            raise ErrorSignal(errors.FunctionError(
+                pos_start, pos_end,
+                str(err), context
+            ))
+        return auto(result)
+
+
+def spawn(runtime, context, pos_start, pos_end, func=None, *args):
+    """
+    Starts func(args...) in the runtime's thread pool. The call is made
+    from the context of spawn(), so the function sees the same variables
+    as if it had been called there.
+    """
+    if not isinstance(func, Function):
+        raise TypeError('the first argument must be a function')
+    future = runtime.executor.submit(func.call, list(args), context, pos_start, pos_end)
+    return Future(future, func.name)
+
+
+def result(future, timeout=None):
+    if not isinstance(future, Future):
+        raise TypeError(f'{future!r} is not a future')
+    timeout = None if timeout is None else timeout.get()
+    try:
+        return future.future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        raise TimeoutError(f'{future!r} did not finish in {timeout} seconds') from None
+
+
+def await_result(context, pos_start, pos_end, future=None, timeout=None):
+    # 等待一个任务结束，返回它的结果，任务中的错误在这里重新抛出
+    return result(future, timeout)
+
+
+def wait_all(context, pos_start, pos_end, futures=None, timeout=None):
+    # 等待所有任务结束，按顺序返回结果；有任务出错时抛出第一个错误
+    items = futures.get() if futures is not None else None
+    if not isinstance(items, list):
+        raise TypeError('the argument must be a list of futures')
+    for future in items:
+        if not isinstance(future, Future):
+            raise TypeError(f'{future!r} is not a future')
+    timeout = None if timeout is None else timeout.get()
+    _, pending = concurrent.futures.wait([future.future for future in items], timeout)
+    if pending:
+        raise TimeoutError(f'{len(pending)} futures did not finish in {timeout} seconds')
+    return [result(future) for future in items]
@@ -1,21 +1,45 @@
 from typing import Any, Optional
 
-from .lexer.position import Position
+from .lexer.position import Position, Source
 
 
 class Token(object):
+    """
+    A token records its position as two offsets into the Source of its file,
+    Position objects are only created when pos_start or pos_end is read.
+    """
+    __slots__ = ('type', 'value', 'start', 'end', 'source')
+    
     def __init__(self, type_: str, value: Any = None, pos_start: Optional[Position] = None,
                  pos_end: Optional[Position] = None):
         self.type = type_
         self.value = value
         
         if pos_start:
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.advance(self.value)
+            self.source = pos_start.source
+            self.start = pos_start.index
+            self.end = pos_start.index + 1
         
         if pos_end:
-            self.pos_end = pos_end.copy()
+            self.end = pos_end.index
+    
+    @classmethod
+    def at(cls, type_: str, value: Any, start: int, end: int, source: Source):
+        token = object.__new__(cls)
+        token.type = type_
+        token.value = value
+        token.start = start
+        token.end = end
+        token.source = source
+        return token
+    
+    @property
+    def pos_start(self):
+        return Position(self.start, self.source)
+    
+    @property
+    def pos_end(self):
+        return Position(self.end, self.source, True)
     
     def __repr__(self):
         if self.value:
@@ -1,15 +1,30 @@
 import sys
 
 from .src.basic import run
+from .src.profiler import Profiler, SamplingProfiler
 from .version import get_version
 
 
-def use_interpreter(file, code, output_result, quit_if_error=True):
+def use_interpreter(file, code, output_result, quit_if_error=True, engine='tree', use_cache=True,
+                    dump_dir=None, profile=False, profile_output=None, sample_interval=None):
+    if not (profile or profile_output):
+        profiler = None
+    elif sample_interval is None:
+        profiler = Profiler()
+    else:
+        profiler = SamplingProfiler(sample_interval)
     try:
-        result, error, ctx = run(file, code)
+        result, error, ctx = run(file, code, engine=engine, use_cache=use_cache, dump_dir=dump_dir,
+                                 profile=profiler)
     except KeyboardInterrupt:
         print('KeyboardInterrupt')
         sys.exit()
+    finally:
+        if profile:
+            profiler.report()
+        if profile_output:
+            with open(profile_output, 'w', encoding='utf-8') as fp:
+                fp.write(profiler.collapsed())
     if error:
         print(error.as_string())
         if quit_if_error:
@@ -21,14 +36,15 @@ def use_interpreter(file, code, output_result, quit_if_error=True):
                 print(i)
         
 
-def interpreter_stdin():
+def interpreter_stdin(engine='tree'):
     print(f'Welcome to KittenScript {get_version()}')
     while True:
         code = input('>>> ')
-        use_interpreter('<stdin>', code, True, False)
+        use_interpreter('<stdin>', code, True, False, engine)
         
         
-def interpreter_file(path):
+def interpreter_file(path, engine='tree', use_cache=True, dump_dir=None, profile=False, profile_output=None,
+                     sample_interval=None):
     try:
         io = open(path, 'r', encoding='utf-8')
     except (Exception, SystemExit) as e:
@@ -36,7 +52,8 @@ def interpreter_file(path):
         sys.exit(1)
     code = io.read()
     io.close()
-    use_interpreter(path, code, False)
+    use_interpreter(path, code, False, engine=engine, use_cache=use_cache, dump_dir=dump_dir,
+                    profile=profile, profile_output=profile_output, sample_interval=sample_interval)
         
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+"""
+Counts the interpreter objects the tree engine constructs per visited node.
+
+Opt-in benchmark, run from the repository root:
+
+    python -m benchmarks.allocations [file.kst]
+
+Without a file a small workload with function calls, loops and arithmetic
+is used. Object construction is counted with sys.setprofile, so the numbers
+are exact and deterministic but the run itself is slow.
+"""
+import io
+import sys
+from collections import Counter
+
+from KittenScript.src.basic import Runtime
+from KittenScript.src.interpreter.interpreter import Interpreter
+
+WORKLOAD = '''
+function fib(n)
+    if n == 1 or n == 2 then return 1
+    return fib(n - 1) + fib(n - 2)
+end
+var total = 0
+for i to 2000 then
+    var total = total + i * 2 - 1
+end
+print(fib(12), total)
+'''
+
+
+def measure(file, text):
+    visits = 0
+    constructed = Counter()
+    visit = Interpreter.visit
+
+    def counting_visit(self, node, context):
+        nonlocal visits
+        visits += 1
+        return visit(self, node, context)
+
+    def profile(frame, event, _):
+        if event != 'call' or frame.f_code.co_name != '__init__':
+            return
+        instance = frame.f_locals.get('self')
+        caller = frame.f_back
+        # super().__init__()只算一次
+        if caller is not None and caller.f_code.co_name == '__init__' and caller.f_locals.get('self') is instance:
+            return
+        constructed[type(instance).__name__] += 1
+
+    runtime = Runtime(io.StringIO(), use_cache=False)
+    node, error = runtime.parse(file, text)
+    if error:
+        raise SystemExit(error.as_string())
+    Interpreter.visit = counting_visit
+    sys.setprofile(profile)
+    try:
+        _, error, _ = runtime.execute(file, text, node)
+    finally:
+        sys.setprofile(None)
+        Interpreter.visit = visit
+    if error:
+        raise SystemExit(error.as_string())
+    return visits, constructed
+
+
+def main(argv):
+    if argv:
+        with open(argv[0], 'r', encoding='utf-8') as f:
+            file, text = argv[0], f.read()
+    else:
+        file, text = '<workload>', WORKLOAD
+    visits, constructed = measure(file, text)
+    total = sum(constructed.values())
+    print(f'nodes visited:       {visits}')
+    print(f'objects constructed: {total}')
+    print(f'objects per node:    {total / max(visits, 1):.3f}')
+    for name, count in constructed.most_common():
+        print(f'  {name:<20} {count:>10} {count / max(visits, 1):>8.3f}/node')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+Measures the throughput of the lexer in megabytes of source per second.
+
+Opt-in benchmark, run from the repository root:
+
+    python -m benchmarks.lexer [file.kst] [--size MB] [--repeat N]
+
+Without a file the bundled libraries and examples are concatenated and
+repeated until the source reaches the requested size. Both the list mode
+(Lexer.make_tokens) and the generator mode (Lexer.generate_tokens) are
+timed, the best of N runs is reported.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from KittenScript.src.lexer.lexer import Lexer
+
+ROOT = Path(__file__).resolve().parent.parent / 'KittenScript'
+
+
+def workload(size):
+    sources = [path.read_text(encoding='utf-8') for path in sorted(ROOT.glob('**/*.kst'))]
+    chunk = '\n'.join(sources) + '\n'
+    return chunk * max(1, round(size * 1024 * 1024 / len(chunk.encode('utf-8'))))
+
+
+def list_mode(file, text):
+    tokens, error = Lexer(file, text).make_tokens()
+    if error:
+        raise SystemExit(error.as_string())
+    return len(tokens)
+
+
+def generator_mode(file, text):
+    lexer = Lexer(file, text)
+    count = sum(1 for _ in lexer.generate_tokens())
+    if lexer.error:
+        raise SystemExit(lexer.error.as_string())
+    return count
+
+
+def measure(mode, file, text, repeat):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = mode(file, text)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.lexer')
+    parser.add_argument('file', nargs='?')
+    parser.add_argument('--size', type=float, default=4, help='size of the generated source in MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            file, text = args.file, f.read()
+    else:
+        file, text = '<workload>', workload(args.size)
+    megabytes = len(text.encode('utf-8')) / 1024 / 1024
+    print(f'source: {megabytes:.2f} MB')
+    for name, mode in (('make_tokens', list_mode), ('generate_tokens', generator_mode)):
+        seconds, count = measure(mode, file, text, args.repeat)
+        print(f'{name:<16} {megabytes / seconds:8.2f} MB/s  {count / seconds / 1e6:6.2f} Mtok/s')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,71 @@
+"""
+Measures the memory held by the values of a list-heavy script.
+
+Opt-in benchmark, run from the repository root:
+
+    python -m benchmarks.memory [file.kst] [--engine ENGINE]
+
+The script is run with tracemalloc enabled, and the memory still allocated
+once it has finished (its global variables keep the lists alive) is
+reported together with the size of a single Number.
+"""
+import argparse
+import io
+import sys
+import tracemalloc
+
+from KittenScript.src import constants
+from KittenScript.src.basic import Runtime
+from KittenScript.src.interpreter.values import Number
+
+WORKLOAD = '''
+var numbers = for i to 100000 then i * 2
+var words = for i to 20000 then str(i) + "!"
+var rows = for i to 20000 then [i, i + 1]
+'''
+
+
+def sizeof(value):
+    size = sys.getsizeof(value)
+    if hasattr(value, '__dict__'):
+        size += sys.getsizeof(value.__dict__)
+    if type(value.attrs) is dict:
+        size += sys.getsizeof(value.attrs)
+    return size
+
+
+def measure(file, text, engine):
+    runtime = Runtime(io.StringIO(), engine, use_cache=False)
+    node, error = runtime.parse(file, text)
+    if error:
+        raise SystemExit(error.as_string())
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        _, error, _ = runtime.execute(file, text, node)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if error:
+        raise SystemExit(error.as_string())
+    return current - before, peak - before
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory')
+    parser.add_argument('file', nargs='?')
+    parser.add_argument('--engine', choices=constants.ENGINES, default='tree')
+    args = parser.parse_args(argv)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            file, text = args.file, f.read()
+    else:
+        file, text = '<workload>', WORKLOAD
+    retained, peak = measure(file, text, args.engine)
+    print(f'retained: {retained / 1024 / 1024:.2f} MiB')
+    print(f'peak:     {peak / 1024 / 1024:.2f} MiB')
+    print(f'Number:   {sizeof(Number(1))} bytes')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,105 @@
+"""
+Compares the precedence climbing expression parser with the recursive
+descent through every level of constants.OP_PRIORITY.
+
+Opt-in benchmark, run from the repository root:
+
+    python -m benchmarks.parser [--size N] [--repeat N]
+
+Generated inputs (one long expression, a long list, many short statements
+and nested parentheses) are tokenized once and then parsed by both
+parsers. The best time of N runs, the number of Python calls made while
+parsing and the deepest Python stack reached are reported, and the two
+syntax trees are checked to be identical.
+"""
+import argparse
+import random
+import sys
+import time
+
+from KittenScript.src.lexer.lexer import Lexer
+from KittenScript.src.parse.parser import Parser
+
+OPERATORS = ['<', '<=', '==', '!=', '>', '>=', '+', '-', '&', '|', '^', '<<', '>>',
+             '*', '/', '//', '%', '**', '::', 'and', 'or']
+OPERANDS = ['1', '2.5', 'x', '"s"', 'f(x)', 'a[1]', '(x + 1)', '~2', 'm.n']
+
+
+class RecursiveParser(Parser):
+    # 原来的解析方式：expr -> comp-expr -> term-expr -> calc-expr -> power-expr
+    def binary_expr(self, min_priority=0):
+        return self.comp_expr()
+
+
+def expression(rnd, size):
+    words = [rnd.choice(OPERANDS)]
+    for _ in range(size):
+        words += [rnd.choice(OPERATORS), rnd.choice(OPERANDS)]
+    return ' '.join(words)
+
+
+def workloads(size):
+    rnd = random.Random(0)
+    return {
+        'expression': f'var r = {expression(rnd, size)}\n',
+        'list': '[' + ', '.join(expression(rnd, 2) for _ in range(size)) + ']\n',
+        'statements': ''.join(f'var v{i} = {expression(rnd, 4)}\n' for i in range(size // 4)),
+        'nested': '(' * (size // 100) + '1' + ' + 1)' * (size // 100) + '\n',
+    }
+
+
+def calls(parser_class, tokens):
+    count = depth = max_depth = 0
+
+    def profile(frame, event, _):
+        nonlocal count, depth, max_depth
+        if event == 'call':
+            count += 1
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif event == 'return':
+            depth -= 1
+
+    sys.setprofile(profile)
+    try:
+        parser_class(tokens).parse()
+    finally:
+        sys.setprofile(None)
+    return count, max_depth
+
+
+def measure(parser_class, tokens, repeat):
+    best = float('inf')
+    node = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = parser_class(tokens).parse()
+        best = min(best, time.perf_counter() - start)
+        if res.error:
+            raise SystemExit(res.error.as_string())
+        node = res.node
+    return best, node
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.parser')
+    parser.add_argument('--size', type=int, default=4000, help='number of operators per input')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    for name, text in workloads(args.size).items():
+        tokens, error = Lexer(f'<{name}>', text).make_tokens()
+        if error:
+            raise SystemExit(error.as_string())
+        print(f'{name} ({len(tokens)} tokens)')
+        trees = []
+        for parser_class in (RecursiveParser, Parser):
+            seconds, node = measure(parser_class, tokens, args.repeat)
+            trees.append(node.as_json())
+            count, depth = calls(parser_class, tokens)
+            print(f'  {parser_class.__name__:<16} {seconds * 1000:9.2f} ms {count:>10} calls {depth:>6} deep')
+        if trees[0] != trees[1]:
+            raise SystemExit(f'{name}: the parsers built different syntax trees')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
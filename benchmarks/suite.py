@@ -0,0 +1,137 @@
+"""
+Times the lexer, the parser and an execution engine on the bundled
+workloads and compares the results with a saved baseline.
+
+Opt-in benchmark, run from the repository root:
+
+    python -m benchmarks.suite [NAME ...] [--engine ENGINE] [--repeat N]
+                               [--save FILE] [--compare FILE] [--threshold PERCENT]
+
+Every workload in benchmarks/workloads (or only the named ones) is run N
+times. The three phases, Lexer.make_tokens, Parser.parse and the execution
+of the syntax tree, are timed separately and reported in runs per second
+with the relative standard deviation. Modules included by a workload are
+parsed during its execution, as they are for a script. --save stores the
+mean times per engine in a JSON file, --compare reads such a file and marks
+every phase that became slower by more than the threshold; the exit status
+is then 1.
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from KittenScript.src import constants
+from KittenScript.src.basic import Runtime
+from KittenScript.src.lexer.lexer import Lexer
+from KittenScript.src.parse.parser import Parser
+
+WORKLOADS = Path(__file__).resolve().parent / 'workloads'
+PHASES = ('lex', 'parse', 'execute')
+
+
+def lex(file, text):
+    tokens, error = Lexer(file, text).make_tokens()
+    if error:
+        raise SystemExit(error.as_string())
+    return tokens
+
+
+def parse(tokens):
+    res = Parser(tokens).parse()
+    if res.error:
+        raise SystemExit(res.error.as_string())
+    return res.node
+
+
+def execute(runtime, file, text, node):
+    _, error, _ = runtime.execute(file, text, node)
+    if error:
+        raise SystemExit(error.as_string())
+
+
+def measure(file, text, engine, repeat):
+    times = {phase: [] for phase in PHASES}
+    for _ in range(repeat):
+        runtime = Runtime(io.StringIO(), engine, use_cache=False)
+        start = time.perf_counter()
+        tokens = lex(file, text)
+        lexed = time.perf_counter()
+        node = parse(tokens)
+        parsed = time.perf_counter()
+        execute(runtime, file, text, node)
+        executed = time.perf_counter()
+        times['lex'].append(lexed - start)
+        times['parse'].append(parsed - lexed)
+        times['execute'].append(executed - parsed)
+    return times
+
+
+def summary(samples):
+    mean = statistics.mean(samples)
+    deviation = statistics.stdev(samples) if len(samples) > 1 else 0
+    return mean, deviation / mean if mean else 0
+
+
+def load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('names', nargs='*', metavar='NAME', help='workloads to run, default all')
+    parser.add_argument('--engine', choices=constants.ENGINES, default='tree')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='FILE', help='store the mean times in a baseline file')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a baseline file')
+    parser.add_argument('--threshold', type=float, default=10, metavar='PERCENT',
+                        help='slowdown reported as a regression')
+    args = parser.parse_args(argv)
+    paths = sorted(WORKLOADS.glob('*.kst'))
+    if args.names:
+        paths = [path for path in paths if path.stem in args.names]
+        missing = set(args.names) - {path.stem for path in paths}
+        if missing:
+            raise SystemExit(f'unknown workloads: {", ".join(sorted(missing))}')
+    baseline = load(args.compare).get(args.engine, {}) if args.compare else {}
+
+    results = {}
+    regressions = 0
+    print(f'engine: {args.engine}, {args.repeat} runs')
+    print(f'{"workload":<12} {"phase":<8} {"runs/s":>12} {"stdev":>7} {"baseline":>9}')
+    for path in paths:
+        text = path.read_text(encoding='utf-8')
+        times = measure(path.name, text, args.engine, args.repeat)
+        results[path.stem] = {}
+        for phase in PHASES:
+            mean, deviation = summary(times[phase])
+            results[path.stem][phase] = mean
+            line = f'{path.stem:<12} {phase:<8} {1 / mean:>12.2f} {deviation:>7.1%}'
+            base = baseline.get(path.stem, {}).get(phase)
+            if base:
+                change = mean / base - 1
+                line += f' {change:>+9.1%}'
+                if change * 100 > args.threshold:
+                    line += '  REGRESSION'
+                    regressions += 1
+            print(line)
+
+    if args.save:
+        saved = load(args.save)
+        saved.setdefault(args.engine, {}).update(results)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+    if regressions:
+        print(f'{regressions} phases are more than {args.threshold:g}% slower than the baseline')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])